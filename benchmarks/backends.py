@@ -0,0 +1,76 @@
+"""
+Benchmark of the executor backends ('process', 'thread' and 'hybrid') on workloads of different character
+
+Usage (with dtm installed): python benchmarks/backends.py [--tasks N] [--nprocesses N] [--threads N]
+
+Expected outcome:
+
+- cpu: pure Python arithmetic holding the GIL, processes win and threads run serially.
+- io: tasks waiting (sleeping), threads win as there is no process startup or pickling.
+- tiny: trivial tasks, threads win as the overhead of pickling dominates.
+- numpy: matrix products releasing the GIL, threads and hybrid compete with processes without pickling the matrices.
+"""
+import argparse
+import os
+import time
+
+from dtm.main import Executor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def cpu(n):
+    return sum(i * i for i in range(n))
+
+
+def io(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def tiny(x):
+    return x + 1
+
+
+def matmul(a):
+    return float((a @ a).sum())
+
+
+def workloads(ntasks):
+    yield "cpu", cpu, [[200_000] for _ in range(ntasks)]
+    yield "io", io, [[0.05] for _ in range(ntasks)]
+    yield "tiny", tiny, [[i] for i in range(100 * ntasks)]
+    if np is not None:
+        a = np.random.default_rng(0).random((400, 400))
+        yield "numpy", matmul, [[a] for _ in range(ntasks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the executor backends.")
+    parser.add_argument("--tasks", type=int, default=64, help="number of tasks per workload")
+    parser.add_argument("--nprocesses", type=int, default=os.cpu_count(), help="number of workers")
+    parser.add_argument("--threads", type=int, default=None, help="threads per process with the hybrid backend")
+    args = parser.parse_args()
+
+    backends = ("process", "thread", "hybrid")
+    print(f"{'Workload':<10}" + "".join(f"{b:>12}" for b in backends))
+    for name, function, arguments in workloads(args.tasks):
+        timings = list()
+        for backend in backends:
+            nprocesses = args.nprocesses
+            if backend == "hybrid":
+                nprocesses = max(1, args.nprocesses // (args.threads or 2))
+
+            with Executor(nprocesses=nprocesses, backend=backend, threads=args.threads or 2) as executor:
+                t0 = time.perf_counter()
+                executor.map(len(arguments) * [function], args=arguments)
+                timings.append(time.perf_counter() - t0)
+
+        print(f"{name:<10}" + "".join(f"{t:>11.3f}s" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
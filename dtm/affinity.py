@@ -0,0 +1,193 @@
+"""
+Module with pinning of tasks to dedicated cores
+"""
+import multiprocessing as mp
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional, List, Iterable, Iterator, Dict, Set
+
+from .resources import Requirement
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+def affinity_supported() -> bool:
+    """
+    Check if the CPU affinity of processes can be set on this platform (Linux).
+
+    Returns
+    -------
+    bool
+        True if `os.sched_setaffinity()` is available
+
+    """
+    return hasattr(os, "sched_setaffinity") and hasattr(os, "sched_getaffinity")
+
+
+def package(cpu: int, directory: str = "/sys/devices/system/cpu") -> int:
+    """
+    Physical package (socket) of CPU.
+
+    Parameters
+    ----------
+    cpu : int
+        CPU number
+    directory : str, optional
+        Directory with the CPU topology
+
+    Returns
+    -------
+    int
+        Package id, 0 if the topology is not available.
+
+    """
+    try:
+        with open(os.path.join(directory, f"cpu{cpu}", "topology", "physical_package_id")) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+
+@contextmanager
+def pinned(cores: Optional[Iterable[int]]) -> Iterator[None]:
+    """
+    Pin the calling thread to cores while starting child processes, which inherit its affinity, as do their
+    descendants.
+
+    Parameters
+    ----------
+    cores : iterable
+        CPUs, None to leave the affinity unchanged
+
+    Examples
+    --------
+    >>> with pinned([2, 3]):
+    ...     process = subprocess.Popen(command)
+
+    """
+    if cores is None or not affinity_supported():
+        yield
+        return
+
+    # the affinity of a thread is inherited by the processes it forks, without affecting the other threads
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cores)
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+class CoreAffinity:
+    """
+    Pin each running task, and all processes it starts, to a set of cores not shared with other tasks.
+
+    Each task is given as many cores as it has threads, i.e. the cores of its resource requirement (see
+    `dtm.resources.Requirement`), or `threads` if not specified. The cores of a task are taken from one socket if
+    possible (best fit), and freed when the task ends. Tasks are started only when enough cores are free.
+
+    Parameters
+    ----------
+    cores : iterable, optional
+        CPUs to pin tasks to. Default the CPUs available to this process, see `os.sched_getaffinity()`.
+    threads : int, optional
+        Number of cores of tasks not requiring a number of cores.
+
+    Notes
+    -----
+    Pinning is only supported on Linux. Elsewhere, cores are allocated to tasks as usual but tasks are not pinned.
+
+    Examples
+    --------
+    >>> responses = subprocess_commands(["solve"], paths, resources=dict(cores=4), affinity=CoreAffinity())
+
+    """
+
+    def __init__(self, cores: Optional[Iterable[int]] = None, threads: int = 1):
+        self.supported = affinity_supported()
+        if cores is not None:
+            self.cores = sorted(cores)
+        elif self.supported:
+            self.cores = sorted(os.sched_getaffinity(0))
+        else:
+            self.cores = list(range(os.cpu_count() or 1))
+
+        if not self.supported:
+            logger.warning("Setting the CPU affinity is not supported on this platform, tasks are not pinned.")
+
+        self.threads = threads
+        self._packages: Dict[int, List[int]] = defaultdict(list)
+        for cpu in self.cores:
+            self._packages[package(cpu)].append(cpu)
+
+        self._free: Set[int] = set(self.cores)
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"CoreAffinity(cores={len(self.cores)}, free={len(self._free)})"
+
+    @property
+    def free(self) -> int:
+        """Number of cores not allocated to tasks."""
+        return len(self._free)
+
+    def size(self, requirement: Optional[Requirement] = None) -> int:
+        """Number of cores allocated to task with resource requirement."""
+        n = requirement.get("cores", 0) if requirement is not None else 0
+        return max(1, min(n or self.threads, len(self.cores)))
+
+    def allocate(self, requirement: Optional[Requirement] = None) -> Optional[List[int]]:
+        """
+        Allocate cores to task.
+
+        Parameters
+        ----------
+        requirement : Requirement, optional
+            Resources required by the task, the number of cores is the number of threads of the task
+
+        Returns
+        -------
+        list
+            Cores allocated, None if not enough cores are free.
+
+        """
+        n = self.size(requirement)
+        with self._lock:
+            if len(self._free) < n:
+                return None
+
+            free = {p: [c for c in cpus if c in self._free] for p, cpus in self._packages.items()}
+            fitting = [p for p in free if len(free[p]) >= n]
+            if fitting:
+                # the socket with the fewest free cores fitting the task, keeping large blocks free for large tasks
+                best = min(fitting, key=lambda p: (len(free[p]), p))
+                cores = free[best][:n]
+            else:
+                # spread over the sockets with the most free cores
+                cores = list()
+                for p in sorted(free, key=lambda p: (-len(free[p]), p)):
+                    cores.extend(free[p][:n - len(cores)])
+
+            self._free.difference_update(cores)
+
+        logger.debug("\t" + f"Allocated cores {cores}.")
+        return cores
+
+    def release(self, cores: Optional[Iterable[int]]) -> None:
+        """
+        Free cores of task that ended.
+
+        Parameters
+        ----------
+        cores : iterable
+            Cores allocated by `allocate()`, None is ignored.
+
+        """
+        if cores is None:
+            return
+
+        with self._lock:
+            self._free.update(cores)
@@ -0,0 +1,228 @@
+"""
+Module with asyncio coroutines for running commands concurrently without blocking the event loop
+"""
+import multiprocessing as mp
+import asyncio
+import subprocess
+import os
+import json
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict
+
+from .process import GRACE_PERIOD, KILL_TIMEOUT, POLL_INTERVAL, session_options, group_alive, interrupt_group, \
+    kill_group
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+async def _wait_group(process: asyncio.subprocess.Process, timeout: float) -> bool:
+    """Wait up to `timeout` seconds for all processes in the group of child to terminate."""
+    if os.name != "posix":
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # scanning /proc for the processes of the group takes a while on busy hosts, keep it off the event loop
+    deadline = time.monotonic() + timeout
+    while await asyncio.to_thread(group_alive, process.pid):
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(POLL_INTERVAL)
+
+    return True
+
+
+async def _terminate_group(process: asyncio.subprocess.Process, grace: float) -> None:
+    """Terminate child and the processes it started (SIGTERM), killing them (SIGKILL) after the grace period."""
+    interrupt_group(process)
+    if not await _wait_group(process, grace):
+        kill_group(process)
+        if not await _wait_group(process, KILL_TIMEOUT):
+            logger.warning(f"Processes in group {process.pid} are still alive after SIGKILL.")
+
+    await process.wait()
+
+
+async def run_command(command: str, path: Optional[str] = None, shell: bool = False,
+                      env: Optional[Dict[str, str]] = None, pipe: bool = False,
+                      timeout: Optional[int] = None, grace: float = GRACE_PERIOD) -> "ResponseDict":
+    """
+    Execute command in subprocess without blocking the event loop, asyncio counterpart of `subprocess_command()`.
+
+    Parameters
+    ----------
+    command: str
+        Command str (the program to execute is the first item and the following items are arguments to the program).
+    path : str, optional
+        Directory in which to execute program, current work directory by default
+    shell : bool, optional
+        Spin up a system dependent shell process (commonly /bin/sh on Linux or cmd.exe on Windows) and run the command
+        within it. Not needed if calling an executable file.
+    env : dict, optional
+        Environmental variables passed to program
+    pipe : bool, optional
+        Pipe standard out/err from subprocesses to parent process. Default is to dump standard out/err to a log file in
+        the specified work directory.
+    timeout : int, optional
+        Number of seconds before terminating the process
+    grace : float, optional
+        Number of seconds the processes of a timed out command are given to exit after SIGTERM, before SIGKILL. The
+        command is started in its own process group, and the whole group is terminated.
+
+    Returns
+    -------
+    ResponseDict
+        Process response, see `subprocess_command()`. The process id is the process id of the command itself.
+
+    """
+    # ensure correct type
+    if not isinstance(command, str):
+        logger.error(f"The command must be a string not a {type(command)}.")
+        raise TypeError(f"The command must be a string not a {type(command)}.")
+
+    # use current work directory if none is specified
+    if path is None:
+        path = os.getcwd()
+
+    # concatenate env variables to pass
+    if env is not None:
+        env = dict(**os.environ, **env)
+    else:
+        env = os.environ
+
+    # choose handling of standard out/err
+    if pipe:
+        # pipe to parent process
+        out = subprocess.PIPE
+    else:
+        # log stdout/stderr to file in path
+        out = open(os.path.join(path, 'log.txt'), 'w')
+
+    logger.debug("\t" + f"Executing command '{command}' in working directory '{path}.'")
+
+    try:
+        if shell:
+            process = await asyncio.create_subprocess_shell(command, stdout=out, stderr=subprocess.STDOUT, cwd=path,
+                                                            env=env, **session_options())
+        else:
+            command = command.split()
+            process = await asyncio.create_subprocess_exec(*command, stdout=out, stderr=subprocess.STDOUT, cwd=path,
+                                                           env=env, **session_options())
+
+    except FileNotFoundError as e:
+        response: "ResponseDict" = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
+                                        returncode=1, status='error', output='',
+                                        msg=f'Command "{command[0]}" could not be found.')
+        logger.debug("\t" + response.get('msg'))
+        logger.debug("\t" + str(e))
+        return response
+
+    except NotADirectoryError as e:
+        response = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
+                        returncode=1, status='error', output='',
+                        msg=f'The path "{path}" is invalid. The directory does not exist.')
+        logger.debug("\t" + response.get('msg'))
+        logger.debug("\t" + str(e))
+        return response
+
+    finally:
+        if not pipe:
+            # the child holds its own handle to the log file
+            out.close()
+
+    t0 = time.monotonic()
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+
+    except asyncio.TimeoutError:
+        await _terminate_group(process, grace)
+        response = dict(pid=process.pid, ppid=os.getpid(), path=path,
+                        returncode=1, status='timeout', output=None,
+                        msg=f'Command "{command}" timed out after {timeout} seconds.')
+
+    except asyncio.CancelledError:
+        # do not leave orphaned children behind when the caller cancels the task
+        kill_group(process)
+        raise
+
+    else:
+        output = stdout.decode() if stdout is not None else None
+        if process.returncode == 0:
+            response = dict(pid=process.pid, ppid=os.getpid(), path=path,
+                            returncode=process.returncode, status='completed', output=output,
+                            msg=f'Command "{command}" returned exit status 0. Congratulations!.')
+        else:
+            response = dict(pid=process.pid, ppid=os.getpid(), path=path,
+                            returncode=process.returncode, status='error', output=output,
+                            msg=f'Command "{command}" returned exit status {process.returncode}. '
+                                f'See details in task log.')
+
+    logger.debug("\t" + response.get('msg'))
+    response['runtime'] = time.monotonic() - t0
+    return response
+
+
+async def run_commands(commands: List[str], paths: List[str], nprocesses: Optional[int] = None, shell: bool = False,
+                       env: Optional[Dict[str, str]] = None, pipe: bool = False,
+                       timeout: Optional[int] = None, grace: float = GRACE_PERIOD) -> List["ResponseDict"]:
+    """
+    Execute commands over many work directories concurrently without blocking the event loop, asyncio counterpart of
+    `subprocess_commands()`.
+
+    Parameters
+    ----------
+    commands: list
+        Commands to execute in each of the work directories/paths specified. If `commands` is of length 1, that
+        command will be executed in each of the work directories.
+    paths : list
+        Directories in which to execute program
+    nprocesses: int, optional
+        Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
+    shell : bool, optional
+        Spin up a system dependent shell process (commonly /bin/sh on Linux or cmd.exe on Windows) and run the command
+        within it. Not needed if calling an executable file.
+    env : dict, optional
+        Environmental variables passed to program
+    pipe : bool, optional
+        Pipe standard out/err from subprocesses to parent process. Default is to dump standard out/err to a log file in
+        the specified work directory.
+    timeout : int, optional
+        Number of seconds before terminating the process
+    grace : float, optional
+        Number of seconds the processes of a timed out command are given to exit after SIGTERM, before SIGKILL.
+
+    Returns
+    -------
+    list
+        Collection of subprocess response, in the order of `paths`.
+
+    """
+    if isinstance(commands, (list, tuple)):
+        if len(commands) == 1:
+            commands = len(paths) * list(commands)      # duplicate command for all work directories
+
+        elif len(commands) != len(paths):
+            logger.error(f"The number of commands must 1 or equal the number of paths. You specified "
+                         f"{len(commands)} commands and {len(paths)} paths.")
+    else:
+        logger.error(f"The `commands` parameter must be a tuple or a list, not {type(commands)}.")
+
+    # limit the number of concurrent processes
+    semaphore = asyncio.Semaphore(nprocesses if nprocesses is not None else os.cpu_count())
+
+    async def _run(c: str, p: str) -> "ResponseDict":
+        async with semaphore:
+            return await run_command(c, path=p, shell=shell, env=env, pipe=pipe, timeout=timeout, grace=grace)
+
+    logger.debug(f"Running {len(paths)} tasks concurrently...")
+    response = list(await asyncio.gather(*(_run(c, p) for c, p in zip(commands, paths))))
+    logger.debug("Retrieved response from the processes:")
+    logger.debug(json.dumps(response, indent=2))
+
+    return response
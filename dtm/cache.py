@@ -0,0 +1,415 @@
+"""
+Module with content-addressed caching of command results and function results on local disk
+"""
+import multiprocessing as mp
+import os
+import glob
+import json
+import shutil
+import pickle
+import hashlib
+import inspect
+import tempfile
+from typing import TYPE_CHECKING, Optional, List, Callable, Any, Dict, Iterable, Iterator, Tuple, Deque
+
+from .scheduling import CommandTask
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# size of blocks read when hashing files
+BLOCK_SIZE = 2 ** 20
+
+
+def _hash_file(filename: str) -> str:
+    """SHA-256 digest of file content."""
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def _match(path: str, patterns: Iterable[str]) -> List[str]:
+    """Files in work directory matching glob patterns, relative to the work directory and sorted."""
+    matches = set()
+    for pattern in patterns:
+        for filename in glob.glob(os.path.join(glob.escape(path), pattern), recursive=True):
+            if os.path.isfile(filename):
+                matches.add(os.path.relpath(filename, path))
+
+    return sorted(matches)
+
+
+def _size(directory: str) -> int:
+    """Number of bytes of the files in directory."""
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files)
+
+
+class _DiskCache:
+    """Entries stored as directories on local disk, evicted in least recently used order."""
+
+    # file in each entry holding the value, its modification time is the time the entry was last used
+    _marker = "value"
+
+    def __init__(self, directory: str, max_size: Optional[int] = None, max_entries: Optional[int] = None):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+        # size of the entries, for eviction
+        self._sizes: Dict[str, int] = {key: _size(os.path.join(directory, key)) for key in os.listdir(directory)
+                                       if os.path.isfile(os.path.join(directory, key, self._marker))}
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def size(self) -> int:
+        """Number of bytes stored."""
+        return sum(self._sizes.values())
+
+    def _touch(self, key: str) -> None:
+        """Mark entry as recently used."""
+        os.utime(os.path.join(self.directory, key, self._marker))
+
+    def _commit(self, key: str, tmp: str) -> None:
+        """Move entry written to temporary directory in place, and evict entries if the cache is full."""
+        try:
+            os.replace(tmp, os.path.join(self.directory, key))
+        except OSError:
+            # entry added by another process meanwhile
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self._sizes[key] = _size(os.path.join(self.directory, key))
+        self._evict()
+
+    def _full(self) -> bool:
+        if self.max_size is not None and self.size > self.max_size:
+            return True
+
+        return self.max_entries is not None and len(self._sizes) > self.max_entries
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the limits are satisfied."""
+        if not self._full():
+            return
+
+        def last_used(key: str) -> float:
+            try:
+                return os.path.getmtime(os.path.join(self.directory, key, self._marker))
+            except OSError:
+                return 0.
+
+        for key in sorted(self._sizes, key=last_used):
+            if not self._full():
+                break
+
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            del self._sizes[key]
+            logger.debug(f"Evicted entry '{key}' from cache.")
+
+
+class CommandCache(_DiskCache):
+    """
+    Cache of command responses and output files on local disk, keyed on the content of the inputs of the command.
+
+    The key is a hash of the command, the environmental variables `env_keys` and the names and content of the input
+    files in the work directory. On a hit, the output files are copied to the work directory and the response is
+    returned without executing the command. Only responses with status 'completed' are cached. Commands in work
+    directories without input files are not cached, since nothing tells their results apart.
+
+    Parameters
+    ----------
+    directory : str
+        Directory in which the cache is stored, created if it does not exist.
+    inputs : list
+        Glob patterns, relative to the work directory, of the files the command reads, e.g. `["*.inp", "mesh/**"]`.
+    outputs : list, optional
+        Glob patterns, relative to the work directory, of the files the command writes and which are restored on a
+        hit, e.g. `["*.out", "log.txt"]`.
+    env_keys : list, optional
+        Environmental variables affecting the result of the command.
+    max_size : int, optional
+        Maximum number of bytes stored. The least recently used entries are evicted when exceeded. Default is no limit.
+    max_entries : int, optional
+        Maximum number of entries stored. Default is no limit.
+
+    Notes
+    -----
+    Files that are both read and written by the command are hashed before the command executes.
+
+    """
+
+    _marker = "response.json"
+
+    def __init__(self, directory: str, inputs: Iterable[str], outputs: Iterable[str] = (),
+                 env_keys: Iterable[str] = (), max_size: Optional[int] = None, max_entries: Optional[int] = None):
+        super().__init__(directory, max_size=max_size, max_entries=max_entries)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.env_keys = list(env_keys)
+
+    def key(self, command: str, path: str, env: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """
+        Key of command executed in work directory.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        path : str
+            Work directory
+        env : dict, optional
+            Environmental variables passed to the command, in addition to the environment of this process.
+
+        Returns
+        -------
+        str
+            Hex digest, None if no input files match in the work directory.
+
+        """
+        inputs = _match(path, self.inputs)
+        if not inputs:
+            return None
+
+        environment = dict(os.environ, **env) if env is not None else os.environ
+        content = dict(command=command, env={k: environment.get(k) for k in self.env_keys},
+                       inputs=[(f, _hash_file(os.path.join(path, f))) for f in inputs])
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str, path: str) -> Optional["ResponseDict"]:
+        """
+        Restore the output files of cached entry to work directory.
+
+        Parameters
+        ----------
+        key : str
+            Key, see `key()`
+        path : str
+            Work directory
+
+        Returns
+        -------
+        ResponseDict
+            Cached response, None on a miss.
+
+        """
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, self._marker)) as f:
+                response = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        files = os.path.join(entry, "files")
+        for f in _match(files, ["**"]):
+            os.makedirs(os.path.dirname(os.path.join(path, f)), exist_ok=True)
+            shutil.copy2(os.path.join(files, f), os.path.join(path, f))
+
+        self._touch(key)
+
+        response["path"] = path
+        response["cached"] = True
+        response["msg"] = f"{response.get('msg')} Restored from cache."
+        return response
+
+    def put(self, key: str, response: "ResponseDict") -> None:
+        """
+        Store response and output files of completed command.
+
+        Parameters
+        ----------
+        key : str
+            Key, see `key()`, computed before the command executed
+        response : ResponseDict
+            Response of the command
+
+        """
+        if response.get("status") != "completed" or key in self._sizes:
+            return
+
+        # write to a temporary directory, then move it in place
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp")
+        try:
+            path = response.get("path")
+            for f in _match(path, self.outputs):
+                os.makedirs(os.path.dirname(os.path.join(tmp, "files", f)), exist_ok=True)
+                shutil.copy2(os.path.join(path, f), os.path.join(tmp, "files", f))
+
+            with open(os.path.join(tmp, self._marker), "w") as f:
+                json.dump(response, f, indent=2, default=str)
+        except OSError as e:
+            logger.warning(f"Could not cache response of task in '{response.get('path')}': {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self._commit(key, tmp)
+
+    def skip_cached(self, tasks: Iterable[CommandTask], skipped: Deque[Tuple[int, "ResponseDict"]],
+                    keys: Dict[int, str], env: Optional[Dict[str, str]] = None) -> Iterator[CommandTask]:
+        """
+        Filter out tasks with cached results, lazily.
+
+        Parameters
+        ----------
+        tasks : iterable
+            Tasks as yielded by `dtm.scheduling.command_tasks()`
+        skipped : deque
+            Index and cached response of the tasks filtered out are appended to it.
+        keys : dict
+            Key of each task not filtered out is added to it, by index.
+        env : dict, optional
+            Environmental variables passed to the commands
+
+        Yields
+        ------
+        tuple
+            Tasks without cached results
+
+        """
+        for requirement, (i, c, p) in tasks:
+            try:
+                key = self.key(c, p, env=env)
+            except OSError as e:
+                logger.debug("\t" + f"Could not hash inputs of task in '{p}', not cached: {e}")
+                yield requirement, (i, c, p)
+                continue
+
+            if key is None:
+                logger.debug("\t" + f"No input files of task in '{p}', not cached.")
+                yield requirement, (i, c, p)
+                continue
+
+            response = self.get(key, p)
+            if response is not None:
+                logger.debug("\t" + f"Restored response of command '{c}' in '{p}' from cache.")
+                skipped.append((i, response))
+            else:
+                keys[i] = key
+                yield requirement, (i, c, p)
+
+
+def _source_version(function: Callable) -> str:
+    """Digest of the source code of function, or of its byte code if the source is not available."""
+    try:
+        source = inspect.getsource(function).encode()
+    except (OSError, TypeError):
+        code = getattr(function, "__code__", None)
+        source = code.co_code + repr(code.co_consts).encode() if code is not None else b""
+
+    return hashlib.sha256(source).hexdigest()
+
+
+class FunctionCache(_DiskCache):
+    """
+    Memoization of function results on local disk, persisting across sessions.
+
+    The key is a hash of the qualified name and source code of the function and its pickled arguments. Hits are served
+    in the parent process, without dispatching the function to the workers.
+
+    Parameters
+    ----------
+    directory : str
+        Directory in which the cache is stored, created if it does not exist.
+    max_size : int, optional
+        Maximum number of bytes stored. The least recently used entries are evicted when exceeded. Default is no limit.
+    max_entries : int, optional
+        Maximum number of entries stored. Default is no limit.
+
+    Notes
+    -----
+    Only pure functions, whose result depends on nothing but their arguments, should be cached. Changing the source
+    code of the function invalidates its entries, but changes to functions it calls do not. Arguments must be picklable
+    to the same bytes when equal, e.g. sets and dicts built in different order may give different keys. Functions
+    raising exceptions are not cached.
+
+    """
+
+    _marker = "result.pickle"
+
+    def key(self, function: Callable, args: Iterable[Any] = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Key of function called with arguments.
+
+        Parameters
+        ----------
+        function : callable
+            Function
+        args : list, optional
+            Function positional arguments
+        kwargs : dict, optional
+            Function keyword arguments
+
+        Returns
+        -------
+        str
+            Hex digest
+
+        Raises
+        ------
+        pickle.PicklingError
+            If the arguments cannot be pickled.
+
+        """
+        h = hashlib.sha256()
+        h.update(f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}".encode())
+        h.update(_source_version(function).encode())
+        h.update(pickle.dumps((tuple(args), sorted((kwargs or dict()).items())), protocol=4))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Cached result.
+
+        Parameters
+        ----------
+        key : str
+            Key, see `key()`
+
+        Returns
+        -------
+        tuple
+            Whether the key was found, and the result.
+
+        """
+        try:
+            with open(os.path.join(self.directory, key, self._marker), "rb") as f:
+                result = pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            return False, None
+
+        self._touch(key)
+        return True, result
+
+    def put(self, key: str, result: Any) -> None:
+        """
+        Store result.
+
+        Parameters
+        ----------
+        key : str
+            Key, see `key()`
+        result : object
+            Function result, must be picklable
+
+        """
+        if key in self._sizes:
+            return
+
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp")
+        try:
+            with open(os.path.join(tmp, self._marker), "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not cache function result: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self._commit(key, tmp)
@@ -0,0 +1,209 @@
+"""
+Module with cancellation of running batches, on request or when too many tasks fail
+"""
+import multiprocessing as mp
+import os
+import threading
+from typing import TYPE_CHECKING, Optional, List, Callable, Union
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+class _Cancelled:
+    """Result of a function that was cancelled before it completed."""
+
+    def __repr__(self) -> str:
+        return "CANCELLED"
+
+    def __reduce__(self) -> str:
+        return "CANCELLED"
+
+
+# result of functions cancelled before they completed, compare with `is`
+CANCELLED = _Cancelled()
+
+
+class CancelToken:
+    """
+    Handle to cancel a running batch, e.g. from another thread or a signal handler.
+
+    When cancelled, no more tasks are dispatched, running tasks are terminated and the batch returns the results of the
+    completed tasks. Commands not completed get a response with status 'cancelled', functions the result `CANCELLED`.
+
+    Examples
+    --------
+    >>> token = CancelToken()
+    >>> threading.Timer(3600., token.cancel).start()
+    >>> responses = subprocess_commands(commands, paths, cancel=token)
+
+    Notes
+    -----
+    A token stays cancelled, use a new token for each batch.
+
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = list()
+
+    def __repr__(self) -> str:
+        return f"CancelToken(cancelled={self.cancelled})"
+
+    @property
+    def cancelled(self) -> bool:
+        """True if cancellation was requested."""
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "Cancelled on request.") -> None:
+        """
+        Request cancellation of the batch.
+
+        Parameters
+        ----------
+        reason : str, optional
+            Reason for cancelling, included in the responses of the cancelled tasks
+
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+
+        logger.debug(f"Batch cancelled: {reason}")
+        for callback in callbacks:
+            callback()
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Call `callback()` when cancelled, right away if already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+
+        callback()
+
+    def unsubscribe(self, callback: Callable[[], None]) -> None:
+        """Stop calling `callback()` when cancelled."""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+class FailFast:
+    """
+    Policy cancelling a batch of commands when too many tasks fail, e.g. because the input is broken.
+
+    Parameters
+    ----------
+    failures : int, optional
+        Cancel when this number of tasks have failed.
+    ratio : float, optional
+        Cancel when the fraction of failed tasks among the finished tasks exceeds `ratio`, once at least `min_tasks`
+        tasks have finished.
+    min_tasks : int, optional
+        Number of finished tasks before `ratio` is considered.
+
+    Notes
+    -----
+    Tasks fail if their final status, after retries, is not 'completed'.
+
+    """
+
+    def __init__(self, failures: Optional[int] = None, ratio: Optional[float] = None, min_tasks: int = 10):
+        if failures is None and ratio is None:
+            raise ValueError("Specify either the number of failures or the failure ratio, or both.")
+
+        self.failures = failures
+        self.ratio = ratio
+        self.min_tasks = min_tasks
+
+    def __repr__(self) -> str:
+        return f"FailFast(failures={self.failures}, ratio={self.ratio}, min_tasks={self.min_tasks})"
+
+    def exceeded(self, failed: int, finished: int) -> Optional[str]:
+        """
+        Check if the threshold is exceeded.
+
+        Parameters
+        ----------
+        failed : int
+            Number of failed tasks
+        finished : int
+            Number of finished tasks, failed or not
+
+        Returns
+        -------
+        str
+            Reason for cancelling, None if the threshold is not exceeded.
+
+        """
+        if self.failures is not None and failed >= self.failures:
+            return f"{failed} tasks failed."
+
+        if self.ratio is not None and finished >= self.min_tasks and failed > self.ratio * finished:
+            return f"{failed} of {finished} tasks failed."
+
+        return None
+
+
+class Failures:
+    """
+    Count failed tasks of a batch and cancel it according to a fail-fast policy.
+
+    Parameters
+    ----------
+    policy : int or FailFast
+        Fail-fast policy, an integer is the number of failures
+    cancel : CancelToken
+        Token cancelling the batch
+
+    """
+
+    def __init__(self, policy: Union[int, FailFast], cancel: CancelToken):
+        self.policy = policy if isinstance(policy, FailFast) else FailFast(failures=policy)
+        self.cancel = cancel
+        self.failed = 0
+        self.finished = 0
+
+    def record(self, response: "ResponseDict") -> None:
+        """Record the final response of a task, cancelling the batch if the threshold is exceeded."""
+        self.finished += 1
+        if response.get("status") != "completed":
+            self.failed += 1
+
+        reason = self.policy.exceeded(self.failed, self.finished)
+        if reason is not None:
+            logger.warning(f"Cancelling batch, {reason}")
+            self.cancel.cancel(f"Fail fast, {reason}")
+
+
+def cancelled_response(command: str, path: str, reason: Optional[str]) -> "ResponseDict":
+    """
+    Response of command cancelled before it completed.
+
+    Parameters
+    ----------
+    command : str
+        Command
+    path : str
+        Work directory
+    reason : str
+        Reason for cancelling
+
+    Returns
+    -------
+    ResponseDict
+        Response with status 'cancelled'
+
+    """
+    return dict(pid=os.getpid(), ppid=os.getppid(), path=path, returncode=1, status='cancelled', output=None,
+                msg=f'Command "{command}" was cancelled. {reason}')
@@ -0,0 +1,243 @@
+"""
+Module with adaptive control of the number of concurrently running tasks from the load of the host
+"""
+import multiprocessing as mp
+import os
+import time
+from typing import Optional, Dict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# seconds between adjustments of the number of concurrent tasks
+ADJUST_INTERVAL = 5.
+
+
+def cpu_count() -> int:
+    """Number of CPUs available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def load_average() -> Optional[float]:
+    """
+    Load average of the host over the last minute, see /proc/loadavg.
+
+    Returns
+    -------
+    float
+        Average number of runnable (and uninterruptible) processes, None if not available on this platform.
+
+    """
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def memory_available(filename: str = "/proc/meminfo") -> Optional[float]:
+    """
+    Fraction of the physical memory available for new processes without swapping, see /proc/meminfo.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Path to the meminfo file
+
+    Returns
+    -------
+    float
+        Ratio of MemAvailable to MemTotal, None if not available on this platform.
+
+    """
+    info: Dict[str, int] = dict()
+    try:
+        with open(filename) as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                info[key] = int(value.split()[0])
+    except (OSError, ValueError):
+        return None
+
+    if not info.get("MemTotal") or "MemAvailable" not in info:
+        return None
+
+    return info["MemAvailable"] / info["MemTotal"]
+
+
+def pressure(resource: str, directory: str = "/proc/pressure") -> Optional[float]:
+    """
+    Pressure stall information (PSI) of resource, the share of time some tasks were stalled waiting for it.
+
+    Parameters
+    ----------
+    resource : str
+        'cpu', 'memory' or 'io'
+    directory : str, optional
+        Directory with the pressure files
+
+    Returns
+    -------
+    float
+        Percentage of time over the last 10 seconds ("some avg10"), None if PSI is not available (Linux 4.20 or later
+        with PSI enabled).
+
+    """
+    try:
+        with open(os.path.join(directory, resource)) as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[0] == "some":
+                    return float(dict(field.split("=") for field in fields[1:])["avg10"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return None
+
+
+class AdaptiveConcurrency:
+    """
+    Number of concurrently running tasks adapted to the load and memory pressure of the host.
+
+    The limit starts at `minimum` and doubles every `interval` seconds while the host has headroom (slow start). Once
+    the host is overloaded, the limit is raised by one task at a time while there is headroom and lowered by one task
+    when the CPUs are saturated. When memory runs short the limit is halved, to back off before the host swaps.
+
+    Parameters
+    ----------
+    minimum : int, optional
+        Minimum number of concurrent tasks
+    maximum : int, optional
+        Maximum number of concurrent tasks. Default the number of CPUs.
+    interval : float, optional
+        Number of seconds between adjustments. Running tasks take time to affect the load.
+    load : float, optional
+        Target load average per CPU. Only used if CPU pressure (PSI) is not available.
+    cpu_pressure : float, optional
+        Percentage of time tasks may stall waiting for CPU, see `pressure()`.
+    memory_pressure : float, optional
+        Percentage of time tasks may stall waiting for memory, e.g. reclaim or swap-in.
+    io_pressure : float, optional
+        Percentage of time tasks may stall waiting for I/O. Default is to disregard I/O.
+    memory_reserve : float, optional
+        Fraction of the physical memory kept available.
+
+    Notes
+    -----
+    Running tasks are not stopped when the limit is lowered, fewer tasks are started as they complete.
+
+    Examples
+    --------
+    >>> concurrency = AdaptiveConcurrency(minimum=2, maximum=32)
+    >>> responses = subprocess_commands(["solve"], paths, concurrency=concurrency)
+
+    """
+
+    def __init__(self, minimum: int = 1, maximum: Optional[int] = None, interval: float = ADJUST_INTERVAL,
+                 load: float = 1., cpu_pressure: float = 20., memory_pressure: float = 5.,
+                 io_pressure: Optional[float] = None, memory_reserve: float = 0.1):
+        self.maximum = maximum if maximum is not None else cpu_count()
+        if not 1 <= minimum <= self.maximum:
+            logger.error(f"The minimum number of concurrent tasks must be between 1 and {self.maximum}, not {minimum}.")
+            raise ValueError(f"The minimum number of concurrent tasks must be between 1 and {self.maximum}, not "
+                             f"{minimum}.")
+
+        self.minimum = minimum
+        self.interval = interval
+        self.load = load
+        self.cpu_pressure = cpu_pressure
+        self.memory_pressure = memory_pressure
+        self.io_pressure = io_pressure
+        self.memory_reserve = memory_reserve
+        self.limit = minimum
+        self.next_update = time.monotonic() + interval
+        self._slow_start = True
+
+    def __repr__(self) -> str:
+        return f"AdaptiveConcurrency(limit={self.limit}, minimum={self.minimum}, maximum={self.maximum})"
+
+    @staticmethod
+    def sample() -> Dict[str, Optional[float]]:
+        """
+        Measure the load of the host.
+
+        Returns
+        -------
+        dict
+            Load average per CPU, fraction of memory available and the CPU, memory and I/O pressure. Measures not
+            available on this platform are None.
+
+        """
+        load = load_average()
+        return dict(load=load / cpu_count() if load is not None else None, memory=memory_available(),
+                    cpu_pressure=pressure("cpu"), memory_pressure=pressure("memory"), io_pressure=pressure("io"))
+
+    def adjust(self, sample: Dict[str, Optional[float]], running: int) -> int:
+        """
+        Adjust the limit to the load of the host.
+
+        Parameters
+        ----------
+        sample : dict
+            Load of the host, see `sample()`
+        running : int
+            Number of tasks running
+
+        Returns
+        -------
+        int
+            Maximum number of concurrent tasks
+
+        """
+        def above(value: Optional[float], threshold: Optional[float]) -> bool:
+            return value is not None and threshold is not None and value > threshold
+
+        if above(sample.get("memory_pressure"), self.memory_pressure) or \
+                (sample.get("memory") is not None and sample.get("memory") < self.memory_reserve):
+            limit = self.limit // 2
+            reason = "memory pressure"
+        elif above(sample.get("cpu_pressure"), self.cpu_pressure) or \
+                above(sample.get("io_pressure"), self.io_pressure) or \
+                (sample.get("cpu_pressure") is None and above(sample.get("load"), self.load)):
+            limit = self.limit - 1
+            reason = "saturation"
+        elif running >= self.limit:
+            # the limit is reached and the host has headroom
+            limit = 2 * self.limit if self._slow_start else self.limit + 1
+            reason = "headroom"
+        else:
+            return self.limit
+
+        limit = max(self.minimum, min(limit, self.maximum))
+        if reason != "headroom":
+            self._slow_start = False
+
+        if limit != self.limit:
+            logger.debug(f"Concurrent tasks {self.limit} -> {limit} due to {reason}, host load {sample}.")
+            self.limit = limit
+
+        return self.limit
+
+    def update(self, running: int) -> int:
+        """
+        Maximum number of concurrent tasks, adjusted to the load of the host at most every `interval` seconds.
+
+        Parameters
+        ----------
+        running : int
+            Number of tasks running
+
+        Returns
+        -------
+        int
+            Maximum number of concurrent tasks
+
+        """
+        now = time.monotonic()
+        if now >= self.next_update:
+            self.next_update = now + self.interval
+            self.adjust(self.sample(), running)
+
+        return self.limit
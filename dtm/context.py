@@ -0,0 +1,134 @@
+"""
+Module with state kept by each worker process across tasks
+"""
+import multiprocessing as mp
+import os
+import threading
+from typing import Optional, Callable, Any, Dict, Iterable, Iterator
+
+from .process import terminate_on_signal, set_owner
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+class WorkerContext:
+    """
+    Resources cached by a worker process, e.g. imported modules, lookup tables or open connections, shared by all
+    tasks the worker executes.
+
+    Resources are set by the worker initializer or created on first use with `cached()`. Each process has its own
+    context, see `worker_context()`.
+
+    Examples
+    --------
+    >>> def setup(filename):
+    ...     worker_context()["table"] = load_table(filename)
+    >>> def lookup(key):
+    ...     return worker_context()["table"][key]
+    >>> multiprocess_functions(len(keys) * [lookup], args=[[k] for k in keys], initializer=setup,
+    ...                        initargs=("table.bin",))
+
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._resources: Dict[str, Any] = dict()
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        return f"WorkerContext(pid={self.pid}, resources={list(self._resources)})"
+
+    def __getitem__(self, key: str) -> Any:
+        return self._resources[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._resources[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._resources[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._resources
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._resources)
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get resource, `default` if not set."""
+        return self._resources.get(key, default)
+
+    def cached(self, key: str, factory: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Get resource, creating it on first use in this process.
+
+        Parameters
+        ----------
+        key : str
+            Name of the resource
+        factory : callable
+            Function creating the resource, called as `factory(*args, **kwargs)` if the resource is not set.
+
+        Returns
+        -------
+        object
+            Resource
+
+        """
+        with self._lock:
+            # threads of the process share the context, the resource is created once
+            if key not in self._resources:
+                logger.debug(f"Creating resource '{key}' in worker process {self.pid}.")
+                self._resources[key] = factory(*args, **kwargs)
+
+            return self._resources[key]
+
+
+_context: Optional[WorkerContext] = None
+
+
+def worker_context() -> WorkerContext:
+    """
+    Context of the current process.
+
+    Returns
+    -------
+    WorkerContext
+        Resources cached by this process. A forked process starts with an empty context, not the context of its parent.
+
+    """
+    global _context
+    if _context is None or _context.pid != os.getpid():
+        _context = WorkerContext()
+
+    return _context
+
+
+def initialize(initializer: Optional[Callable[..., None]] = None, initargs: Iterable[Any] = (),
+               owner: Optional[object] = None) -> None:
+    """
+    Initialize worker process, called once when the worker starts.
+
+    Worker processes terminate the commands they run when the pool is terminated, see
+    `dtm.process.terminate_on_signal()`.
+
+    Parameters
+    ----------
+    initializer : callable, optional
+        Function setting up the worker, called as `initializer(*initargs)`. It may store resources in
+        `worker_context()`.
+    initargs : tuple, optional
+        Arguments to `initializer`
+    owner : object, optional
+        Owner of the commands run by a worker thread, see `dtm.process.set_owner()`
+
+    """
+    context = worker_context()
+    terminate_on_signal()
+    set_owner(owner)
+    if initializer is not None:
+        initializer(*initargs)
+        logger.debug(f"Initialized worker process {context.pid}.")
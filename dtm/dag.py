@@ -0,0 +1,254 @@
+"""
+Module with execution of tasks (commands and functions) organized in a dependency graph
+"""
+import multiprocessing as mp
+import os
+from collections import deque
+from typing import Optional, List, Callable, Any, Dict, Iterable, Tuple
+
+from .main import Executor, ResponseDict, subprocess_command
+from .tracking import CompletionTracker
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+class _Task:
+    """Node in the task graph."""
+
+    def __init__(self, name: str, function: Callable, args: Tuple, kwargs: Dict[str, Any], depends: List[str],
+                 command: bool):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.depends = depends
+        self.command = command
+        self.dependents: List[str] = list()
+
+
+class TaskGraph:
+    """
+    Tasks, either commands or Python functions, with dependencies on other tasks.
+
+    Each task is dispatched as soon as all the tasks it depends on have completed successfully. If a task fails, all
+    tasks depending on it, directly or indirectly, are skipped.
+
+    Examples
+    --------
+    >>> graph = TaskGraph()
+    >>> for p in paths:
+    ...     graph.add_command(f"mesh {p}", "mesh", path=p)
+    ...     graph.add_command(f"solve {p}", "solve", path=p, depends=[f"mesh {p}"])
+    >>> graph.add_function("aggregate", aggregate, args=(paths,), depends=[f"solve {p}" for p in paths])
+    >>> results = graph.run(nprocesses=8)
+
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, _Task] = dict()
+        self.status: Dict[str, str] = dict()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _add(self, task: _Task) -> str:
+        if task.name in self._tasks:
+            logger.error(f"A task named '{task.name}' already exists.")
+            raise ValueError(f"A task named '{task.name}' already exists.")
+
+        self._tasks[task.name] = task
+        return task.name
+
+    def add_command(self, name: str, command: str, path: Optional[str] = None, depends: Iterable[str] = (),
+                    shell: bool = False, env: Optional[Dict[str, str]] = None, pipe: bool = False,
+                    timeout: Optional[int] = None) -> str:
+        """
+        Add command to the graph, see `subprocess_command()` for a description of the command parameters.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the task
+        command : str
+            Command str
+        path : str, optional
+            Directory in which to execute program, current work directory by default
+        depends : list, optional
+            Names of the tasks that must complete before this task is dispatched
+        shell : bool, optional
+            Run the command within a shell
+        env : dict, optional
+            Environmental variables passed to program
+        pipe : bool, optional
+            Pipe standard out/err from subprocesses to parent process
+        timeout : int, optional
+            Number of seconds before terminating the process
+
+        Returns
+        -------
+        str
+            Name of the task
+
+        Notes
+        -----
+        The command task has failed unless the response status is 'completed'.
+
+        """
+        kwargs = dict(path=path, shell=shell, env=env, pipe=pipe, timeout=timeout)
+        return self._add(_Task(name, subprocess_command, (command,), kwargs, list(depends), command=True))
+
+    def add_function(self, name: str, function: Callable, args: Iterable[Any] = (),
+                     kwargs: Optional[Dict[str, Any]] = None, depends: Iterable[str] = ()) -> str:
+        """
+        Add function to the graph.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the task
+        function : callable
+            Function to execute, must be picklable
+        args : list, optional
+            Function positional arguments
+        kwargs : dict, optional
+            Function keyword arguments
+        depends : list, optional
+            Names of the tasks that must complete before this task is dispatched
+
+        Returns
+        -------
+        str
+            Name of the task
+
+        Notes
+        -----
+        The function task has failed if it raises an exception.
+
+        """
+        kwargs = kwargs if kwargs is not None else dict()
+        return self._add(_Task(name, function, tuple(args), kwargs, list(depends), command=False))
+
+    def _validate(self) -> None:
+        """Check that dependencies exist and the graph has no cycles."""
+        for task in self._tasks.values():
+            task.dependents = list()
+
+        for task in self._tasks.values():
+            for d in task.depends:
+                if d not in self._tasks:
+                    logger.error(f"Task '{task.name}' depends on unknown task '{d}'.")
+                    raise ValueError(f"Task '{task.name}' depends on unknown task '{d}'.")
+                self._tasks[d].dependents.append(task.name)
+
+        # topological sort (Kahn's algorithm) to detect cycles
+        indegree = {name: len(task.depends) for name, task in self._tasks.items()}
+        queue = deque(name for name, n in indegree.items() if n == 0)
+        visited = 0
+        while queue:
+            name = queue.popleft()
+            visited += 1
+            for d in self._tasks[name].dependents:
+                indegree[d] -= 1
+                if indegree[d] == 0:
+                    queue.append(d)
+
+        if visited != len(self._tasks):
+            cycle = sorted(name for name, n in indegree.items() if n > 0)
+            logger.error(f"The task graph has a cycle involving the tasks {cycle}.")
+            raise ValueError(f"The task graph has a cycle involving the tasks {cycle}.")
+
+    def _skip(self, name: str, reason: str, results: Dict[str, Any], tracker: CompletionTracker) -> None:
+        """Skip task and all its descendants, they count as completed in the progress reports of `tracker`."""
+        queue = deque([name])
+        while queue:
+            n = queue.popleft()
+            if n in self.status:
+                continue
+
+            task = self._tasks[n]
+            self.status[n] = 'skipped'
+            if task.command:
+                response: ResponseDict = dict(pid=os.getpid(), ppid=os.getppid(),
+                                              path=task.kwargs.get('path') or os.getcwd(),
+                                              returncode=1, status='skipped', output=None,
+                                              msg=f'Task "{n}" skipped because dependency "{reason}" failed.')
+                results[n] = response
+            else:
+                results[n] = None
+
+            callback, _ = tracker.register()
+            callback(None)
+
+            logger.debug("\t" + f'Task "{n}" skipped because dependency "{reason}" failed.')
+            queue.extend(task.dependents)
+
+    def run(self, executor: Optional[Executor] = None, nprocesses: Optional[int] = None,
+            progress: Optional[Callable[[int, int], None]] = None, progress_interval: float = 15.) -> Dict[str, Any]:
+        """
+        Execute the tasks in the graph.
+
+        Parameters
+        ----------
+        executor : Executor, optional
+            Executor to dispatch tasks to. Default is to start a new executor for this run.
+        nprocesses: int, optional
+            Choose the number of concurrent processes if a new executor is started. Default the number of CPUs, see
+            ´os.cpu_count()´
+        progress : callable, optional
+            Progress hook called as `progress(pending, total)` while waiting for tasks to complete. Default is to log
+            the number of pending tasks.
+        progress_interval : float, optional
+            Number of seconds between progress reports.
+
+        Returns
+        -------
+        dict
+            Result of each task by name. The result of a command task is its response, the result of a function task
+            is its return value, or the exception raised if it failed. Skipped function tasks have result None. The
+            status of each task ('completed', 'error', 'timeout' or 'skipped') is available in `status`.
+
+        """
+        if executor is None:
+            with Executor(nprocesses=nprocesses) as executor:
+                return self.run(executor=executor, progress=progress, progress_interval=progress_interval)
+
+        self._validate()
+        self.status = dict()
+        results: Dict[str, Any] = dict()
+        names = list(self._tasks)
+        index = {name: i for i, name in enumerate(names)}
+        remaining = {name: len(task.depends) for name, task in self._tasks.items()}
+        tracker = CompletionTracker(progress=progress, interval=progress_interval, total=len(names))
+
+        def dispatch(name: str) -> None:
+            task = self._tasks[name]
+            callback, error_callback = tracker.register(index[name])
+            executor.apply_async(task.function, args=task.args, kwds=task.kwargs, callback=callback,
+                                 error_callback=error_callback)
+
+        logger.debug(f"Dispatching {len(names)} tasks in dependency order...")
+        for name in names:
+            if remaining[name] == 0:
+                dispatch(name)
+
+        for i, failed, result in tracker.outcomes():
+            name = names[i]
+            task = self._tasks[name]
+            results[name] = result
+            if failed:
+                self.status[name] = 'error'
+                logger.debug("\t" + f'Task "{name}" raised {result!r}.')
+            else:
+                self.status[name] = result.get('status') if task.command else 'completed'
+
+            # dispatch dependents that have all their dependencies completed, skip them if this task failed
+            for d in task.dependents:
+                if self.status[name] != 'completed':
+                    self._skip(d, name, results, tracker)
+                else:
+                    remaining[d] -= 1
+                    if remaining[d] == 0 and d not in self.status:
+                        dispatch(d)
+
+        return results
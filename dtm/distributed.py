@@ -0,0 +1,387 @@
+"""
+Module with execution of commands on many hosts, by worker agents pulling tasks from a broker over TCP
+"""
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+from typing import Optional, List, Callable, Any, Dict, Iterable, Iterator, Tuple, Deque
+
+from .main import ResponseDict, subprocess_command
+from .scheduling import command_tasks, in_order
+from .tracking import log_progress
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# number of seconds a task is leased to a worker without hearing from it, before the task is handed to another worker
+LEASE_DURATION = 60.
+
+# number of seconds workers wait for a task before checking if the broker is closed
+POLL_INTERVAL = 1.
+
+# task as handed to workers: key, index, command, work directory and options to `subprocess_command()`
+BrokerTask = Tuple[int, int, str, str, Dict[str, Any]]
+
+
+class TaskBoard:
+    """
+    Tasks waiting for and leased to workers, and results waiting for the coordinator. Lives in the broker server
+    process, and is accessed by the coordinator and the workers through proxies.
+
+    Parameters
+    ----------
+    lease : float, optional
+        Number of seconds a task is leased to a worker without hearing from it. Tasks with expired leases, e.g. of a
+        worker that died, are handed to another worker.
+
+    """
+
+    def __init__(self, lease: float = LEASE_DURATION):
+        self.lease = lease
+        self._condition = threading.Condition()
+        self._queue: Deque[BrokerTask] = deque()
+        self._leases: Dict[int, Tuple[BrokerTask, str, float]] = dict()
+        self._results: Deque[Tuple[int, ResponseDict]] = deque()
+        self._key = 0
+        self._closed = False
+
+    def _expire(self) -> None:
+        """Return tasks with expired leases to the front of the queue."""
+        now = time.monotonic()
+        for key, (task, worker, deadline) in list(self._leases.items()):
+            if deadline < now:
+                logger.warning(f"Lease of task {task[1]} to worker '{worker}' expired, handing it to another worker.")
+                del self._leases[key]
+                self._queue.appendleft(task)
+
+    def add(self, tasks: List[Tuple[int, str, str]], options: Dict[str, Any]) -> None:
+        """Add tasks (index, command, work directory) executed with options to `subprocess_command()`."""
+        with self._condition:
+            for index, command, path in tasks:
+                self._key += 1
+                self._queue.append((self._key, index, command, path, options))
+            self._condition.notify_all()
+
+    def clear(self) -> None:
+        """Remove waiting and leased tasks and pending results, results of leased tasks are ignored."""
+        with self._condition:
+            self._queue.clear()
+            self._leases.clear()
+            self._results.clear()
+
+    def take(self, worker: str, timeout: float = POLL_INTERVAL) -> Optional[BrokerTask]:
+        """Lease the next task to worker, None if no task is available within `timeout` seconds."""
+        with self._condition:
+            self._expire()
+            if not self._queue and not self._closed:
+                self._condition.wait(timeout)
+                self._expire()
+
+            if not self._queue or self._closed:
+                return None
+
+            task = self._queue.popleft()
+            self._leases[task[0]] = (task, worker, time.monotonic() + self.lease)
+            return task
+
+    def heartbeat(self, worker: str) -> float:
+        """Renew the leases of the tasks executed by worker, returns the lease duration."""
+        with self._condition:
+            deadline = time.monotonic() + self.lease
+            for key, (task, w, _) in list(self._leases.items()):
+                if w == worker:
+                    self._leases[key] = (task, w, deadline)
+
+            return self.lease
+
+    def complete(self, key: int, response: ResponseDict) -> None:
+        """Report the response of a leased task, later reports of the same task are ignored."""
+        with self._condition:
+            if key not in self._leases:
+                return
+
+            task, _, _ = self._leases.pop(key)
+            self._results.append((task[1], response))
+            self._condition.notify_all()
+
+    def collect(self, timeout: float) -> List[Tuple[int, ResponseDict]]:
+        """Remove and return the results reported, waiting up to `timeout` seconds for at least one."""
+        with self._condition:
+            self._expire()
+            if not self._results:
+                self._condition.wait(timeout)
+
+            results = list(self._results)
+            self._results.clear()
+            return results
+
+    def close(self) -> None:
+        """Tell the workers to stop."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def closed(self) -> bool:
+        """Check if the workers are told to stop."""
+        return self._closed
+
+
+# task board of the broker server process
+_board: Optional[TaskBoard] = None
+
+
+def _create_board(lease: float) -> None:
+    global _board
+    _board = TaskBoard(lease=lease)
+
+
+def _get_board() -> TaskBoard:
+    return _board
+
+
+class _BrokerManager(BaseManager):
+    pass
+
+
+class _WorkerManager(BaseManager):
+    pass
+
+
+_BrokerManager.register("board", callable=_get_board)
+_WorkerManager.register("board")
+
+
+class Broker:
+    """
+    Coordinator handing out commands to worker agents on any number of hosts, and collecting their responses.
+
+    Worker agents connect to the broker over TCP, see `run_worker()`, and may join or leave at any time. The work
+    directories must be reachable by the same path on all hosts, e.g. on a shared file system.
+
+    Parameters
+    ----------
+    address : tuple, optional
+        Host name and port on which the broker listens. Default is all interfaces and a free port, see `address` for
+        the address the broker is listening on.
+    authkey : bytes
+        Secret key shared by the broker and the workers, authenticating the connections.
+    lease : float, optional
+        Number of seconds a task is leased to a worker without hearing from it, before it is handed to another worker.
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for tasks to complete. Default is to log the
+        number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+
+    Notes
+    -----
+    Responses carry the name of the host executing the command as `host`. The process ids are those on that host.
+
+    Examples
+    --------
+    >>> with Broker(address=("", 50000), authkey=b"secret") as broker:
+    ...     responses = broker.map_commands(["solve"], parse_path_file("paths.txt"))
+
+    and on each worker host
+
+    $ python -m dtm.distributed broker-host:50000 --authkey secret
+
+    """
+
+    def __init__(self, address: Tuple[str, int] = ("", 0), authkey: Optional[bytes] = None,
+                 lease: float = LEASE_DURATION, progress: Optional[Callable[[int, int], None]] = None,
+                 progress_interval: float = 15.):
+        if not authkey:
+            logger.error("Specify the secret key shared by the broker and the workers.")
+            raise ValueError("Specify the secret key shared by the broker and the workers.")
+
+        self.progress = progress if progress is not None else log_progress
+        self.progress_interval = progress_interval
+        self._manager = _BrokerManager(address=address, authkey=authkey)
+        self._manager.start(initializer=_create_board, initargs=(lease,))
+        self._board = self._manager.board()
+        logger.debug(f"Broker listening on {self.address}.")
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host name and port on which the broker is listening."""
+        return self._manager.address
+
+    def __enter__(self) -> "Broker":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def iter_commands(self, commands: Iterable[str], paths: Iterable[str], shell: bool = False,
+                      env: Optional[Dict[str, str]] = None, pipe: bool = False, timeout: Optional[int] = None,
+                      max_queued: Optional[int] = None) -> Iterator[Tuple[int, ResponseDict]]:
+        """
+        Execute commands on the workers, see `dtm.main.iter_subprocess_commands()` for a description of the
+        parameters.
+
+        Yields
+        ------
+        tuple
+            Index of the task in `paths` and the subprocess response, in order of completion
+
+        """
+        options = dict(shell=shell, env=env, pipe=pipe, timeout=timeout)
+        source = command_tasks(commands, paths)
+        outstanding = 0
+        total = 0
+        exhausted = False
+
+        def feed() -> None:
+            nonlocal outstanding, total, exhausted
+            tasks = list()
+            while not exhausted and (max_queued is None or outstanding + len(tasks) < max_queued):
+                try:
+                    _, task = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                tasks.append(task)
+
+            if tasks:
+                self._board.add(tasks, options)
+                outstanding += len(tasks)
+                total += len(tasks)
+
+        logger.debug("Handing out tasks to workers...")
+        try:
+            feed()
+            last_report = time.monotonic()
+            while outstanding or not exhausted:
+                for index, response in self._board.collect(self.progress_interval):
+                    outstanding -= 1
+                    yield index, response
+
+                feed()
+                if time.monotonic() - last_report >= self.progress_interval:
+                    self.progress(outstanding, total)
+                    last_report = time.monotonic()
+        finally:
+            # forget remaining tasks if the caller stops early
+            self._board.clear()
+
+    def map_commands(self, commands: Iterable[str], paths: Iterable[str], shell: bool = False,
+                     env: Optional[Dict[str, str]] = None, pipe: bool = False, timeout: Optional[int] = None,
+                     max_queued: Optional[int] = None) -> List[ResponseDict]:
+        """
+        Execute commands on the workers, see `iter_commands()` for a description of the parameters.
+
+        Returns
+        -------
+        list
+            Collection of subprocess response, in the order of `paths`.
+
+        """
+        return in_order(self.iter_commands(commands, paths, shell=shell, env=env, pipe=pipe, timeout=timeout,
+                                           max_queued=max_queued))
+
+    def shutdown(self) -> None:
+        """Tell the workers to stop and close the broker."""
+        # workers stop when they see the board closed or lose the connection to the broker
+        try:
+            self._board.close()
+        finally:
+            self._manager.shutdown()
+            logger.debug("Broker shut down.")
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, nprocesses: Optional[int] = None,
+               name: Optional[str] = None) -> int:
+    """
+    Worker agent executing commands handed out by a broker, until the broker is closed.
+
+    Parameters
+    ----------
+    address : tuple
+        Host name and port of the broker
+    authkey : bytes
+        Secret key shared by the broker and the workers
+    nprocesses : int, optional
+        Number of concurrent commands. Default the number of CPUs, see ´os.cpu_count()´
+    name : str, optional
+        Name of the worker, default host name and process id
+
+    Returns
+    -------
+    int
+        Number of tasks executed
+
+    """
+    nprocesses = nprocesses if nprocesses is not None else os.cpu_count()
+    name = name if name is not None else f"{socket.gethostname()}:{os.getpid()}"
+    host = socket.gethostname()
+
+    manager = _WorkerManager(address=address, authkey=authkey)
+    manager.connect()
+    board = manager.board()
+    logger.debug(f"Worker '{name}' connected to broker on {address}.")
+
+    stop = threading.Event()
+    executed = list()
+
+    def work() -> None:
+        try:
+            while not stop.is_set():
+                task = board.take(name, POLL_INTERVAL)
+                if task is None:
+                    if board.closed():
+                        break
+                    continue
+
+                key, index, command, path, options = task
+                try:
+                    response = subprocess_command(command, path=path, **options)
+                except Exception as e:
+                    # report the failure instead of dropping the task, which would fail likewise on every worker
+                    response = dict(pid=os.getpid(), ppid=os.getppid(), path=path, returncode=1, status='error',
+                                    output='', msg=f'Command "{command}" failed on worker \'{name}\': {e!r}')
+                    logger.debug("\t" + response.get('msg'))
+                response['host'] = host
+                board.complete(key, response)
+                executed.append(index)
+        except (EOFError, ConnectionError) as e:
+            logger.debug(f"Worker '{name}' lost connection to broker: {e}")
+        finally:
+            stop.set()
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(nprocesses)]
+    for t in threads:
+        t.start()
+
+    # renew leases while tasks are running
+    try:
+        while not stop.wait(board.heartbeat(name) / 3):
+            pass
+    except (EOFError, ConnectionError):
+        stop.set()
+
+    for t in threads:
+        t.join()
+
+    logger.debug(f"Worker '{name}' stopped after executing {len(executed)} tasks.")
+    return len(executed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker agent executing commands handed out by a dtm broker.")
+    parser.add_argument("address", help="broker address as host:port")
+    parser.add_argument("--authkey", required=True, help="secret key shared by the broker and the workers")
+    parser.add_argument("--nprocesses", type=int, default=None, help="number of concurrent commands")
+    args = parser.parse_args()
+
+    host, port = args.address.rsplit(":", 1)
+    run_worker((host, int(port)), authkey=args.authkey.encode(), nprocesses=args.nprocesses)
+
+
+if __name__ == "__main__":
+    main()
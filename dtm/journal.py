@@ -0,0 +1,196 @@
+"""
+Module with the journal of completed tasks, which lets interrupted runs resume where they stopped
+"""
+import multiprocessing as mp
+import os
+import json
+from typing import TYPE_CHECKING, Optional, Dict, Iterable, Iterator, Tuple, Deque, IO, Union
+
+from .scheduling import CommandTask
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+class Journal:
+    """
+    Append-only journal of task responses, written as each task completes.
+
+    Each response is written as a line of JSON and flushed to disk (fsync) before the next task is reported, so the
+    journal holds all completed tasks if the parent process crashes. A line partially written when the process died is
+    ignored when the journal is read.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the journal file (JSON lines). The file is created when the first response is recorded.
+
+    Notes
+    -----
+    Tasks are identified by command and absolute work directory. If a task is recorded more than once, the last
+    response is the one that counts.
+
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._responses: Dict[str, Dict[str, "ResponseDict"]] = dict()
+        self._file: Optional[IO[str]] = None
+
+        if os.path.isfile(filename):
+            self._read()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(len(_) for _ in self._responses.values())
+
+    def _read(self) -> None:
+        """Read responses recorded in earlier runs."""
+        with open(self.filename) as f:
+            for n, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                    command, response = entry["command"], entry["response"]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Ignoring incomplete entry on line {n} of journal '{self.filename}'.")
+                    continue
+
+                self._responses.setdefault(command, dict())[os.path.abspath(response.get("path"))] = response
+
+        logger.debug(f"Read {len(self)} task responses from journal '{self.filename}'.")
+
+    def _open(self) -> IO[str]:
+        """Open the journal for appending, terminating a line left incomplete by a crash."""
+        created = not os.path.isfile(self.filename)
+        f = open(self.filename, "a")
+        if not created and f.tell() > 0:
+            with open(self.filename, "rb") as g:
+                g.seek(-1, os.SEEK_END)
+                if g.read(1) != b"\n":
+                    f.write("\n")
+
+        if created:
+            # make the new directory entry durable as well
+            try:
+                fd = os.open(os.path.dirname(os.path.abspath(self.filename)), os.O_RDONLY)
+            except (OSError, AttributeError):
+                pass
+            else:
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+
+        return f
+
+    def get(self, command: str, path: str) -> Optional["ResponseDict"]:
+        """
+        Response recorded for command in work directory.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        path : str
+            Work directory
+
+        Returns
+        -------
+        ResponseDict
+            Last response recorded, None if not recorded.
+
+        """
+        return self._responses.get(command, dict()).get(os.path.abspath(path))
+
+    def succeeded(self, command: str, path: str) -> bool:
+        """Check if the last recorded response of command in work directory is completed."""
+        response = self.get(command, path)
+        return response is not None and response.get("status") == "completed"
+
+    def record(self, command: str, response: "ResponseDict") -> None:
+        """
+        Append task response to the journal and flush it to disk.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        response : ResponseDict
+            Task response
+
+        """
+        if self._file is None:
+            self._file = self._open()
+
+        self._file.write(json.dumps(dict(command=command, response=response), default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._responses.setdefault(command, dict())[os.path.abspath(response.get("path"))] = response
+
+    def skip_succeeded(self, tasks: Iterable[CommandTask],
+                       skipped: Deque[Tuple[int, "ResponseDict"]]) -> Iterator[CommandTask]:
+        """
+        Filter out tasks that succeeded in earlier runs, lazily.
+
+        Parameters
+        ----------
+        tasks : iterable
+            Tasks as yielded by `dtm.scheduling.command_tasks()`
+        skipped : deque
+            Index and recorded response of the tasks filtered out are appended to it.
+
+        Yields
+        ------
+        tuple
+            Tasks that have not succeeded
+
+        """
+        for requirement, (i, c, p) in tasks:
+            if self.succeeded(c, p):
+                logger.debug("\t" + f"Skipping command '{c}' in '{p}', it completed in an earlier run.")
+                skipped.append((i, self.get(c, p)))
+            else:
+                yield requirement, (i, c, p)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_journal(journal: Optional[Union[str, Journal]], resume: bool = False) -> Tuple[Optional[Journal], bool]:
+    """
+    Journal from file name or journal object.
+
+    Parameters
+    ----------
+    journal : str or Journal, optional
+        Path to journal file or journal
+    resume : bool, optional
+        Tasks that succeeded according to the journal are to be skipped, requires a journal.
+
+    Returns
+    -------
+    tuple
+        Journal, None if not specified, and whether the journal was opened here and is to be closed by the caller.
+
+    """
+    if resume and journal is None:
+        logger.error("Specify the journal to resume from.")
+        raise ValueError("Specify the journal to resume from.")
+
+    if isinstance(journal, str):
+        return Journal(journal), True
+
+    return journal, False
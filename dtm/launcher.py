@@ -0,0 +1,608 @@
+"""
+Module with a launcher running commands as direct children of the parent process
+"""
+import multiprocessing as mp
+import subprocess
+import selectors
+import tempfile
+import os
+import time
+import shutil
+import statistics
+from collections import deque
+from typing import TYPE_CHECKING, Optional, List, Callable, Dict, Iterable, Iterator, Tuple, Union, Deque
+
+from .affinity import CoreAffinity, pinned
+from .cache import CommandCache
+from .cancel import CancelToken, FailFast, Failures, cancelled_response
+from .concurrency import AdaptiveConcurrency
+from .journal import Journal, open_journal
+from .process import GRACE_PERIOD, session_options, terminate_group, interrupt_group, kill_group
+from .resources import Requirement, Capacity, PackingQueue
+from .retry import RetryPolicy, Attempts
+from .scheduling import LongestFirst, command_tasks, in_order
+from .tracking import log_progress
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# polling interval (seconds) when child processes cannot be awaited through pidfd
+POLL_INTERVAL = 0.05
+
+# number of completed tasks required to estimate the typical runtime before speculating
+SPECULATION_SAMPLES = 3
+
+
+def pidfd_supported() -> bool:
+    """
+    Check if child processes can be awaited through process file descriptors (Linux 5.3 or later).
+
+    Returns
+    -------
+    bool
+        True if `os.pidfd_open()` is available and supported by the kernel
+
+    """
+    if not hasattr(os, "pidfd_open"):
+        return False
+
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return False
+    else:
+        return True
+
+
+class _Child:
+    """Bookkeeping of a running child process."""
+
+    def __init__(self, index: int, original: str, command: Union[str, List[str]], path: str,
+                 process: subprocess.Popen, out, pipe: bool, deadline: Optional[float], timeout: Optional[int]):
+        self.index = index
+        self.original = original
+        self.command = command
+        self.path = path
+        self.process = process
+        self.out = out
+        self.pipe = pipe
+        self.deadline = deadline
+        self.timeout = timeout
+        self.timed_out = False
+        self.kill_at: Optional[float] = None
+        self.cores: Optional[List[int]] = None
+        self.started = time.monotonic()
+        self.pidfd: Optional[int] = None
+        self.requirement: Requirement = Requirement(cores=0, memory=0)
+
+        # speculative execution: the other copy of the task, the work directory copied if this is the duplicate, and
+        # the response of the other copy if it failed first
+        self.twin: Optional["_Child"] = None
+        self.copy_of: Optional[str] = None
+        self.fallback: Optional["ResponseDict"] = None
+        self.speculated = False
+
+    def output(self) -> Optional[str]:
+        """Read output captured from the child process and release the output file."""
+        if self.pipe:
+            self.out.seek(0)
+            output = self.out.read().decode()
+        else:
+            output = None
+
+        self.out.close()
+        return output
+
+    def response(self) -> "ResponseDict":
+        """Create response of the terminated child process."""
+        returncode = self.process.wait()
+        output = self.output()
+        if self.timed_out:
+            response = dict(pid=self.process.pid, ppid=os.getpid(), path=self.path,
+                            returncode=1, status='timeout', output=output,
+                            msg=f'Command "{self.command}" timed out after {self.timeout} seconds.')
+        elif returncode == 0:
+            response = dict(pid=self.process.pid, ppid=os.getpid(), path=self.path,
+                            returncode=returncode, status='completed', output=output,
+                            msg=f'Command "{self.command}" returned exit status 0. Congratulations!.')
+        else:
+            response = dict(pid=self.process.pid, ppid=os.getpid(), path=self.path,
+                            returncode=returncode, status='error', output=output,
+                            msg=f'Command "{self.command}" returned exit status {returncode}. See details in task log.')
+
+        logger.debug("\t" + response.get('msg'))
+        response['runtime'] = time.monotonic() - self.started
+        return response
+
+
+class Launcher:
+    """
+    Run commands as direct children of the parent process.
+
+    Contrary to `Executor`, no intermediate pool of Python worker processes is started. The parent process launches up
+    to `nprocesses` concurrent children and reaps them in an event loop, waiting on process file descriptors where
+    supported (Linux) and polling otherwise.
+
+    Parameters
+    ----------
+    nprocesses: int, optional
+        Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for tasks to complete. Default is to log the
+        number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+
+    Notes
+    -----
+    The process id in the responses is the process id of the command itself, and the parent process id is the
+    process id of the launcher.
+
+    """
+
+    def __init__(self, nprocesses: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None,
+                 progress_interval: float = 15.):
+        self.nprocesses = nprocesses if nprocesses is not None else os.cpu_count()
+        self.progress = progress if progress is not None else log_progress
+        self.progress_interval = progress_interval
+        self._pidfd = pidfd_supported()
+
+    @staticmethod
+    def _spawn(index: int, command: str, path: Optional[str], shell: bool, env: Optional[Dict[str, str]],
+               pipe: bool, timeout: Optional[int], cores: Optional[List[int]] = None) -> Union[_Child, "ResponseDict"]:
+        # ensure correct type
+        if not isinstance(command, str):
+            logger.error(f"The command must be a string not a {type(command)}.")
+            raise TypeError(f"The command must be a string not a {type(command)}.")
+
+        # use current work directory if none is specified
+        if path is None:
+            path = os.getcwd()
+
+        original = command
+
+        # concatenate env variables to pass
+        if env is not None:
+            env = dict(**os.environ, **env)
+        else:
+            env = os.environ
+
+        # concatenate command parameters to string if shell
+        if not shell:
+            command = command.split()
+
+        # choose handling of standard out/err
+        if pipe:
+            # capture in anonymous file to avoid filling pipe buffers while other children are served
+            out = tempfile.TemporaryFile()
+        else:
+            # log stdout/stderr to file in path
+            out = open(os.path.join(path, 'log.txt'), 'w')
+
+        logger.debug("\t" + f"Executing command '{command}' in working directory '{path}.'")
+
+        try:
+            with pinned(cores):
+                process = subprocess.Popen(command, stdout=out, shell=shell, stderr=subprocess.STDOUT, cwd=path,
+                                           env=env, **session_options())
+
+        except FileNotFoundError as e:
+            out.close()
+            response = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
+                            returncode=1, status='error', output='',
+                            msg=f'Command "{command[0]}" could not be found.')
+            logger.debug("\t" + response.get('msg'))
+            logger.debug("\t" + str(e))
+            return response
+
+        except NotADirectoryError as e:
+            out.close()
+            response = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
+                            returncode=1, status='error', output='',
+                            msg=f'The path "{path}" is invalid. The directory does not exist.')
+            logger.debug("\t" + response.get('msg'))
+            logger.debug("\t" + str(e))
+            return response
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        child = _Child(index, original, command, path, process, out, pipe, deadline, timeout)
+        child.cores = cores
+        return child
+
+    def _speculate(self, child: _Child, shell: bool, env: Optional[Dict[str, str]], pipe: bool,
+                   timeout: Optional[int], cores: Optional[List[int]] = None) -> Optional[_Child]:
+        """Launch duplicate of straggling child in a copy of its work directory."""
+        path = os.path.abspath(child.path)
+        try:
+            copy = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.speculative-", dir=os.path.dirname(path))
+            shutil.copytree(path, copy, dirs_exist_ok=True)
+        except (OSError, shutil.Error) as e:
+            logger.warning(f"Could not copy work directory '{path}' for speculative execution: {e}")
+            return None
+
+        twin = self._spawn(child.index, child.original, copy, shell, env, pipe, timeout, cores=cores)
+        if not isinstance(twin, _Child):
+            shutil.rmtree(copy, ignore_errors=True)
+            return None
+
+        logger.debug("\t" + f"Task in '{child.path}' is straggling, started a duplicate in '{copy}'.")
+        twin.copy_of = child.path
+        twin.requirement = child.requirement
+        twin.twin, child.twin = child, twin
+        child.speculated = twin.speculated = True
+        return twin
+
+    @staticmethod
+    def _settle(child: _Child, response: "ResponseDict") -> Optional["ResponseDict"]:
+        """
+        Decide the response of task executed speculatively in two copies, when one of them has terminated.
+
+        Returns None if the other copy is still running and is to be awaited, because this copy failed.
+        """
+        if child.twin is not None and response.get("status") != "completed":
+            # wait for the other copy, falling back on the response of the original if both fail
+            child.twin.fallback = response if child.copy_of is None else None
+            child.twin.twin = None
+            if child.copy_of is not None:
+                shutil.rmtree(child.path, ignore_errors=True)
+            return None
+
+        if child.copy_of is None:
+            return response
+
+        # duplicate terminated, it ran in a copy of the work directory
+        if response.get("status") == "completed":
+            shutil.copytree(child.path, child.copy_of, dirs_exist_ok=True)
+            response["path"] = child.copy_of
+            response["speculative"] = True
+            response["msg"] = f"{response.get('msg')} Completed by speculative duplicate."
+        elif child.fallback is not None:
+            response = child.fallback
+        else:
+            response["path"] = child.copy_of
+
+        shutil.rmtree(child.path, ignore_errors=True)
+        return response
+
+    def iter_commands(self, commands: Iterable[str], paths: Iterable[str], shell: bool = False,
+                      env: Optional[Dict[str, str]] = None, pipe: bool = False, timeout: Optional[int] = None,
+                      schedule: Optional[LongestFirst] = None,
+                      resources: Optional[Union[Requirement, Iterable[Requirement]]] = None,
+                      capacity: Optional[Capacity] = None, max_queued: Optional[int] = None,
+                      journal: Optional[Union[str, Journal]] = None, resume: bool = False,
+                      cache: Optional[CommandCache] = None,
+                      retry: Optional[RetryPolicy] = None,
+                      speculate: Optional[float] = None, grace: float = GRACE_PERIOD,
+                      cancel: Optional[CancelToken] = None,
+                      fail_fast: Optional[Union[int, FailFast]] = None,
+                      concurrency: Optional[AdaptiveConcurrency] = None,
+                      affinity: Optional[CoreAffinity] = None) -> Iterator[Tuple[int, "ResponseDict"]]:
+        """
+        Execute commands over many work directories, yielding responses as tasks complete. See
+        `iter_subprocess_commands()` for a description of the parameters.
+
+        Yields
+        ------
+        tuple
+            Index of the task in `paths` and the subprocess response
+
+        Notes
+        -----
+        Each child is started in its own process group. On timeout, the group is sent SIGTERM, and SIGKILL after
+        `grace` seconds. Running children and their process groups are killed if the iterator is closed before all
+        tasks are completed. If the batch is cancelled, the running children are terminated likewise, within the grace
+        period.
+
+        With `speculate`, a task that has run longer than `speculate` times the median runtime of the completed tasks
+        is duplicated in a copy of its work directory, when processes are idle and no tasks are waiting. The first copy
+        to complete wins and the other is killed. The files of the duplicate are copied back to the work directory if
+        it wins. Only for idempotent commands.
+
+        With `affinity`, tasks are launched when enough cores are free to pin them to, duplicates included.
+
+        """
+        journal, owned = open_journal(journal, resume=resume)
+        skipped: Deque[Tuple[int, "ResponseDict"]] = deque()
+        tasks = command_tasks(commands, paths, resources=resources)
+        if resume:
+            tasks = journal.skip_succeeded(tasks, skipped)
+        keys: Dict[int, str] = dict()
+        if cache is not None:
+            tasks = cache.skip_cached(tasks, skipped, keys, env=env)
+        if schedule is not None:
+            tasks = schedule.sort(tasks)
+
+        # tasks are launched as slots and resources become available
+        queue = PackingQueue(tasks, capacity=capacity, window=max_queued)
+        total = len(paths) if hasattr(paths, "__len__") else None
+
+        running: Dict[int, _Child] = dict()
+        attempts = Attempts(retry) if retry is not None else None
+        waiting: List[Tuple[float, Requirement, Tuple[int, str, str]]] = list()
+        runtimes: List[float] = list()
+        selector = selectors.DefaultSelector() if self._pidfd else None
+        if fail_fast is not None and cancel is None:
+            cancel = CancelToken()
+        failures = Failures(fail_fast, cancel) if fail_fast is not None else None
+
+        # cancellation from another thread wakes up the event loop through a pipe
+        wakeup_pipe = os.pipe() if selector is not None and cancel is not None else None
+
+        def wake() -> None:
+            try:
+                os.write(wakeup_pipe[1], b"\0")
+            except OSError:
+                pass
+
+        if wakeup_pipe is not None:
+            os.set_blocking(wakeup_pipe[1], False)
+            selector.register(wakeup_pipe[0], selectors.EVENT_READ, None)
+            cancel.subscribe(wake)
+
+        def register(child: _Child) -> None:
+            running[child.process.pid] = child
+            if selector is not None:
+                child.pidfd = os.pidfd_open(child.process.pid)
+                selector.register(child.pidfd, selectors.EVENT_READ, child)
+
+        def unregister(child: _Child) -> None:
+            running.pop(child.process.pid, None)
+            if affinity is not None:
+                affinity.release(child.cores)
+                child.cores = None
+            if child.pidfd is not None:
+                selector.unregister(child.pidfd)
+                os.close(child.pidfd)
+                child.pidfd = None
+
+        def slots() -> int:
+            # number of concurrent processes, adapted to the load of the host if requested
+            if concurrency is None:
+                return self.nprocesses
+            return min(self.nprocesses, concurrency.update(len(running)))
+
+        def stragglers() -> List[Tuple[float, _Child]]:
+            # time at which running tasks become stragglers, if there is room for duplicates
+            if speculate is None or len(runtimes) < SPECULATION_SAMPLES or waiting or queue:
+                return list()
+
+            threshold = speculate * statistics.median(runtimes)
+            return [(c.started + threshold, c) for c in running.values() if not c.speculated]
+
+        def finish(index: int, command: str, response: "ResponseDict") -> "ResponseDict":
+            # final response of task, whether its child was reaped or could not be spawned
+            nonlocal completed
+            if attempts is not None:
+                response = attempts.final(index, response)
+            if failures is not None:
+                failures.record(response)
+            completed += 1
+            if schedule is not None:
+                schedule.record(command, response)
+            if journal is not None:
+                journal.record(command, response)
+            if cache is not None and index in keys:
+                cache.put(keys.pop(index), response)
+            return response
+
+        progress_deadline = time.monotonic() + self.progress_interval
+        completed = 0
+        logger.debug(f"Launching tasks with at most {self.nprocesses} concurrent processes...")
+
+        try:
+            while not (cancel is not None and cancel.cancelled):
+                # failed tasks whose backoff has elapsed are launched ahead of the queued tasks
+                now = time.monotonic()
+                for ready, requirement, task in [w for w in waiting if w[0] <= now]:
+                    waiting.remove((ready, requirement, task))
+                    queue.push(requirement, task)
+
+                # launch tasks until all slots or resources are occupied
+                while len(running) < slots() and not (cancel is not None and cancel.cancelled):
+                    task = queue.pop()
+                    if task is None:
+                        break
+
+                    requirement, (i, c, p) = task
+                    cores = affinity.allocate(requirement) if affinity is not None else None
+                    if affinity is not None and cores is None:
+                        # wait for running tasks to free their cores
+                        queue.release(requirement)
+                        queue.push(requirement, (i, c, p))
+                        break
+
+                    child = self._spawn(i, c, p, shell, env, pipe, timeout, cores=cores)
+                    if isinstance(child, _Child):
+                        child.requirement = requirement
+                        register(child)
+                    else:
+                        queue.release(requirement)
+                        if affinity is not None:
+                            affinity.release(cores)
+                        delay = attempts.failed(i, child) if attempts is not None else None
+                        if delay is not None:
+                            waiting.append((time.monotonic() + delay, requirement, (i, c, p)))
+                            continue
+
+                        yield i, finish(i, c, child)
+
+                # tasks that succeeded in an earlier run
+                while skipped:
+                    completed += 1
+                    yield skipped.popleft()
+
+                if not queue and not running and not waiting:
+                    break
+
+                if cancel is not None and cancel.cancelled:
+                    continue        # tasks that failed to spawn may have cancelled the batch
+
+                if not running and not waiting:
+                    # nothing left to free the resources the queued tasks wait for
+                    logger.error(f"Queued tasks wait for resources held outside of the batch, "
+                                 f"{queue.capacity.free_cores} of {queue.capacity.cores} cores are free.")
+                    raise RuntimeError(f"Queued tasks wait for resources held outside of the batch, "
+                                       f"{queue.capacity.free_cores} of {queue.capacity.cores} cores are free.")
+
+                # duplicate stragglers on idle processes
+                now = time.monotonic()
+                for due, child in sorted(stragglers(), key=lambda _: _[0]):
+                    if len(running) >= slots() or due > now:
+                        break
+
+                    if queue.capacity.available(child.requirement):
+                        cores = affinity.allocate(child.requirement) if affinity is not None else None
+                        if affinity is not None and cores is None:
+                            break
+
+                        twin = self._speculate(child, shell, env, pipe, timeout, cores=cores)
+                        if twin is None and affinity is not None:
+                            affinity.release(cores)
+                        if twin is not None:
+                            queue.capacity.acquire(twin.requirement)
+                            register(twin)
+
+                # sleep until a child terminates, a timeout or backoff expires, a task straggles or progress is due
+                now = time.monotonic()
+                wakeup = min([progress_deadline] + [c.deadline for c in running.values() if c.deadline is not None] +
+                             [c.kill_at for c in running.values() if c.kill_at is not None] +
+                             ([concurrency.next_update] if concurrency is not None and queue else []) +
+                             [ready for ready, _, _ in waiting] +
+                             ([due for due, _ in stragglers()] if len(running) < slots() else []))
+                if selector is not None:
+                    selector.select(timeout=max(wakeup - now, 0.))
+                else:
+                    time.sleep(min(max(wakeup - now, 0.), POLL_INTERVAL))
+
+                # terminate children that exceeded their timeout, escalating to SIGKILL after the grace period
+                now = time.monotonic()
+                for child in running.values():
+                    if child.process.poll() is not None:
+                        continue
+
+                    if child.kill_at is not None and now >= child.kill_at:
+                        kill_group(child.process)
+                        child.kill_at = None
+                    elif child.deadline is not None and now >= child.deadline:
+                        interrupt_group(child.process)
+                        child.timed_out = True
+                        child.deadline = None
+                        child.kill_at = now + grace
+
+                # reap terminated children
+                for child in [c for c in running.values() if c.process.poll() is not None]:
+                    if child.process.pid not in running:
+                        continue        # killed as the other copy of the task won
+
+                    unregister(child)
+                    if child.timed_out:
+                        # the descendants of the child may outlive it, terminate what is left of its process group
+                        remaining = max(child.kill_at - time.monotonic(), 0.) if child.kill_at is not None else 0.
+                        terminate_group(child.process, grace=remaining)
+                    response = child.response()
+                    queue.release(child.requirement)
+
+                    twin = child.twin
+                    if twin is not None and response.get("status") == "completed":
+                        # this copy won, stop the other before taking over the work directory
+                        kill_group(twin.process)
+                        unregister(twin)
+                        twin.response()
+                        queue.release(twin.requirement)
+                        if twin.copy_of is not None:
+                            shutil.rmtree(twin.path, ignore_errors=True)
+                        child.twin = twin.twin = None
+
+                    response = self._settle(child, response)
+                    if response is None:
+                        continue        # await the other copy of the task
+
+                    if response.get("status") == "completed":
+                        runtimes.append(response.get("runtime"))
+
+                    delay = attempts.failed(child.index, response) if attempts is not None else None
+                    if delay is not None:
+                        waiting.append((time.monotonic() + delay, child.requirement,
+                                        (child.index, child.original, response.get("path"))))
+                        continue
+
+                    yield child.index, finish(child.index, child.original, response)
+
+                # report pending tasks
+                if now >= progress_deadline:
+                    if total is not None:
+                        self.progress(total - completed, total)
+                    else:
+                        self.progress(len(running), completed + len(running))
+                    progress_deadline = now + self.progress_interval
+
+            if cancel is not None and cancel.cancelled:
+                # stop the running children, their process groups are given the grace period to exit
+                t0 = time.monotonic()
+                for child in running.values():
+                    interrupt_group(child.process)
+
+                for child in list(running.values()):
+                    terminate_group(child.process, grace=max(t0 + grace - time.monotonic(), 0.))
+                    unregister(child)
+                    child.response()
+                    queue.release(child.requirement)
+                    if child.copy_of is not None:
+                        shutil.rmtree(child.path, ignore_errors=True)
+                        if child.twin is not None:
+                            continue        # the original copy of the task responds
+                    yield child.index, cancelled_response(child.original, child.copy_of or child.path, cancel.reason)
+
+                for _, _, (i, c, p) in waiting:
+                    yield i, cancelled_response(c, p, cancel.reason)
+                waiting.clear()
+
+                # tasks never dispatched, tasks that succeeded in an earlier run are still reported as such
+                for _, (i, c, p) in queue.drain():
+                    yield i, cancelled_response(c, p, cancel.reason)
+                    while skipped:
+                        yield skipped.popleft()
+
+                while skipped:
+                    yield skipped.popleft()
+
+        finally:
+            # iterator closed early or failed, kill remaining children
+            for child in running.values():
+                kill_group(child.process)
+                child.process.wait()
+                queue.release(child.requirement)
+                if affinity is not None:
+                    affinity.release(child.cores)
+                child.out.close()
+                if child.pidfd is not None:
+                    os.close(child.pidfd)
+                if child.copy_of is not None:
+                    shutil.rmtree(child.path, ignore_errors=True)
+
+            if wakeup_pipe is not None:
+                cancel.unsubscribe(wake)
+                os.close(wakeup_pipe[0])
+                os.close(wakeup_pipe[1])
+            if selector is not None:
+                selector.close()
+
+            if schedule is not None:
+                schedule.save()
+            if owned:
+                journal.close()
+
+    def map_commands(self, commands: Iterable[str], paths: Iterable[str], **options) -> List["ResponseDict"]:
+        """
+        Execute commands over many work directories, see `iter_commands()` for the options.
+
+        Returns
+        -------
+        list
+            Collection of subprocess response, in the order of `paths`.
+
+        """
+        return in_order(self.iter_commands(commands, paths, **options))
@@ -6,13 +6,38 @@ import subprocess
 import os
 import json
 import logging
-import datetime
-from typing import TypedDict, Literal, Optional, List, Callable, Any, Dict
+import math
+import pickle
+import time
+import threading
+from collections import deque
+from multiprocessing.pool import AsyncResult, ThreadPool
+from typing import TypedDict, Literal, Optional, List, Callable, Any, Dict, Iterable, Iterator, Tuple, Union, Deque
+
+from . import shm
+from .context import initialize, worker_context
+from .affinity import CoreAffinity, pinned
+from .cache import CommandCache, FunctionCache
+from .cancel import CANCELLED, CancelToken, FailFast, Failures, cancelled_response
+from .concurrency import AdaptiveConcurrency
+from .journal import Journal, open_journal
+from .launcher import Launcher
+from .process import GRACE_PERIOD, POLL_INTERVAL, session_options, terminate_group, kill_group, tracked, terminate_running
+from .resources import Requirement, Capacity, PackingQueue
+from .retry import RetryPolicy, Attempts
+from .scheduling import LongestFirst, command_tasks, in_order
+from .tracking import CompletionTracker, log_progress  # noqa: F401
 
 # grab logger from multiprocessing package
 logger = mp.get_logger()
 
 
+# target duration (seconds) of a chunk of tasks when the chunk size is chosen automatically
+CHUNK_DURATION = 0.05
+
+# index of the wake-up of the dispatch of commands when the concurrency limit is due for adjustment
+_ADJUST = -1
+
 # setup logging levels
 LOGGING_LEVELS = dict(
     debug=logging.DEBUG,
@@ -22,17 +47,25 @@ LOGGING_LEVELS = dict(
 )
 
 
-class ResponseDict(TypedDict):
+class _OptionalResponseDict(TypedDict, total=False):
+    runtime: float
+    host: str
+    cached: bool
+    attempts: List[Dict[str, Any]]
+    speculative: bool
+
+
+class ResponseDict(_OptionalResponseDict):
     returncode: int
     ppid: int
     pid: int
     path: str
     output: Optional[str]
-    status: Literal["completed", "error", "timeout"]
+    status: Literal["completed", "error", "timeout", "skipped", "cancelled"]
     msg: str
 
 
-def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False, env: Optional[Dict[str, str]]=None, pipe: bool=False, timeout: Optional[int]=None) -> ResponseDict:
+def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False, env: Optional[Dict[str, str]]=None, pipe: bool=False, timeout: Optional[int]=None, grace: float=GRACE_PERIOD, cores: Optional[List[int]]=None) -> ResponseDict:
     """
     Execute command in subprocess.
 
@@ -52,11 +85,18 @@ def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False
         the specified work directory.
     timeout : int, optional
         Number of seconds before terminating the process
+    grace : float, optional
+        Number of seconds the processes of a timed out command are given to exit after SIGTERM, before SIGKILL.
+    cores : list, optional
+        CPUs to pin the command, and all processes it starts, to. Default is not to pin the command.
 
     Notes
     -----
     The command parameters are split as list if `shell` is False.
 
+    The command is started in its own session (process group). On timeout, the whole group is terminated, i.e. the
+    program and any processes it started, including the program started by the shell if `shell` is True.
+
     Returns
     -------
     ResponseDict
@@ -68,6 +108,7 @@ def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False
             output - dump from standard out (empty if dumped to file)
             status - 'completed', 'error' or 'timeout'
             msg - Description
+            runtime - Wall clock time in seconds
 
     """
     # ensure correct type
@@ -100,9 +141,24 @@ def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False
     logger.debug("\t" + f"Executing command '{command}' in working directory '{path}.'")
 
     # execute subprocess and catch errors
+    t0 = time.monotonic()
     try:
-        p = subprocess.run(command, stdout=out, shell=shell, stderr=subprocess.STDOUT, cwd=path, env=env,
-                           timeout=timeout)
+        with pinned(cores):
+            p = subprocess.Popen(command, stdout=out, shell=shell, stderr=subprocess.STDOUT, cwd=path, env=env,
+                                 **session_options())
+
+        with p, tracked(p, grace=grace):
+            try:
+                stdout, _ = p.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                if terminate_group(p, grace=grace):
+                    # collect the output written until the processes were terminated
+                    e.stdout, _ = p.communicate()
+                raise
+            except BaseException:
+                # do not leave the processes of the command behind, e.g. on KeyboardInterrupt
+                kill_group(p)
+                raise
 
     except subprocess.TimeoutExpired as e:
         response: ResponseDict = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
@@ -136,31 +192,798 @@ def subprocess_command(command: str, path: Optional[str]=None, shell: bool=False
             # response CompletedProcess with returncode 0
             response = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
                             returncode=p.returncode, status='completed',
-                            output=p.stdout.decode() if p.stdout is not None else None,
+                            output=stdout.decode() if stdout is not None else None,
                             msg=f'Command "{command}" returned exit status 0. Congratulations!.')
         else:
             # response CompletedProcess with returncode != 0 but no exception raised
             response = dict(pid=os.getpid(), ppid=os.getppid(), path=path,
                             returncode=p.returncode, status='error',
-                            output=p.stdout.decode() if p.stdout is not None else None,
+                            output=stdout.decode() if stdout is not None else None,
                             msg=f'Command "{command}" returned exit status {p.returncode}. See details in task log.')
 
         logger.debug("\t" + response.get('msg'))
 
+    response['runtime'] = time.monotonic() - t0
     return response
 
 
-def subprocess_commands(commands: List[str], paths: List[str], nprocesses: Optional[int]=None, shell: bool=False, env: Optional[Dict[str, str]]=None, pipe: bool=False, timeout: Optional[int]=None) -> List[ResponseDict]:
+def auto_chunksize(duration: float, ntasks: int, nprocesses: int) -> int:
+    """
+    Choose the number of tasks per chunk from the measured duration of a task.
+
+    Parameters
+    ----------
+    duration : float
+        Average duration of a task in seconds
+    ntasks : int
+        Number of tasks to divide in chunks
+    nprocesses : int
+        Number of worker processes
+
+    Returns
+    -------
+    int
+        Chunk size
+
+    Notes
+    -----
+    Chunks are sized to take about `CHUNK_DURATION` seconds, which makes the cost of transferring a chunk to a worker
+    small compared to its execution. The chunk size is limited to give every worker at least 4 chunks, so the load
+    remains balanced.
+
+    """
+    largest = max(1, math.ceil(ntasks / (4 * nprocesses)))
+    if duration <= 0.:
+        return largest
+
+    return max(1, min(int(CHUNK_DURATION / duration), largest))
+
+
+def _call(task: Tuple[Callable, List[Any], Dict[str, Any]]) -> Any:
+    """Call function with its arguments."""
+    f, a, k = task
+    return f(*a, **k)
+
+
+def _run_chunk(tasks: List[Tuple[Callable, List[Any], Dict[str, Any]]], shared: bool = False,
+               out_of_band: Optional[int] = None, threads: Optional[int] = None) -> Tuple[Any, float]:
+    """Execute chunk of functions in worker process, returns the responses and the duration."""
+    t0 = time.perf_counter()
+    if shared:
+        # arguments in shared memory are resolved to views, which are released before detaching
+        tasks = [(f, *shm.resolve(a, k)) for f, a, k in tasks]
+
+    if threads is not None and threads > 1 and len(tasks) > 1:
+        # execute the chunk concurrently in threads kept by the worker process
+        pool = worker_context().cached(f"threads-{threads}", ThreadPool, processes=threads)
+        response = pool.map(_call, tasks)
+    else:
+        response = [_call(t) for t in tasks]
+
+    if shared:
+        del tasks
+        shm.detach()
+
+    if out_of_band is not None:
+        response = shm.dump_result(response, threshold=out_of_band)
+
+    return response, time.perf_counter() - t0
+
+
+def _context(start_method: Optional[str] = None, preload: Optional[Iterable[str]] = None) -> Any:
+    """Multiprocessing context with the start method, preloading modules in the forkserver."""
+    try:
+        context = mp.get_context(start_method)
+    except ValueError as e:
+        logger.error(f"Unknown start method '{start_method}', choose from {mp.get_all_start_methods()}.")
+        raise e
+
+    if preload:
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload(list(preload))
+        else:
+            logger.warning(f"Modules are only preloaded with the 'forkserver' start method, not "
+                           f"'{context.get_start_method()}'.")
+
+    return context
+
+
+class Executor:
+    """
+    Pool of worker processes that may be reused for many batches of commands and functions.
+
+    Parameters
+    ----------
+    nprocesses: int, optional
+        Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for tasks to complete. Default is to log the
+        number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+    initializer : callable, optional
+        Function called as `initializer(*initargs)` once in each worker process when it starts, e.g. to import heavy
+        modules or load data into the worker context, see `dtm.context.worker_context()`.
+    initargs : tuple, optional
+        Arguments to `initializer`
+    backend : str, optional
+        Workers executing the tasks:
+
+        - 'process': worker processes (default). Suits CPU-bound Python functions.
+        - 'thread': worker threads in the parent process. Suits functions waiting on I/O or calling code releasing the
+          GIL (e.g. NumPy), and commands, avoiding the startup of processes and pickling of arguments and results.
+        - 'hybrid': worker processes, each executing chunks of functions in `threads` threads.
+    threads : int, optional
+        Number of threads in each worker process with the 'hybrid' backend. Default is to divide the CPUs between the
+        worker processes.
+    start_method : str, optional
+        Method starting the worker processes, 'fork', 'spawn' or 'forkserver', see `multiprocessing.get_context()`.
+        Forked workers inherit the address space of the parent process, and page faults on copy-on-write pages slow
+        down workers of large parent processes. Spawned workers and workers forked from the forkserver start from a
+        fresh interpreter. Default is the platform default.
+    preload : list, optional
+        Modules imported by the forkserver, and thus inherited by each worker, with the 'forkserver' start method.
+
+    Notes
+    -----
+    The workers are kept alive until the executor is shut down, either explicitly by `shutdown()` or when leaving the
+    context manager.
+
+    With the 'thread' backend, `nprocesses` is the number of threads, and the initializer is called once in each
+    thread. The threads share the worker context.
+
+    With the 'spawn' and 'forkserver' start methods, functions and their arguments must be importable by the workers,
+    i.e. defined at module level. Modules are preloaded only if the forkserver is not already running.
+
+    Examples
+    --------
+    >>> with Executor(nprocesses=4) as executor:
+    ...     meshes = executor.map_commands(["mesh"], paths)
+    ...     solves = executor.map_commands(["solve"], paths)
+
+    """
+
+    def __init__(self, nprocesses: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None,
+                 progress_interval: float = 15., initializer: Optional[Callable[..., None]] = None,
+                 initargs: Iterable[Any] = (), backend: Literal["process", "thread", "hybrid"] = "process",
+                 threads: Optional[int] = None, start_method: Optional[Literal["fork", "spawn", "forkserver"]] = None,
+                 preload: Optional[Iterable[str]] = None):
+        if backend not in ("process", "thread", "hybrid"):
+            logger.error(f"Unknown backend '{backend}', choose 'process', 'thread' or 'hybrid'.")
+            raise ValueError(f"Unknown backend '{backend}', choose 'process', 'thread' or 'hybrid'.")
+
+        self.nprocesses = nprocesses if nprocesses is not None else os.cpu_count()
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.backend = backend
+        self.threads = None
+        if backend == "hybrid":
+            self.threads = threads if threads is not None else max(1, os.cpu_count() // self.nprocesses)
+
+        # initiate worker pool
+        if backend == "thread":
+            self._factory = ThreadPool
+        else:
+            self._factory = _context(start_method=start_method, preload=preload).Pool
+
+        # worker threads share the process with other executors, their commands are told apart by owner
+        self._owner = object()
+        self._initargs = (initializer, tuple(initargs), self._owner if backend == "thread" else None)
+        self._pool = self._factory(processes=self.nprocesses, initializer=initialize, initargs=self._initargs)
+        logger.debug(f"Initiated pool of {self.nprocesses} {backend} workers.")
+
+    def __enter__(self) -> "Executor":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # wait for pending tasks on normal exit, stop them if leaving due to an exception
+        self.shutdown(wait=exc_type is None)
+
+    def _tracker(self, total: Optional[int] = None) -> CompletionTracker:
+        return CompletionTracker(progress=self.progress, interval=self.progress_interval, total=total)
+
+    def _restart(self) -> None:
+        """Stop the running and queued tasks by terminating the workers, and start new workers."""
+        if self.backend == "thread":
+            # threads cannot be stopped, but the commands they run can
+            terminate_running(owner=self._owner)
+
+        # worker processes terminate the commands they run, see `dtm.process.terminate_on_signal()`
+        self._pool.terminate()
+        self._pool = self._factory(processes=self.nprocesses, initializer=initialize, initargs=self._initargs)
+        logger.debug("Restarted worker pool to stop the running tasks.")
+
+    def apply_async(self, function: Callable, args: Tuple = (), kwds: Optional[Dict[str, Any]] = None,
+                    callback: Optional[Callable[[Any], None]] = None,
+                    error_callback: Optional[Callable[[BaseException], None]] = None) -> AsyncResult:
+        """
+        Submit function to the worker pool with completion callbacks, see `multiprocessing.pool.Pool.apply_async`.
+
+        Parameters
+        ----------
+        function : callable
+            Function to execute
+        args : tuple, optional
+            Function positional arguments
+        kwds : dict, optional
+            Function keyword arguments
+        callback : callable, optional
+            Called with the function response when the function completes
+        error_callback : callable, optional
+            Called with the exception if the function fails
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            Handle to retrieve the function response
+
+        """
+        return self._pool.apply_async(function, args=args, kwds=kwds if kwds is not None else dict(),
+                                      callback=callback, error_callback=error_callback)
+
+    def submit(self, function: Callable, *args, **kwargs) -> AsyncResult:
+        """
+        Submit function to the worker pool.
+
+        Parameters
+        ----------
+        function : callable
+            Function to execute
+        args
+            Function positional arguments
+        kwargs
+            Function keyword arguments
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            Handle to retrieve the function response
+
+        """
+        return self._pool.apply_async(function, args=args, kwds=kwargs)
+
+    def submit_command(self, command: str, path: Optional[str] = None, shell: bool = False,
+                       env: Optional[Dict[str, str]] = None, pipe: bool = False,
+                       timeout: Optional[int] = None, grace: float = GRACE_PERIOD) -> AsyncResult:
+        """
+        Submit command to the worker pool, see `subprocess_command()` for a description of the parameters.
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            Handle to retrieve the subprocess response
+
+        """
+        return self._pool.apply_async(subprocess_command, args=(command,),
+                                      kwds=dict(path=path, shell=shell, env=env, pipe=pipe, timeout=timeout,
+                                                grace=grace))
+
+    def map(self, functions: List[Callable], args: Optional[List[List[Any]]] = None,
+            kwargs: Optional[List[Dict[str, Any]]] = None,
+            chunksize: Optional[Union[int, Literal["auto"]]] = None,
+            shared_memory: Union[bool, int] = False, shared_results: Union[bool, int] = False,
+            cache: Optional[FunctionCache] = None, cancel: Optional[CancelToken] = None) -> List[Any]:
+        """
+        Execute functions in the worker pool, see `multiprocess_functions()` for a description of the parameters.
+
+        Returns
+        -------
+        list
+            Collection of function responses, in the order of the input functions.
+
+        """
+        if args is not None and len(functions) != len(args):
+            logger.error(f"The number of functions must equal the number of argument sets. You specified "
+                         f"{len(functions)} functions and {len(args)} argument sets.")
+        elif args is None:
+            args = [list() for _ in functions]
+
+        if kwargs is not None and len(functions) != len(kwargs):
+            logger.error(f"The number of functions must equal the number of keyword argument sets. You specified "
+                         f"{len(functions)} functions and {len(kwargs)} argument sets.")
+        elif kwargs is None:
+            kwargs = [dict() for _ in functions]
+
+        if cache is not None:
+            return self._map_cached(functions, args, kwargs, cache, chunksize=chunksize, shared_memory=shared_memory,
+                                    shared_results=shared_results, cancel=cancel)
+
+        if self.backend == "thread" and (shared_memory or shared_results):
+            # threads share the memory of the parent process, nothing is pickled
+            logger.debug("Shared memory is not used with the thread backend.")
+            shared_memory = shared_results = False
+
+        # place large arguments in shared memory
+        if shared_memory:
+            threshold = shm.SHARED_MEMORY_THRESHOLD if shared_memory is True else shared_memory
+            shared = shm.SharedArguments(threshold=threshold)
+            tasks = [(f, *shared.transform(a, k)) for f, a, k in zip(functions, args, kwargs)]
+        else:
+            shared = None
+            tasks = list(zip(functions, args, kwargs))
+
+        try:
+            out_of_band = shm.SHARED_MEMORY_THRESHOLD if shared_results is True else (shared_results or None)
+            response = self._map_chunks(tasks, chunksize=chunksize, shared=shared is not None,
+                                        out_of_band=out_of_band, cancel=cancel)
+        finally:
+            if shared is not None:
+                shared.close()
+
+        # retrieve response from processes
+        logger.debug("Retrieved response from the processes:")
+        logger.debug(json.dumps(response, indent=2, default=str))
+
+        return response
+
+    def _map_cached(self, functions: List[Callable], args: List[List[Any]], kwargs: List[Dict[str, Any]],
+                    cache: FunctionCache, **options) -> List[Any]:
+        # serve cached results in the parent, dispatch the rest
+        response: List[Any] = [None] * len(functions)
+        keys: Dict[int, Optional[str]] = dict()
+        for i, (f, a, k) in enumerate(zip(functions, args, kwargs)):
+            try:
+                key = cache.key(f, a, k)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                logger.debug("\t" + f"Arguments of function {i} cannot be pickled, not cached: {e}")
+                keys[i] = None
+                continue
+
+            hit, result = cache.get(key)
+            if hit:
+                response[i] = result
+            else:
+                keys[i] = key
+
+        misses = sorted(keys)
+        logger.debug(f"Served {len(functions) - len(misses)} of {len(functions)} functions from cache.")
+        if misses:
+            results = self.map([functions[i] for i in misses], args=[args[i] for i in misses],
+                               kwargs=[kwargs[i] for i in misses], **options)
+            for i, result in zip(misses, results):
+                response[i] = result
+                if keys[i] is not None and result is not CANCELLED:
+                    cache.put(keys[i], result)
+
+        return response
+
+    def _map_chunks(self, tasks: List[Tuple[Callable, List[Any], Dict[str, Any]]],
+                    chunksize: Optional[Union[int, Literal["auto"]]] = None, shared: bool = False,
+                    out_of_band: Optional[int] = None, cancel: Optional[CancelToken] = None) -> List[Any]:
+        if chunksize is not None and chunksize != "auto" and (not isinstance(chunksize, int) or chunksize < 1):
+            logger.error(f"The chunk size must be a positive integer or 'auto', not {chunksize!r}.")
+            raise ValueError(f"The chunk size must be a positive integer or 'auto', not {chunksize!r}.")
+
+        # dispatch processes
+        logger.debug(f"Dispatching {len(tasks)} tasks to worker pool...")
+        if chunksize is None and self.threads is not None:
+            chunksize = self.threads        # one task per thread in the worker process
+        tracker = self._tracker(total=len(tasks))
+        chunks: List[Tuple[int, int]] = list()
+
+        def dispatch(start: int, stop: int) -> None:
+            callback, error_callback = tracker.register(len(chunks), size=stop - start)
+            chunks.append((start, stop))
+            self._pool.apply_async(_run_chunk, args=(tasks[start:stop], shared, out_of_band, self.threads),
+                                   callback=callback,
+                                   error_callback=error_callback)
+
+        if chunksize == "auto":
+            # probe the duration of the first tasks before deciding on the chunk size
+            nprobes = min(self.nprocesses, len(tasks))
+            for i in range(nprobes):
+                dispatch(i, i + 1)
+        else:
+            nprobes = len(tasks)
+            for i in range(0, len(tasks), chunksize or 1):
+                dispatch(i, min(i + (chunksize or 1), len(tasks)))
+
+        # collect results as chunks complete, functions not completed are marked if the batch is cancelled
+        response: List[Any] = [CANCELLED] * len(tasks)
+        durations = list()
+        if cancel is not None:
+            cancel.subscribe(tracker.stop)
+        try:
+            for i, (results, duration) in tracker.as_completed():
+                start, stop = chunks[i]
+                response[start:stop] = shm.load_result(results) if out_of_band is not None else results
+                durations.append(duration / (stop - start))
+
+                if len(durations) == nprobes < len(tasks):
+                    chunksize = auto_chunksize(sum(durations) / len(durations), len(tasks) - nprobes, self.nprocesses)
+                    logger.debug(f"Dispatching remaining tasks in chunks of {chunksize} tasks.")
+                    for j in range(nprobes, len(tasks), chunksize):
+                        dispatch(j, min(j + chunksize, len(tasks)))
+        finally:
+            if cancel is not None:
+                cancel.unsubscribe(tracker.stop)
+
+        if cancel is not None and cancel.cancelled and tracker.pending > 0:
+            # stop the chunks running or queued in the workers
+            self._restart()
+            logger.debug(f"Cancelled {sum(r is CANCELLED for r in response)} of {len(tasks)} functions.")
+
+        return response
+
+    def iter_commands(self, commands: Iterable[str], paths: Iterable[str], shell: bool = False,
+                      env: Optional[Dict[str, str]] = None, pipe: bool = False, timeout: Optional[int] = None,
+                      schedule: Optional[LongestFirst] = None,
+                      resources: Optional[Union[Requirement, Iterable[Requirement]]] = None,
+                      capacity: Optional[Capacity] = None, max_queued: Optional[int] = None,
+                      journal: Optional[Union[str, Journal]] = None, resume: bool = False,
+                      cache: Optional[CommandCache] = None,
+                      retry: Optional[RetryPolicy] = None, grace: float = GRACE_PERIOD,
+                      cancel: Optional[CancelToken] = None,
+                      fail_fast: Optional[Union[int, FailFast]] = None,
+                      concurrency: Optional[AdaptiveConcurrency] = None,
+                      affinity: Optional[CoreAffinity] = None) -> Iterator[Tuple[int, ResponseDict]]:
+        """
+        Execute commands over many work directories, yielding responses as tasks complete. See
+        `iter_subprocess_commands()` for a description of the parameters.
+
+        Yields
+        ------
+        tuple
+            Index of the task in `paths` and the subprocess response
+
+        Notes
+        -----
+        Running tasks are stopped if the iterator is closed early, by restarting the workers. Tasks of other batches
+        running on the executor are stopped as well.
+
+        If the batch is cancelled, the workers are restarted to stop the running tasks.
+
+        With `concurrency`, the number of concurrent tasks is adapted as tasks complete and every adjustment interval,
+        up to the number of workers.
+
+        With `affinity`, tasks are dispatched when enough cores are free to pin them to.
+
+        """
+        journal, owned = open_journal(journal, resume=resume)
+        skipped: Deque[Tuple[int, ResponseDict]] = deque()
+        tasks = command_tasks(commands, paths, resources=resources)
+        if resume:
+            tasks = journal.skip_succeeded(tasks, skipped)
+        keys: Dict[int, str] = dict()
+        if cache is not None:
+            tasks = cache.skip_cached(tasks, skipped, keys, env=env)
+        if schedule is not None:
+            tasks = schedule.sort(tasks)
+
+        # tasks are held in the parent and dispatched as slots and resources become available
+        queue = PackingQueue(tasks, capacity=capacity, window=max_queued)
+        tracker = self._tracker(total=len(paths) if hasattr(paths, "__len__") else None)
+        running: Dict[int, Tuple[Requirement, str, str]] = dict()
+        cores: Dict[int, List[int]] = dict()
+        attempts = Attempts(retry) if retry is not None else None
+        waiting: Dict[int, Tuple[Requirement, Tuple[int, str, str], threading.Timer]] = dict()
+        adjusting: List[threading.Timer] = list()
+        if fail_fast is not None and cancel is None:
+            cancel = CancelToken()
+        failures = Failures(fail_fast, cancel) if fail_fast is not None else None
+        logger.debug("Dispatching tasks to worker pool...")
+
+        def slots() -> int:
+            # number of concurrent tasks, adapted to the load of the host if requested
+            if concurrency is None:
+                return self.nprocesses
+            return min(self.nprocesses, concurrency.update(len(running)))
+
+        def dispatch():
+            while len(running) < slots() and not (cancel is not None and cancel.cancelled):
+                task = queue.pop()
+                if task is None:
+                    break
+
+                requirement, (i, c, p) = task
+                if affinity is not None:
+                    allocated = affinity.allocate(requirement)
+                    if allocated is None:
+                        # wait for running tasks to free their cores
+                        queue.release(requirement)
+                        queue.push(requirement, (i, c, p))
+                        break
+                    cores[i] = allocated
+
+                running[i] = (requirement, c, p)
+                callback, error_callback = tracker.register(i)
+                self._pool.apply_async(subprocess_command, args=(c,),
+                                       kwds=dict(path=p, shell=shell, env=env, pipe=pipe, timeout=timeout, grace=grace,
+                                                 cores=cores.get(i)),
+                                       callback=callback, error_callback=error_callback)
+
+            if queue and not running and not waiting and not (cancel is not None and cancel.cancelled):
+                # nothing left to free the resources the queued tasks wait for
+                logger.error(f"Queued tasks wait for resources held outside of the batch, {queue.capacity.free_cores} "
+                             f"of {queue.capacity.cores} cores are free.")
+                raise RuntimeError(f"Queued tasks wait for resources held outside of the batch, "
+                                   f"{queue.capacity.free_cores} of {queue.capacity.cores} cores are free.")
+
+            if concurrency is not None and queue and not adjusting and \
+                    concurrency.limit < min(concurrency.maximum, self.nprocesses):
+                # wake up when the limit is due for adjustment, to start more tasks in between completions
+                delay = max(POLL_INTERVAL, concurrency.next_update - time.monotonic())
+                adjusting.append(threading.Timer(delay, tracker.wake, args=(_ADJUST,)))
+                adjusting[0].start()
+
+        # yield responses as tasks complete
+        def flush() -> Iterator[Tuple[int, ResponseDict]]:
+            # tasks skipped by the journal or the cache count as completed in progress reports
+            while skipped:
+                callback, _ = tracker.register()
+                callback(None)
+                yield skipped.popleft()
+
+        if cancel is not None:
+            cancel.subscribe(tracker.stop)
+        try:
+            dispatch()
+            yield from flush()
+            for i, r in tracker.as_completed():
+                if i == _ADJUST:
+                    adjusting.clear()
+                    dispatch()
+                    yield from flush()
+                    continue
+
+                if i in waiting:
+                    # backoff of failed task elapsed, dispatch it again ahead of the queued tasks
+                    requirement, task, _ = waiting.pop(i)
+                    queue.push(requirement, task)
+                    dispatch()
+                    yield from flush()
+                    continue
+
+                if concurrency is not None:
+                    # sample the load with the completed task still counted, as the limit was reached while it ran
+                    concurrency.update(len(running))
+                requirement, c, p = running.pop(i)
+                queue.release(requirement)
+                if affinity is not None:
+                    affinity.release(cores.pop(i, None))
+                delay = attempts.failed(i, r) if attempts is not None else None
+                if delay is not None:
+                    # the timer completes a placeholder task, which keeps the tracker waiting during the backoff
+                    callback, _ = tracker.register(i, size=0)
+                    waiting[i] = (requirement, (i, c, p), threading.Timer(delay, callback, args=(None,)))
+                    waiting[i][2].start()
+                    dispatch()
+                    yield from flush()
+                    continue
+
+                if attempts is not None:
+                    r = attempts.final(i, r)
+                if failures is not None:
+                    failures.record(r)
+                dispatch()
+                if schedule is not None:
+                    schedule.record(c, r)
+                if journal is not None:
+                    journal.record(c, r)
+                if cache is not None and i in keys:
+                    cache.put(keys.pop(i), r)
+                yield i, r
+                yield from flush()
+
+            yield from flush()
+
+            if cancel is not None and cancel.cancelled:
+                yield from self._cancel_commands(running, waiting, queue, flush, cancel.reason)
+
+        finally:
+            if cancel is not None:
+                cancel.unsubscribe(tracker.stop)
+            for _, _, timer in waiting.values():
+                timer.cancel()
+            for timer in adjusting:
+                timer.cancel()
+            if running:
+                # iterator closed early or failed, stop the running tasks before their cores and resources are reused
+                self._restart()
+            for requirement, _, _ in running.values():
+                queue.release(requirement)
+            if affinity is not None:
+                for allocated in cores.values():
+                    affinity.release(allocated)
+            if schedule is not None:
+                schedule.save()
+            if owned:
+                journal.close()
+
+    def _cancel_commands(self, running: Dict[int, Tuple[Requirement, str, str]],
+                         waiting: Dict[int, Tuple[Requirement, Tuple[int, str, str], threading.Timer]],
+                         queue: PackingQueue, flush: Callable[[], Iterator[Tuple[int, ResponseDict]]],
+                         reason: Optional[str]) -> Iterator[Tuple[int, ResponseDict]]:
+        # stop the running tasks and respond to the tasks not completed
+        if running:
+            self._restart()
+        for i in list(running):
+            requirement, c, p = running.pop(i)
+            queue.release(requirement)
+            yield i, cancelled_response(c, p, reason)
+
+        for _, (i, c, p), timer in waiting.values():
+            timer.cancel()
+            yield i, cancelled_response(c, p, reason)
+        waiting.clear()
+
+        # tasks never dispatched, tasks that succeeded in an earlier run are still reported as such
+        cancelled = 0
+        for _, (i, c, p) in queue.drain():
+            cancelled += 1
+            yield i, cancelled_response(c, p, reason)
+            yield from flush()
+
+        yield from flush()
+
+        logger.debug(f"Cancelled batch, {cancelled} tasks were never dispatched.")
+
+    def map_commands(self, commands: Iterable[str], paths: Iterable[str], **options) -> List[ResponseDict]:
+        """
+        Execute commands over many work directories, see `iter_commands()` for the options.
+
+        Returns
+        -------
+        list
+            Collection of subprocess response, in the order of `paths`.
+
+        """
+        return in_order(self.iter_commands(commands, paths, **options))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shut down the worker pool.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Wait for pending tasks to complete. If False, pending tasks are stopped immediately.
+
+        """
+        if wait:
+            # prevent any more tasks from being submitted to the pool
+            self._pool.close()
+            logger.debug("Closed worker pool to prevent more tasks from being submitted.")
+
+            # provides a synchronization point that can report some exceptions occurring in worker processes
+            self._pool.join()
+            logger.debug("Join worker processes.")
+        else:
+            self._pool.terminate()
+            logger.debug("Terminated worker pool.")
+
+
+def iter_subprocess_commands(commands: Iterable[str], paths: Iterable[str], nprocesses: Optional[int]=None, shell: bool=False, env: Optional[Dict[str, str]]=None, pipe: bool=False, timeout: Optional[int]=None, *, progress: Optional[Callable[[int, int], None]]=None, progress_interval: float=15., mode: Literal["pool", "launcher"]="pool", schedule: Optional[LongestFirst]=None, resources: Optional[Union[Requirement, Iterable[Requirement]]]=None, capacity: Optional[Capacity]=None, max_queued: Optional[int]=None, journal: Optional[Union[str, Journal]]=None, resume: bool=False, cache: Optional[CommandCache]=None, retry: Optional[RetryPolicy]=None, speculate: Optional[float]=None, grace: float=GRACE_PERIOD, cancel: Optional[CancelToken]=None, fail_fast: Optional[Union[int, FailFast]]=None, concurrency: Optional[AdaptiveConcurrency]=None, affinity: Optional[CoreAffinity]=None, start_method: Optional[Literal["fork", "spawn", "forkserver"]]=None, preload: Optional[Iterable[str]]=None) -> Iterator[Tuple[int, ResponseDict]]:
+    r"""
+    Execute commands over many work directories in several parallel subprocess, yielding responses as tasks complete.
+
+    Parameters
+    ----------
+    commands: iterable
+        Commands to execute in each of the work directories/paths specified. If `commands` is a list or tuple of
+        length 1, that command will be executed in each of the work directories. May be a generator.
+    paths : iterable
+        Directories in which to execute program. May be a generator.
+    nprocesses: int, optional
+        Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
+    shell : bool, optional
+        Spin up a system dependent shell process (commonly /bin/sh on Linux or cmd.exe on Windows) and run the command
+        within it. Not needed if calling an executable file.
+    env : dict, optional
+        Environmental variables passed to program
+    pipe : bool, optional
+        Pipe standard out/err from subprocesses to parent process. Default is to dump standard out/err to a log file in
+        the specified work directory.
+    timeout : int, optional
+        Number of seconds before terminating the process
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for the tasks to complete. Default is to log
+        the number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+    mode : str, optional
+        Dispatch tasks to a pool of Python worker processes ('pool') or let the parent process launch the commands as
+        direct children ('launcher'). The launcher avoids the startup and memory cost of the worker processes.
+    schedule : LongestFirst, optional
+        Policy deciding the order in which tasks are dispatched, see `dtm.scheduling.LongestFirst`. Default is the
+        order of `paths`.
+    resources : dict or list, optional
+        Cores and memory (bytes) required by each task, e.g. `dict(cores=8, memory=40 * 2**30)`, see
+        `dtm.resources.Requirement`. A single requirement applies to all tasks. Tasks are started only when the
+        resources they require are free. Default is that tasks require no resources.
+    capacity : Capacity, optional
+        Cores and memory available to the tasks, see `dtm.resources.Capacity`. Default is the capacity of the host.
+    max_queued : int, optional
+        Maximum number of tasks taken from `commands` and `paths` and waiting in the parent process for dispatch, in
+        addition to the running tasks. Bounds the memory held by the parent for large or lazy inputs. Default is no
+        limit. Ignored if `schedule` is specified, since ordering the tasks requires all of them.
+    journal : str or Journal, optional
+        Journal to which the response of each task is appended and flushed to disk as the task completes, see
+        `dtm.journal.Journal`. A run that is interrupted, e.g. by a crash of the parent process, can be resumed from
+        the journal.
+    resume : bool, optional
+        Skip tasks that succeeded (status 'completed') according to `journal`, and dispatch only the remaining tasks.
+        The responses recorded in the journal are returned for the tasks skipped.
+    cache : CommandCache, optional
+        Cache of responses and output files keyed on the command, environment and input files of each task, see
+        `dtm.cache.CommandCache`. Tasks with cached results are not executed, their output files are restored to the
+        work directory and the cached response is returned, marked with `cached`. Completed tasks are cached.
+    retry : RetryPolicy, optional
+        Policy for retrying tasks that failed for transient reasons, see `dtm.retry.RetryPolicy`. Failed tasks are put
+        back in the queue after a backoff delay, ahead of the tasks not yet dispatched. The earlier attempts of a task
+        are recorded in `attempts` of its final response.
+    speculate : float, optional
+        Launcher only. Start a duplicate of a task that has run longer than `speculate` times the median runtime of the
+        completed tasks, in a copy of its work directory, when processes are idle and no tasks are waiting. The first
+        copy to complete wins and the other is killed, the winner is marked with `speculative` if it is the duplicate.
+        Only for idempotent commands.
+    grace : float, optional
+        Number of seconds the processes of a timed out task are given to exit after SIGTERM, before SIGKILL. Each task
+        is started in its own process group, and the whole group is terminated on timeout.
+    cancel : CancelToken, optional
+        Handle to cancel the batch, e.g. from another thread, see `dtm.cancel.CancelToken`. When cancelled, no more
+        tasks are dispatched, the running tasks are terminated (within the grace period) and the tasks not completed
+        get a response with status 'cancelled'.
+    fail_fast : int or FailFast, optional
+        Cancel the batch when the number of failed tasks reaches `fail_fast`, or according to a failure ratio, see
+        `dtm.cancel.FailFast`. Tasks fail if their final status, after retries, is not 'completed'.
+    concurrency : AdaptiveConcurrency, optional
+        Adapt the number of concurrently running tasks to the load and memory pressure of the host, between a minimum
+        and a maximum, see `dtm.concurrency.AdaptiveConcurrency`. `nprocesses` defaults to the maximum and bounds the
+        number of concurrent tasks.
+    affinity : CoreAffinity, optional
+        Pin each running task, and all processes it starts, to cores not shared with other tasks, see
+        `dtm.affinity.CoreAffinity`. A task gets as many cores as required by `resources`, and waits until they are
+        free. Avoids migration of the processes between cores, for reproducible, cache-friendly performance.
+    start_method : str, optional
+        Method starting the worker processes of the pool, 'fork', 'spawn' or 'forkserver', see `Executor`. Not used
+        by the launcher.
+    preload : list, optional
+        Modules imported by the forkserver with the 'forkserver' start method.
+
+    Yields
+    ------
+    tuple
+        Index of the task in `paths` and the subprocess response
+
+    Notes
+    -----
+    Responses are yielded in order of completion, not in the order of `paths`. Remaining tasks are stopped if the
+    iterator is closed before all tasks are completed.
+
+    """
+    options = dict(shell=shell, env=env, pipe=pipe, timeout=timeout, schedule=schedule, resources=resources,
+                   capacity=capacity, max_queued=max_queued, journal=journal, resume=resume, cache=cache,
+                   retry=retry, grace=grace, cancel=cancel, fail_fast=fail_fast, concurrency=concurrency,
+                   affinity=affinity)
+    if nprocesses is None and concurrency is not None:
+        nprocesses = concurrency.maximum
+
+    if mode == "launcher":
+        launcher = Launcher(nprocesses=nprocesses, progress=progress, progress_interval=progress_interval)
+        options.update(speculate=speculate)
+        yield from launcher.iter_commands(commands, paths, **options)
+        return
+
+    if speculate is not None:
+        logger.warning("Speculative execution requires the launcher mode, `speculate` is ignored.")
+
+    with Executor(nprocesses=nprocesses, progress=progress, progress_interval=progress_interval,
+                  start_method=start_method, preload=preload) as executor:
+        yield from executor.iter_commands(commands, paths, **options)
+
+
+def subprocess_commands(commands: Iterable[str], paths: Iterable[str], nprocesses: Optional[int]=None, shell: bool=False, env: Optional[Dict[str, str]]=None, pipe: bool=False, timeout: Optional[int]=None, *, progress: Optional[Callable[[int, int], None]]=None, progress_interval: float=15., mode: Literal["pool", "launcher"]="pool", schedule: Optional[LongestFirst]=None, resources: Optional[Union[Requirement, Iterable[Requirement]]]=None, capacity: Optional[Capacity]=None, max_queued: Optional[int]=None, journal: Optional[Union[str, Journal]]=None, resume: bool=False, cache: Optional[CommandCache]=None, retry: Optional[RetryPolicy]=None, speculate: Optional[float]=None, grace: float=GRACE_PERIOD, cancel: Optional[CancelToken]=None, fail_fast: Optional[Union[int, FailFast]]=None, concurrency: Optional[AdaptiveConcurrency]=None, affinity: Optional[CoreAffinity]=None, start_method: Optional[Literal["fork", "spawn", "forkserver"]]=None, preload: Optional[Iterable[str]]=None) -> List[ResponseDict]:
     r"""
     Execute commands over many work directories in several parallel subprocess.
 
     Parameters
     ----------
-    commands: list
-        Commands to execute in each of the work directories/paths specified. If `commands` is of length 1, that
-        command will be executed in each of the work directories.
-    paths : list
-        Directories in which to execute program
+    commands: iterable
+        Commands to execute in each of the work directories/paths specified. If `commands` is a list or tuple of
+        length 1, that command will be executed in each of the work directories. May be a generator.
+    paths : iterable
+        Directories in which to execute program. May be a generator.
     nprocesses: int, optional
         Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
     shell : bool, optional
@@ -173,58 +996,91 @@ def subprocess_commands(commands: List[str], paths: List[str], nprocesses: Optio
         the specified work directory.
     timeout : int, optional
         Number of seconds before terminating the process
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for the tasks to complete. Default is to log
+        the number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+    mode : str, optional
+        Dispatch tasks to a pool of Python worker processes ('pool') or let the parent process launch the commands as
+        direct children ('launcher'). The launcher avoids the startup and memory cost of the worker processes.
+    schedule : LongestFirst, optional
+        Policy deciding the order in which tasks are dispatched, see `dtm.scheduling.LongestFirst`. Default is the
+        order of `paths`.
+    resources : dict or list, optional
+        Cores and memory (bytes) required by each task, e.g. `dict(cores=8, memory=40 * 2**30)`, see
+        `dtm.resources.Requirement`. A single requirement applies to all tasks. Tasks are started only when the
+        resources they require are free. Default is that tasks require no resources.
+    capacity : Capacity, optional
+        Cores and memory available to the tasks, see `dtm.resources.Capacity`. Default is the capacity of the host.
+    max_queued : int, optional
+        Maximum number of tasks taken from `commands` and `paths` and waiting in the parent process for dispatch, in
+        addition to the running tasks. Bounds the memory held by the parent for large or lazy inputs. Default is no
+        limit. Ignored if `schedule` is specified, since ordering the tasks requires all of them.
+    journal : str or Journal, optional
+        Journal to which the response of each task is appended and flushed to disk as the task completes, see
+        `dtm.journal.Journal`. A run that is interrupted, e.g. by a crash of the parent process, can be resumed from
+        the journal.
+    resume : bool, optional
+        Skip tasks that succeeded (status 'completed') according to `journal`, and dispatch only the remaining tasks.
+        The responses recorded in the journal are returned for the tasks skipped.
+    cache : CommandCache, optional
+        Cache of responses and output files keyed on the command, environment and input files of each task, see
+        `dtm.cache.CommandCache`. Tasks with cached results are not executed, their output files are restored to the
+        work directory and the cached response is returned, marked with `cached`. Completed tasks are cached.
+    retry : RetryPolicy, optional
+        Policy for retrying tasks that failed for transient reasons, see `dtm.retry.RetryPolicy`. Failed tasks are put
+        back in the queue after a backoff delay, ahead of the tasks not yet dispatched. The earlier attempts of a task
+        are recorded in `attempts` of its final response.
+    speculate : float, optional
+        Launcher only. Start a duplicate of a task that has run longer than `speculate` times the median runtime of the
+        completed tasks, in a copy of its work directory, when processes are idle and no tasks are waiting. The first
+        copy to complete wins and the other is killed, the winner is marked with `speculative` if it is the duplicate.
+        Only for idempotent commands.
+    grace : float, optional
+        Number of seconds the processes of a timed out task are given to exit after SIGTERM, before SIGKILL. Each task
+        is started in its own process group, and the whole group is terminated on timeout.
+    cancel : CancelToken, optional
+        Handle to cancel the batch, e.g. from another thread, see `dtm.cancel.CancelToken`. When cancelled, no more
+        tasks are dispatched, the running tasks are terminated (within the grace period) and the tasks not completed
+        get a response with status 'cancelled'.
+    fail_fast : int or FailFast, optional
+        Cancel the batch when the number of failed tasks reaches `fail_fast`, or according to a failure ratio, see
+        `dtm.cancel.FailFast`. Tasks fail if their final status, after retries, is not 'completed'.
+    concurrency : AdaptiveConcurrency, optional
+        Adapt the number of concurrently running tasks to the load and memory pressure of the host, between a minimum
+        and a maximum, see `dtm.concurrency.AdaptiveConcurrency`. `nprocesses` defaults to the maximum and bounds the
+        number of concurrent tasks.
+    affinity : CoreAffinity, optional
+        Pin each running task, and all processes it starts, to cores not shared with other tasks, see
+        `dtm.affinity.CoreAffinity`. A task gets as many cores as required by `resources`, and waits until they are
+        free. Avoids migration of the processes between cores, for reproducible, cache-friendly performance.
+    start_method : str, optional
+        Method starting the worker processes of the pool, 'fork', 'spawn' or 'forkserver', see `Executor`. Not used
+        by the launcher.
+    preload : list, optional
+        Modules imported by the forkserver with the 'forkserver' start method.
 
     Returns
     -------
     list
-        Collection of subprocess response
+        Collection of subprocess response, in the order of `paths`.
 
-    """
-    if isinstance(commands, (list, tuple)):
-        if len(commands) == 1:
-            commands *= len(paths)      # duplicate command for all work directories
+    See Also
+    --------
+    iter_subprocess_commands : Yield responses as tasks complete.
 
-        elif len(commands) != len(paths):
-            logger.error(f"The number of commands must 1 or equal the number of paths. You specified "
-                         f"{len(commands)} commands and {len(paths)} paths.")
-    else:
-        logger.error(f"The `commands` parameter must be a tuple or a list, not {type(commands)}.")
-
-    # initiate worker pool
-    pool = mp.Pool(processes=nprocesses)
-    logger.debug(f"Initiated pool of {nprocesses} workers.")
-
-    # dispatch processes
-    logger.debug(f"Dispatching {len(paths)} tasks to worker pool...")
-    subprocesses = [pool.apply_async(subprocess_command, args=(c,), kwds=dict(path=p, shell=shell, env=env, pipe=pipe,
-                                                                              timeout=timeout))
-                    for c, p in zip(commands, paths)]
-
-    # report pending tasks
-    t0 = datetime.datetime.now()
-    while pool._cache:
-        t1 = datetime.datetime.now()
-        if (t1 - t0).total_seconds() >= 15:
-            logger.debug(f"Number of tasks pending: {len(pool._cache)}")
-            t0 = datetime.datetime.now()
-
-    # prevent any more tasks from being submitted to the pool
-    pool.close()
-    logger.debug("Closed worker pool to prevent more tasks from being submitted.")
-
-    # provides a synchronization point that can report some exceptions occurring in worker processes
-    pool.join()
-    logger.debug("Join worker processes.")
-
-    # retrieve response from processes
-    response: List[ResponseDict] = [p.get() for p in subprocesses]
-    logger.debug("Retrieved response from the processes:")
-    logger.debug(json.dumps(response, indent=2))
-
-    return response
+    """
+    return in_order(iter_subprocess_commands(commands, paths, nprocesses=nprocesses, shell=shell, env=env, pipe=pipe,
+                                             timeout=timeout, progress=progress, progress_interval=progress_interval,
+                                             mode=mode, schedule=schedule, resources=resources, capacity=capacity,
+                                             max_queued=max_queued, journal=journal, resume=resume, cache=cache,
+                                             retry=retry, speculate=speculate, grace=grace, cancel=cancel,
+                                             fail_fast=fail_fast, concurrency=concurrency, affinity=affinity,
+                                             start_method=start_method, preload=preload))
 
 
-def multiprocess_functions(functions: List[Callable], args: Optional[List[List[Any]]]=None, kwargs: Optional[List[Dict[str, Any]]]=None, nprocesses: Optional[int]=None) -> List[ResponseDict]:
+def multiprocess_functions(functions: List[Callable], args: Optional[List[List[Any]]]=None, kwargs: Optional[List[Dict[str, Any]]]=None, nprocesses: Optional[int]=None, progress: Optional[Callable[[int, int], None]]=None, progress_interval: float=15., chunksize: Optional[Union[int, Literal["auto"]]]=None, shared_memory: Union[bool, int]=False, shared_results: Union[bool, int]=False, initializer: Optional[Callable[..., None]]=None, initargs: Iterable[Any]=(), backend: Literal["process", "thread", "hybrid"]="process", threads: Optional[int]=None, start_method: Optional[Literal["fork", "spawn", "forkserver"]]=None, preload: Optional[Iterable[str]]=None, cache: Optional[FunctionCache]=None, cancel: Optional[CancelToken]=None) -> List[ResponseDict]:
     """
     Multiprocess functions.
 
@@ -238,59 +1094,78 @@ def multiprocess_functions(functions: List[Callable], args: Optional[List[List[A
         Function keyword arguments.
     nprocesses: int, optional
         Choose the number of concurrent processes. Default the number of CPUs, see ´os.cpu_count()´
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` while waiting for the tasks to complete. Default is to log
+        the number of pending tasks.
+    progress_interval : float, optional
+        Number of seconds between progress reports.
+    chunksize : int or str, optional
+        Number of functions sent to a worker process at a time. Sending many short functions in chunks reduces the
+        overhead of transferring each function to the workers. If 'auto', the chunk size is chosen from the measured
+        duration of the first functions, see `auto_chunksize()`. Default is to send the functions one at a time.
+    shared_memory : bool or int, optional
+        Place large arguments supporting the buffer protocol, e.g. NumPy arrays, in shared memory once instead of
+        pickling them for every function. The functions receive views of the shared memory, NumPy arrays as arrays and
+        other buffers as memoryview objects. If an integer, it is the minimum size in bytes of the arguments placed in
+        shared memory, see `dtm.shm.SHARED_MEMORY_THRESHOLD` for the default. The shared memory is released when all
+        functions have completed.
+    shared_results : bool or int, optional
+        Return large buffers in the function results, i.e. NumPy arrays and `pickle.PickleBuffer` objects,
+        out-of-band (pickle protocol 5) through memory-mapped files instead of pickling them through the result pipe.
+        The results received are backed by the memory maps, without intermediate copies. If an integer, it is the
+        minimum size in bytes of the buffers returned out-of-band, see `dtm.shm.SHARED_MEMORY_THRESHOLD` for the
+        default.
+    initializer : callable, optional
+        Function called as `initializer(*initargs)` once in each worker process before it executes any function, e.g.
+        to import heavy modules or load data. Resources stored in the worker context, see
+        `dtm.context.worker_context()`, are available to all functions executed by that worker.
+    initargs : tuple, optional
+        Arguments to `initializer`
+    backend : str, optional
+        Execute the functions in worker processes ('process', default), in threads ('thread') or in threads within
+        worker processes ('hybrid'), see `Executor`. Threads avoid the startup of processes and the pickling of
+        arguments and results, and suit functions waiting on I/O or releasing the GIL.
+    threads : int, optional
+        Number of threads in each worker process with the 'hybrid' backend. Default is to divide the CPUs between the
+        worker processes.
+    start_method : str, optional
+        Method starting the worker processes, 'fork', 'spawn' or 'forkserver', see `Executor`. Spawned workers and
+        workers forked from the forkserver do not inherit the address space of the parent process.
+    preload : list, optional
+        Modules imported by the forkserver with the 'forkserver' start method, e.g. heavy modules used by the functions.
+    cache : FunctionCache, optional
+        Persistent cache of function results keyed on the function, its source code and its arguments, see
+        `dtm.cache.FunctionCache`. Cached results are returned without dispatching the functions to the workers,
+        and the results of the other functions are cached. Only for pure functions.
+    cancel : CancelToken, optional
+        Handle to cancel the batch, e.g. from another thread, see `dtm.cancel.CancelToken`. When cancelled, the
+        workers are terminated and restarted, and the result of the functions not completed is `dtm.cancel.CANCELLED`.
+        Functions running in threads ('thread' backend) cannot be stopped, their results are discarded.
 
     Returns
     -------
     list
         Collection of function responses.
 
+    Raises
+    ------
+    Exception
+        The exception raised by the first function that fails, which is re-raised in the parent process.
+
     Notes
     -----
     The order of the returned response equals the order of the input functions and its arguments.
 
-    """
-    if args is not None and len(functions) != len(args):
-        logger.error(f"The number of functions must equal the number of argument sets. You specified {len(functions)} "
-                     f"functions and {len(args)} argument sets.")
-    elif args is None:
-        args = [list() for _ in functions]
-
-    if kwargs is not None and len(functions) != len(kwargs):
-        logger.error(f"The number of functions must equal the number of keyword argument sets. You specified "
-                     f"{len(functions)} functions and {len(kwargs)} argument sets.")
-    elif kwargs is None:
-        kwargs = [dict() for _ in functions]
-
-    # initiate worker pool
-    pool = mp.Pool(processes=nprocesses)
-    logger.debug(f"Initiated pool of {nprocesses} workers.")
-
-    # dispatch processes
-    logger.debug(f"Dispatching {len(functions)} tasks to worker pool...")
-    processes = [pool.apply_async(f, args=a, kwds=k) for f, a, k in zip(functions, args, kwargs)]
-
-    # report pending tasks
-    t0 = datetime.datetime.now()
-    while pool._cache:
-        t1 = datetime.datetime.now()
-        if (t1 - t0).total_seconds() >= 15:
-            logger.debug(f"Number of tasks pending: {len(pool._cache)}")
-            t0 = datetime.datetime.now()
-
-    # prevent any more tasks from being submitted to the pool
-    # pool.close()
-    logger.debug("Closed worker pool to prevent more tasks from being submitted.")
-
-    # provides a synchronization point that can report some exceptions occurring in worker processes
-    # pool.join()
-    logger.debug("Join worker processes.")
-
-    # retrieve response from processes
-    response = [p.get() for p in processes]
-    logger.debug("Retrieved response from the processes:")
-    logger.debug(json.dumps(response, indent=2))
+    Unlike `subprocess_commands()`, there is no `fail_fast` for functions. A function raising an exception aborts the
+    batch, the remaining functions are stopped and the results of the functions that completed are discarded. To keep
+    partial results, catch the exceptions in the functions and return them as results instead.
 
-    return response
+    """
+    with Executor(nprocesses=nprocesses, progress=progress, progress_interval=progress_interval,
+                  initializer=initializer, initargs=initargs, backend=backend, threads=threads,
+                  start_method=start_method, preload=preload) as executor:
+        return executor.map(functions, args=args, kwargs=kwargs, chunksize=chunksize, shared_memory=shared_memory,
+                            shared_results=shared_results, cache=cache, cancel=cancel)
 
 
 def parse_path_file(filename: str) -> List[str]:
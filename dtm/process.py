@@ -0,0 +1,302 @@
+"""
+Module with process groups, terminating a command together with all the processes it started
+"""
+import multiprocessing as mp
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Iterator, Tuple
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# seconds between SIGTERM and SIGKILL when terminating the processes of a task
+GRACE_PERIOD = 5.
+
+# seconds to wait for the processes to disappear after SIGKILL
+KILL_TIMEOUT = 1.
+
+# polling interval (seconds) while waiting for the processes of a group to terminate
+POLL_INTERVAL = 0.01
+
+# commands running in this process, their grace periods and owners, terminated when the process is asked to terminate
+_running: Dict[subprocess.Popen, Tuple[float, Optional[object]]] = dict()
+# reentrant, the signal handler terminating the commands may interrupt the main thread while it holds the lock
+_lock = threading.RLock()
+
+# owner of the commands tracked by each thread
+_local = threading.local()
+
+
+def session_options() -> Dict[str, Any]:
+    """
+    Options to `subprocess.Popen` starting the child in its own session, and thereby its own process group.
+
+    Returns
+    -------
+    dict
+        Keyword arguments to `subprocess.Popen` and `asyncio.create_subprocess_exec`
+
+    """
+    if os.name == "posix":
+        return dict(start_new_session=True)
+
+    return dict(creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+
+
+def signal_group(pgid: int, sig: int) -> None:
+    """
+    Send signal to all processes in process group, ignoring groups that are already gone.
+
+    Parameters
+    ----------
+    pgid : int
+        Process group id, the process id of the group leader
+    sig : int
+        Signal number
+
+    """
+    try:
+        os.killpg(pgid, sig)
+    except ProcessLookupError:
+        pass
+    except PermissionError:
+        # a process in the group changed its credentials, e.g. a setuid program
+        logger.warning(f"Not permitted to signal all processes in process group {pgid}.")
+
+
+def _members(pgid: int) -> Optional[int]:
+    """Number of live (not zombie) processes in process group, None if /proc is not available."""
+    try:
+        pids = [pid for pid in os.listdir("/proc") if pid.isdigit()]
+    except OSError:
+        return None
+
+    count = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue        # terminated while scanning
+
+        # the command name in parentheses may contain spaces, the fields following it are state, ppid and pgrp
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 2 and int(fields[2]) == pgid and fields[0] != "Z":
+            count += 1
+
+    return count
+
+
+def group_alive(pgid: int) -> bool:
+    """
+    Check if any process in process group is still alive.
+
+    Parameters
+    ----------
+    pgid : int
+        Process group id
+
+    Returns
+    -------
+    bool
+        True if the group has live processes. Zombies, terminated processes not yet reaped by their parent, are
+        disregarded where /proc is available.
+
+    """
+    members = _members(pgid)
+    if members is not None:
+        return members > 0
+
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    else:
+        return True
+
+
+def _wait_group(process: subprocess.Popen, timeout: float) -> bool:
+    """Wait up to `timeout` seconds for all processes in the group of child to terminate, reaping the child."""
+    deadline = time.monotonic() + timeout
+    while True:
+        process.poll()
+        if not group_alive(process.pid):
+            return True
+
+        if time.monotonic() >= deadline:
+            return False
+
+        time.sleep(POLL_INTERVAL)
+
+
+def terminate_group(process: subprocess.Popen, grace: float = GRACE_PERIOD) -> bool:
+    """
+    Terminate child started with `session_options()` and all its descendants in the same process group.
+
+    The group is sent SIGTERM, and SIGKILL if any of its processes are still alive after the grace period.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+        Child process, leader of its process group
+    grace : float, optional
+        Number of seconds the processes are given to exit after SIGTERM
+
+    Returns
+    -------
+    bool
+        True if no processes of the group remain. Descendants that started a session of their own are not part of the
+        group and are not terminated.
+
+    Notes
+    -----
+    On Windows only the child itself is terminated.
+
+    """
+    if os.name != "posix":
+        process.terminate()
+        try:
+            process.wait(grace)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        return True
+
+    pgid = process.pid
+    signal_group(pgid, signal.SIGTERM)
+    if _wait_group(process, grace):
+        return True
+
+    logger.debug("\t" + f"Processes in group {pgid} still alive {grace} seconds after SIGTERM, sending SIGKILL.")
+    signal_group(pgid, signal.SIGKILL)
+    gone = _wait_group(process, KILL_TIMEOUT)
+    process.wait()
+    if not gone:
+        logger.warning(f"Processes in group {pgid} are still alive after SIGKILL.")
+
+    return gone
+
+
+def interrupt_group(process: subprocess.Popen) -> None:
+    """
+    Ask child started with `session_options()` and all its descendants in the same process group to exit (SIGTERM),
+    without waiting.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+        Child process, leader of its process group
+
+    """
+    if os.name != "posix":
+        process.terminate()
+    else:
+        signal_group(process.pid, signal.SIGTERM)
+
+
+def kill_group(process: subprocess.Popen) -> None:
+    """
+    Kill child started with `session_options()` and all its descendants in the same process group, without waiting.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+        Child process, leader of its process group
+
+    """
+    if os.name != "posix":
+        process.kill()
+    else:
+        signal_group(process.pid, signal.SIGKILL)
+
+
+def set_owner(owner: Optional[object]) -> None:
+    """
+    Set the owner of the commands tracked by the calling thread, e.g. the executor whose worker thread it is, see
+    `terminate_running()`.
+
+    Parameters
+    ----------
+    owner : object
+        Owner of the commands, None for no owner
+
+    """
+    _local.owner = owner
+
+
+@contextmanager
+def tracked(process: subprocess.Popen, grace: float = GRACE_PERIOD) -> Iterator[subprocess.Popen]:
+    """
+    Keep track of child started with `session_options()` while it runs, see `terminate_running()`.
+
+    Parameters
+    ----------
+    process : subprocess.Popen
+        Child process, leader of its process group
+    grace : float, optional
+        Number of seconds the processes of the child are given to exit after SIGTERM
+
+    """
+    with _lock:
+        _running[process] = (grace, getattr(_local, "owner", None))
+    try:
+        yield process
+    finally:
+        with _lock:
+            _running.pop(process, None)
+
+
+def terminate_running(owner: Optional[object] = None) -> None:
+    """
+    Terminate the process groups of tracked children of this process, see `tracked()`.
+
+    The groups are sent SIGTERM at once, and SIGKILL if any of their processes are still alive after the grace period.
+    The children are not reaped, so that this is safe to call from a signal handler interrupting `Popen.wait()`.
+
+    Parameters
+    ----------
+    owner : object, optional
+        Terminate only the children tracked by threads of this owner, see `set_owner()`. Default is all children.
+
+    """
+    with _lock:
+        running = [(p, grace) for p, (grace, o) in _running.items() if owner is None or o is owner]
+
+    if not running:
+        return
+
+    logger.debug(f"Terminating {len(running)} running commands.")
+    t0 = time.monotonic()
+    for process, _ in running:
+        interrupt_group(process)
+
+    if os.name != "posix":
+        return
+
+    for process, grace in running:
+        while group_alive(process.pid) and time.monotonic() < t0 + grace:
+            time.sleep(POLL_INTERVAL)
+        if group_alive(process.pid):
+            kill_group(process)
+
+
+def _terminate(signum: int, frame: Any) -> None:
+    """Terminate the running commands before the process itself terminates."""
+    terminate_running()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def terminate_on_signal() -> None:
+    """
+    Terminate the running commands of this process when it receives SIGTERM, e.g. worker processes of a pool that is
+    terminated. Without, the commands would keep running, since they are started in sessions of their own.
+    """
+    if os.name == "posix" and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _terminate)
@@ -0,0 +1,224 @@
+"""
+Module with bookkeeping of host resources and resource-aware dispatch of tasks
+"""
+import multiprocessing as mp
+import os
+from collections import deque
+from typing import TypedDict, Optional, Iterable, Iterator, Tuple, Deque, TypeVar
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+T = TypeVar("T")
+
+
+class Requirement(TypedDict, total=False):
+    cores: int
+    memory: int
+
+
+def total_memory() -> Optional[int]:
+    """
+    Physical memory of the host.
+
+    Returns
+    -------
+    int
+        Number of bytes, None if it cannot be determined on this platform.
+
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class Capacity:
+    """
+    Cores and memory available to tasks on the host.
+
+    Parameters
+    ----------
+    cores : int, optional
+        Number of cores. Default the number of CPUs, see ´os.cpu_count()´
+    memory : int, optional
+        Number of bytes of memory. Default the physical memory of the host, unlimited if it cannot be determined.
+
+    """
+
+    def __init__(self, cores: Optional[int] = None, memory: Optional[int] = None):
+        self.cores = cores if cores is not None else os.cpu_count()
+        self.memory = memory if memory is not None else total_memory()
+        self.free_cores = self.cores
+        self.free_memory = self.memory
+
+    def __repr__(self) -> str:
+        return f"Capacity(cores={self.cores}, memory={self.memory})"
+
+    def fits(self, requirement: Requirement) -> bool:
+        """
+        Check if requirement can ever be satisfied, i.e. does not exceed the total capacity.
+
+        Parameters
+        ----------
+        requirement : Requirement
+            Cores and memory required by task
+
+        Returns
+        -------
+        bool
+            True if the requirement can be satisfied
+
+        """
+        if requirement.get("cores", 1) > self.cores:
+            return False
+
+        return self.memory is None or requirement.get("memory", 0) <= self.memory
+
+    def available(self, requirement: Requirement) -> bool:
+        """
+        Check if requirement can be satisfied by the resources currently free.
+
+        Parameters
+        ----------
+        requirement : Requirement
+            Cores and memory required by task
+
+        Returns
+        -------
+        bool
+            True if the requirement can be satisfied now
+
+        """
+        if requirement.get("cores", 1) > self.free_cores:
+            return False
+
+        return self.free_memory is None or requirement.get("memory", 0) <= self.free_memory
+
+    def acquire(self, requirement: Requirement) -> None:
+        """Reserve resources for task."""
+        self.free_cores -= requirement.get("cores", 1)
+        if self.free_memory is not None:
+            self.free_memory -= requirement.get("memory", 0)
+
+    def release(self, requirement: Requirement) -> None:
+        """Release resources reserved for task."""
+        self.free_cores += requirement.get("cores", 1)
+        if self.free_memory is not None:
+            self.free_memory += requirement.get("memory", 0)
+
+
+class PackingQueue:
+    """
+    Queue of tasks released as the resources they require become available.
+
+    Tasks are considered in queue order, and the first task fitting in the free resources is released (first-fit).
+    Smaller tasks may thus be started ahead of a larger task waiting for resources, keeping utilization high.
+
+    Parameters
+    ----------
+    tasks : iterable
+        Pairs of resource requirement and task, in the preferred order of dispatch. The cores of a requirement default
+        to 1 and the memory to 0 if not specified. The iterable is consumed lazily, as tasks are released.
+    capacity : Capacity, optional
+        Resources available to the tasks. Default is the capacity of the host.
+    window : int, optional
+        Maximum number of tasks taken from `tasks` and waiting in the queue, which bounds the memory held by the queue
+        and the number of tasks considered when packing. Default is no limit.
+
+    Raises
+    ------
+    ValueError
+        If a task requires more resources than the total capacity.
+
+    """
+
+    def __init__(self, tasks: Iterable[Tuple[Requirement, T]], capacity: Optional[Capacity] = None,
+                 window: Optional[int] = None):
+        self.capacity = capacity if capacity is not None else Capacity()
+        self.window = window
+        self._source = iter(tasks)
+        self._queue: Deque[Tuple[Requirement, T]] = deque()
+        self._exhausted = False
+
+    def __len__(self) -> int:
+        self._fill()
+        return len(self._queue)
+
+    def _fill(self) -> None:
+        """Take tasks from the source until the window is full."""
+        while not self._exhausted and (self.window is None or len(self._queue) < self.window):
+            try:
+                requirement, task = next(self._source)
+            except StopIteration:
+                self._exhausted = True
+                break
+
+            if not self.capacity.fits(requirement):
+                logger.error(f"Task {task} requires {requirement}, which exceeds the available {self.capacity}.")
+                raise ValueError(f"Task {task} requires {requirement}, which exceeds the available {self.capacity}.")
+
+            self._queue.append((requirement, task))
+
+    def pop(self) -> Optional[Tuple[Requirement, T]]:
+        """
+        Release the first task fitting in the free resources and reserve its resources.
+
+        Returns
+        -------
+        tuple
+            Requirement and task, None if no task fits in the free resources.
+
+        """
+        self._fill()
+        for position, (requirement, task) in enumerate(self._queue):
+            if self.capacity.available(requirement):
+                self.capacity.acquire(requirement)
+                del self._queue[position]
+                return requirement, task
+
+        return None
+
+    def push(self, requirement: Requirement, task: T) -> None:
+        """
+        Put task back in front of the queue, e.g. to retry it.
+
+        Parameters
+        ----------
+        requirement : Requirement
+            Resources required by the task
+        task : object
+            Task
+
+        """
+        self._queue.appendleft((requirement, task))
+
+    def drain(self) -> Iterator[Tuple[Requirement, T]]:
+        """
+        Remove all tasks from the queue, including those not yet taken from `tasks`, e.g. to cancel them.
+
+        Yields
+        ------
+        tuple
+            Requirement and task, in queue order. No resources are reserved.
+
+        """
+        while self._queue:
+            yield self._queue.popleft()
+
+        for requirement, task in self._source:
+            yield requirement, task
+
+        self._exhausted = True
+
+    def release(self, requirement: Requirement) -> None:
+        """
+        Release resources reserved for completed task.
+
+        Parameters
+        ----------
+        requirement : Requirement
+            Resources required by the task
+
+        """
+        self.capacity.release(requirement)
@@ -0,0 +1,190 @@
+"""
+Module with policies for retrying tasks that failed for transient reasons
+"""
+import multiprocessing as mp
+import os
+import re
+import random
+from typing import TYPE_CHECKING, Optional, List, Any, Dict, Iterable, Pattern, Union
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# number of bytes at the end of the task log searched for patterns
+LOG_TAIL = 2 ** 16
+
+
+class RetryPolicy:
+    """
+    Retry failed tasks with exponential backoff, if the failure is classified as transient.
+
+    A failure is transient if its status is in `statuses`, its return code is in `returncodes`, or its output matches
+    one of `patterns`. The task is dispatched again after a delay of `backoff * factor**(n - 1)` seconds, where `n` is
+    the number of failed attempts, until it succeeds or `attempts` attempts are made.
+
+    Parameters
+    ----------
+    attempts : int, optional
+        Maximum number of attempts, including the first.
+    statuses : list, optional
+        Statuses always classified as transient, 'error' and/or 'timeout'. Default is both, i.e. all failures are
+        retried. Specify an empty list to let the return codes and patterns decide.
+    returncodes : list, optional
+        Return codes classified as transient
+    patterns : list, optional
+        Regular expressions searched for in the output of the task (piped output or the end of the task log), e.g.
+        `[r"license checkout failed", r"Stale file handle"]`.
+    backoff : float, optional
+        Delay in seconds before the first retry
+    factor : float, optional
+        Factor by which the delay grows with each retry
+    max_backoff : float, optional
+        Maximum delay in seconds
+    jitter : float, optional
+        Random variation of the delay, as a fraction of the delay, spreading out retries of tasks that failed together.
+
+    Examples
+    --------
+    >>> policy = RetryPolicy(attempts=4, statuses=["timeout"], returncodes=[75], patterns=[r"license"], backoff=30.)
+    >>> responses = subprocess_commands(["solve"], paths, retry=policy)
+
+    """
+
+    def __init__(self, attempts: int = 3, statuses: Iterable[str] = ("error", "timeout"), returncodes: Iterable[int] = (),
+                 patterns: Iterable[Union[str, Pattern]] = (), backoff: float = 1., factor: float = 2.,
+                 max_backoff: float = 300., jitter: float = 0.):
+        self.attempts = attempts
+        self.statuses = set(statuses)
+        self.returncodes = set(returncodes)
+        self.patterns = [re.compile(p) for p in patterns]
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def _output(self, response: "ResponseDict") -> str:
+        """Output of the task, the end of the task log if not piped."""
+        if response.get("output"):
+            return response.get("output")
+
+        try:
+            with open(os.path.join(response.get("path"), "log.txt"), "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(f.tell() - LOG_TAIL, 0))
+                return f.read().decode(errors="replace")
+        except (IOError, TypeError):
+            return ""
+
+    def transient(self, response: "ResponseDict") -> bool:
+        """
+        Classify failure.
+
+        Parameters
+        ----------
+        response : ResponseDict
+            Response of failed task
+
+        Returns
+        -------
+        bool
+            True if the failure is transient and the task may succeed if retried
+
+        """
+        if response.get("status") in self.statuses:
+            return True
+
+        if response.get("status") == "error" and response.get("returncode") in self.returncodes:
+            return True
+
+        if self.patterns and response.get("status") in ("error", "timeout"):
+            output = self._output(response)
+            return any(p.search(output) for p in self.patterns)
+
+        return False
+
+    def retry(self, response: "ResponseDict", attempt: int) -> bool:
+        """
+        Check if the task should be retried.
+
+        Parameters
+        ----------
+        response : ResponseDict
+            Response of the attempt
+        attempt : int
+            Number of the attempt, starting at 1
+
+        Returns
+        -------
+        bool
+            True if the task should be dispatched again
+
+        """
+        if response.get("status") == "completed" or attempt >= self.attempts:
+            return False
+
+        return self.transient(response)
+
+    def delay(self, attempt: int) -> float:
+        """
+        Delay before dispatching the task again.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of the failed attempt, starting at 1
+
+        Returns
+        -------
+        float
+            Number of seconds
+
+        """
+        delay = min(self.backoff * self.factor ** (attempt - 1), self.max_backoff)
+        if self.jitter:
+            delay *= 1. + random.uniform(-self.jitter, self.jitter)
+
+        return max(delay, 0.)
+
+
+def summary(response: "ResponseDict") -> Dict[str, Any]:
+    """Summary of attempt recorded in the attempt history."""
+    return dict(pid=response.get("pid"), returncode=response.get("returncode"), status=response.get("status"),
+                msg=response.get("msg"), runtime=response.get("runtime"))
+
+
+class Attempts:
+    """Attempt history of the tasks in a batch, by task index."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self._history: Dict[int, List[Dict[str, Any]]] = dict()
+
+    def failed(self, index: int, response: "ResponseDict") -> Optional[float]:
+        """
+        Record attempt of task.
+
+        Returns
+        -------
+        float
+            Delay before retrying the task, None if the task is not to be retried.
+
+        """
+        attempt = len(self._history.get(index, ())) + 1
+        if not self.policy.retry(response, attempt):
+            return None
+
+        self._history.setdefault(index, list()).append(summary(response))
+        delay = self.policy.delay(attempt)
+        logger.debug("\t" + f"Attempt {attempt} of task in '{response.get('path')}' failed ({response.get('status')}), "
+                            f"retrying in {delay:.1f} seconds.")
+        return delay
+
+    def final(self, index: int, response: "ResponseDict") -> "ResponseDict":
+        """Attach the history of earlier attempts to the final response of task."""
+        if index in self._history:
+            response["attempts"] = self._history.pop(index)
+
+        return response
@@ -0,0 +1,274 @@
+"""
+Module with policies deciding the order in which tasks are dispatched
+"""
+import multiprocessing as mp
+import os
+import json
+import tempfile
+from itertools import repeat
+from typing import TYPE_CHECKING, Optional, List, Callable, Dict, Union, Iterable, Iterator, Tuple
+
+from .resources import Requirement
+
+if TYPE_CHECKING:
+    from .main import ResponseDict
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# task as queued for dispatch: resource requirement and index, command and work directory of the task
+CommandTask = Tuple[Requirement, Tuple[int, str, str]]
+
+
+def command_tasks(commands: Iterable[str], paths: Iterable[str],
+                  resources: Optional[Union[Requirement, Iterable[Requirement]]] = None) -> Iterator[CommandTask]:
+    """
+    Pair commands with work directories, lazily.
+
+    Parameters
+    ----------
+    commands: iterable
+        Commands to execute in each of the work directories/paths specified. If `commands` is a list or tuple of
+        length 1, that command will be executed in each of the work directories.
+    paths : iterable
+        Directories in which to execute program
+    resources : dict or iterable, optional
+        Resources required by each task. A single requirement applies to all tasks. Default is that tasks require no
+        resources.
+
+    Yields
+    ------
+    tuple
+        Resource requirement and a tuple of the index, command and work directory of the task
+
+    """
+    if isinstance(commands, (list, tuple)):
+        if len(commands) == 1:
+            commands = repeat(commands[0])      # duplicate command for all work directories
+
+        elif isinstance(paths, (list, tuple)) and len(commands) != len(paths):
+            logger.error(f"The number of commands must 1 or equal the number of paths. You specified "
+                         f"{len(commands)} commands and {len(paths)} paths.")
+    elif isinstance(commands, str) or not hasattr(commands, "__iter__"):
+        logger.error(f"The `commands` parameter must be a tuple, a list or an iterable, not {type(commands)}.")
+
+    if resources is None:
+        resources = Requirement(cores=0, memory=0)
+
+    if isinstance(resources, dict):
+        resources = repeat(resources)
+
+    for i, (c, p, r) in enumerate(zip(commands, paths, resources)):
+        yield r, (i, c, p)
+
+
+def in_order(responses: Iterable[Tuple[int, "ResponseDict"]]) -> List["ResponseDict"]:
+    """
+    Collect responses yielded as tasks complete in the order of the tasks.
+
+    Parameters
+    ----------
+    responses : iterable
+        Index of each task and its response, as yielded by `dtm.main.iter_subprocess_commands()`
+
+    Returns
+    -------
+    list
+        Collection of subprocess response, in the order of `paths`.
+
+    """
+    completed = dict(responses)
+    response = [completed[i] for i in sorted(completed)]
+
+    # retrieve response from processes
+    logger.debug("Retrieved response from the processes:")
+    logger.debug(json.dumps(response, indent=2))
+
+    return response
+
+
+class RuntimeHistory:
+    """
+    Runtimes of commands recorded in earlier runs, keyed on command and work directory.
+
+    Parameters
+    ----------
+    filename : str
+        Path to JSON file in which the runtimes are persisted. The file is created on `save()` if it does not exist.
+
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._runtimes: Dict[str, Dict[str, float]] = dict()
+
+        if os.path.isfile(filename):
+            try:
+                with open(filename) as f:
+                    self._runtimes = json.load(f)
+            except (IOError, ValueError):
+                logger.warning(f"Could not read runtime history from '{filename}', starting from scratch.")
+            else:
+                logger.debug(f"Read runtime history from '{filename}'.")
+
+    def get(self, command: str, path: str) -> Optional[float]:
+        """
+        Get runtime recorded for command in work directory.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        path : str
+            Work directory
+
+        Returns
+        -------
+        float
+            Runtime in seconds, None if not recorded.
+
+        """
+        return self._runtimes.get(command, dict()).get(os.path.abspath(path))
+
+    def record(self, command: str, path: str, runtime: float) -> None:
+        """
+        Record runtime of command in work directory.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        path : str
+            Work directory
+        runtime : float
+            Runtime in seconds
+
+        """
+        self._runtimes.setdefault(command, dict())[os.path.abspath(path)] = runtime
+
+    def save(self) -> None:
+        """Write the runtimes to file, replacing the file atomically."""
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._runtimes, f, indent=2)
+        os.replace(tmp, self.filename)
+        logger.debug(f"Runtime history written to '{self.filename}'.")
+
+
+class LongestFirst:
+    """
+    Dispatch tasks in order of decreasing expected duration (longest processing time first).
+
+    Starting the longest tasks first reduces the time at the end of a batch where only a few long tasks are running
+    and the remaining processes are idle.
+
+    Parameters
+    ----------
+    cost : callable, optional
+        Function returning the expected duration (or any quantity proportional to it) of the task in a work directory,
+        called as `cost(path)`.
+    history : str or RuntimeHistory, optional
+        Runtimes recorded in earlier runs, used to estimate the duration of tasks. The runtimes of completed tasks are
+        recorded and saved when the batch ends.
+
+    Notes
+    -----
+    If both `cost` and `history` are specified, recorded runtimes take precedence and `cost` is used for tasks without
+    a recorded runtime. Tasks with unknown duration are dispatched first.
+
+    """
+
+    def __init__(self, cost: Optional[Callable[[str], float]] = None,
+                 history: Optional[Union[str, RuntimeHistory]] = None):
+        if cost is None and history is None:
+            raise ValueError("Specify either the cost function or the runtime history, or both.")
+
+        self.cost = cost
+        self.history = RuntimeHistory(history) if isinstance(history, str) else history
+
+    def expected_duration(self, command: str, path: str) -> float:
+        """
+        Expected duration of command in work directory.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        path : str
+            Work directory
+
+        Returns
+        -------
+        float
+            Expected duration, infinite if unknown.
+
+        """
+        if self.history is not None:
+            runtime = self.history.get(command, path)
+            if runtime is not None:
+                return runtime
+
+        if self.cost is not None:
+            return self.cost(path)
+
+        return float("inf")
+
+    def order(self, commands: List[str], paths: List[str]) -> List[int]:
+        """
+        Order in which to dispatch the tasks.
+
+        Parameters
+        ----------
+        commands : list
+            Command of each task
+        paths : list
+            Work directory of each task
+
+        Returns
+        -------
+        list
+            Task indices, longest expected duration first.
+
+        """
+        durations = [self.expected_duration(c, p) for c, p in zip(commands, paths)]
+        return sorted(range(len(durations)), key=lambda i: durations[i], reverse=True)
+
+    def sort(self, tasks: Iterable[CommandTask]) -> List[CommandTask]:
+        """
+        Sort tasks in the order in which to dispatch them.
+
+        Parameters
+        ----------
+        tasks : iterable
+            Tasks as yielded by `command_tasks()`
+
+        Returns
+        -------
+        list
+            Tasks, longest expected duration first.
+
+        """
+        tasks = list(tasks)
+        order = self.order([c for _, (_, c, _) in tasks], [p for _, (_, _, p) in tasks])
+        return [tasks[i] for i in order]
+
+    def record(self, command: str, response: "ResponseDict") -> None:
+        """
+        Record runtime of completed task.
+
+        Parameters
+        ----------
+        command : str
+            Command
+        response : ResponseDict
+            Task response
+
+        """
+        if self.history is not None and response.get("status") == "completed" and "runtime" in response:
+            self.history.record(command, response.get("path"), response.get("runtime"))
+
+    def save(self) -> None:
+        """Persist the recorded runtimes."""
+        if self.history is not None:
+            self.history.save()
@@ -0,0 +1,350 @@
+"""
+Module with transport of large buffers between processes through shared memory
+"""
+import multiprocessing as mp
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, List, Any, Dict, Tuple
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, other buffers are shared as memoryview
+    np = None
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+# minimum size (bytes) of arguments placed in shared memory
+SHARED_MEMORY_THRESHOLD = 2 ** 20
+
+# shared memory segments attached by this (worker) process
+_attached: Dict[str, SharedMemory] = dict()
+
+# whether the resource tracker of each process is inherited from its parent, by process id
+_inherited_tracker: Dict[int, bool] = dict()
+
+
+def _tracker_inherited() -> bool:
+    """Check if this process shares the resource tracker of its parent, which is running when the process starts."""
+    pid = os.getpid()
+    if pid not in _inherited_tracker:
+        _inherited_tracker[pid] = resource_tracker._resource_tracker._fd is not None
+
+    return _inherited_tracker[pid]
+
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to shared memory segment owned by another process."""
+    if name not in _attached:
+        if sys.version_info >= (3, 13):
+            _attached[name] = SharedMemory(name=name, track=False)
+        else:
+            inherited = _tracker_inherited()
+            _attached[name] = SharedMemory(name=name)
+            if not inherited:
+                # a tracker of its own, e.g. of a worker forked before the tracker of the parent started, would warn
+                # about a leak and unlink the segment when the worker exits, the segment is unlinked by its owner
+                resource_tracker.unregister(_attached[name]._name, "shared_memory")
+
+    return _attached[name]
+
+
+def detach() -> None:
+    """Detach from shared memory segments no longer referenced by this process."""
+    for name in list(_attached):
+        try:
+            _attached[name].close()
+        except BufferError:
+            # views of the segment are still alive, try again later
+            continue
+        else:
+            del _attached[name]
+
+
+class SharedBuffer:
+    """
+    Reference to a buffer placed in shared memory, sent to worker processes instead of the buffer itself.
+
+    Parameters
+    ----------
+    name : str
+        Name of the shared memory segment
+    nbytes : int
+        Size of the buffer in bytes
+    format : str
+        Format of the buffer items, see `struct`
+    shape : tuple
+        Shape of the buffer
+    dtype : str, optional
+        NumPy dtype if the buffer is a NumPy array
+
+    """
+
+    def __init__(self, name: str, nbytes: int, format: str, shape: Tuple[int, ...], dtype: Optional[str] = None):
+        self.name = name
+        self.nbytes = nbytes
+        self.format = format
+        self.shape = shape
+        self.dtype = dtype
+
+    def __repr__(self) -> str:
+        return f"SharedBuffer(name={self.name!r}, nbytes={self.nbytes}, shape={self.shape})"
+
+    def view(self) -> Any:
+        """
+        View of the shared buffer, without copying.
+
+        Returns
+        -------
+        numpy.ndarray or memoryview
+            NumPy array if the buffer originates from a NumPy array, else a memoryview.
+
+        """
+        buf = _attach(self.name).buf[:self.nbytes]
+        if self.dtype is not None and np is not None:
+            return np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=buf)
+
+        try:
+            return buf.cast(self.format, self.shape)
+        except (TypeError, ValueError):
+            # formats memoryview cannot cast to, e.g. non-native byte order, are viewed as bytes
+            return buf
+
+
+class SharedArguments:
+    """
+    Place large arguments supporting the buffer protocol (e.g. NumPy arrays, bytes) in shared memory.
+
+    Each distinct object is copied to shared memory once, no matter how many tasks it is passed to. Worker processes
+    receive views of the shared memory, without copies. The segments are released when the batch ends, see `close()`.
+
+    Parameters
+    ----------
+    threshold : int, optional
+        Minimum size (bytes) of arguments placed in shared memory, smaller arguments are pickled as usual.
+
+    Notes
+    -----
+    NumPy arrays are received as NumPy arrays, other buffers as memoryview objects. Views are writable, and changes
+    made by one task are visible to other tasks sharing the argument. Buffers that are not C-contiguous are pickled as
+    usual.
+
+    """
+
+    def __init__(self, threshold: int = SHARED_MEMORY_THRESHOLD):
+        self.threshold = threshold
+        self._segments: List[SharedMemory] = list()
+        self._shared: Dict[int, Tuple[Any, SharedBuffer]] = dict()
+
+    def __enter__(self) -> "SharedArguments":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def share(self, value: Any) -> Any:
+        """
+        Place value in shared memory if it is a large buffer.
+
+        Parameters
+        ----------
+        value : object
+            Argument
+
+        Returns
+        -------
+        object
+            Reference to the shared buffer, or the value itself if not shared
+
+        """
+        if isinstance(value, (str, SharedBuffer)):
+            return value
+
+        key = id(value)
+        if key in self._shared:
+            return self._shared[key][1]
+
+        try:
+            m = memoryview(value)
+        except TypeError:
+            return value
+
+        if m.nbytes < self.threshold or not m.c_contiguous:
+            return value
+
+        shm = SharedMemory(create=True, size=m.nbytes)
+        shm.buf[:m.nbytes] = m.cast("B")
+        self._segments.append(shm)
+
+        dtype = value.dtype.str if np is not None and isinstance(value, np.ndarray) else None
+        ref = SharedBuffer(shm.name, m.nbytes, m.format, m.shape, dtype=dtype)
+        m.release()
+
+        # hold on to the value so its id is not reused by another object during the batch
+        self._shared[key] = (value, ref)
+        logger.debug(f"Placed argument of {ref.nbytes} bytes in shared memory '{shm.name}'.")
+        return ref
+
+    def transform(self, args: List[Any], kwargs: Dict[str, Any]) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Replace large buffer arguments by references to shared memory.
+
+        Parameters
+        ----------
+        args : list
+            Function positional arguments
+        kwargs : dict
+            Function keyword arguments
+
+        Returns
+        -------
+        tuple
+            Positional and keyword arguments
+
+        """
+        return [self.share(a) for a in args], {k: self.share(v) for k, v in kwargs.items()}
+
+    def close(self) -> None:
+        """Release the shared memory segments."""
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+
+        if self._segments:
+            logger.debug(f"Released {len(self._segments)} shared memory segments.")
+
+        self._segments = list()
+        self._shared = dict()
+
+
+def resolve(args: List[Any], kwargs: Dict[str, Any]) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Replace references to shared memory by views of the shared buffers, in the worker process.
+
+    Parameters
+    ----------
+    args : list
+        Function positional arguments
+    kwargs : dict
+        Function keyword arguments
+
+    Returns
+    -------
+    tuple
+        Positional and keyword arguments
+
+    """
+    args = [a.view() if isinstance(a, SharedBuffer) else a for a in args]
+    kwargs = {k: v.view() if isinstance(v, SharedBuffer) else v for k, v in kwargs.items()}
+    return args, kwargs
+
+
+def _scratch_directory() -> str:
+    """Directory for files holding results, in memory (tmpfs) if available."""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+
+    return tempfile.gettempdir()
+
+
+class OutOfBandResult:
+    """
+    Result pickled with protocol 5, with its large buffers stored out-of-band in memory-mapped files.
+
+    Parameters
+    ----------
+    data : bytes
+        Pickled result, without the out-of-band buffers
+    files : list
+        Files holding the out-of-band buffers, in order
+
+    """
+
+    def __init__(self, data: bytes, files: List[str]):
+        self.data = data
+        self.files = files
+
+    def __repr__(self) -> str:
+        return f"OutOfBandResult(nbytes={len(self.data)}, files={len(self.files)})"
+
+
+def dump_result(value: Any, threshold: int = SHARED_MEMORY_THRESHOLD) -> OutOfBandResult:
+    """
+    Pickle result in the worker process, writing large buffers (e.g. NumPy arrays) to memory-mapped files.
+
+    Parameters
+    ----------
+    value : object
+        Function result
+    threshold : int, optional
+        Minimum size (bytes) of buffers stored out-of-band, smaller buffers are pickled as usual.
+
+    Returns
+    -------
+    OutOfBandResult
+        Result to be returned to the parent process and loaded with `load_result()`.
+
+    """
+    files: List[str] = list()
+    directory = _scratch_directory()
+
+    def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+        try:
+            raw = buffer.raw()
+        except BufferError:
+            return True     # not contiguous, pickled in-band
+
+        if raw.nbytes < max(threshold, 1):
+            return True
+
+        fd, filename = tempfile.mkstemp(prefix="dtm_", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+
+        files.append(filename)
+        return False
+
+    try:
+        data = pickle.dumps(value, protocol=5, buffer_callback=buffer_callback)
+    except BaseException:
+        for filename in files:
+            os.unlink(filename)
+        raise
+
+    return OutOfBandResult(data, files)
+
+
+def load_result(result: OutOfBandResult) -> Any:
+    """
+    Load result in the parent process, mapping the out-of-band buffers without copying them.
+
+    Parameters
+    ----------
+    result : OutOfBandResult
+        Result returned by `dump_result()`
+
+    Returns
+    -------
+    object
+        Function result. Large buffers are backed by private (copy-on-write) memory maps of the files, which are
+        removed right away and freed when the result is no longer referenced.
+
+    """
+    buffers = list()
+    try:
+        for filename in result.files:
+            with open(filename, "rb") as f:
+                buffers.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+    finally:
+        for filename in result.files:
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+
+    return pickle.loads(result.data, buffers=buffers)
@@ -0,0 +1,172 @@
+"""
+Module with utilities for tracking completion and progress of asynchronous tasks
+"""
+import multiprocessing as mp
+import threading
+import time
+from collections import deque
+from functools import partial
+from typing import Optional, Callable, Any, Deque, Iterator, Tuple
+
+# grab logger from multiprocessing package
+logger = mp.get_logger()
+
+
+def log_progress(pending: int, total: int) -> None:
+    """
+    Default progress hook, logs the number of pending tasks.
+
+    Parameters
+    ----------
+    pending : int
+        Number of tasks not yet completed
+    total : int
+        Total number of tasks
+
+    """
+    logger.debug(f"Number of tasks pending: {pending}")
+
+
+class CompletionTracker:
+    """
+    Track completion of asynchronous tasks without busy-waiting.
+
+    Tasks signal completion through callbacks (see `multiprocessing.pool.Pool.apply_async`) which notify a condition
+    variable. The waiting thread sleeps until a task completes or the progress interval passes.
+
+    Parameters
+    ----------
+    progress : callable, optional
+        Progress hook called as `progress(pending, total)` every `interval` seconds while waiting. Default is to log
+        the number of pending tasks, see `log_progress()`.
+    interval : float, optional
+        Number of seconds between progress reports.
+    total : int, optional
+        Total number of tasks, if tasks are registered as they are dispatched. Default is the number of tasks
+        registered.
+
+    """
+
+    def __init__(self, progress: Optional[Callable[[int, int], None]] = None, interval: float = 15.,
+                 total: Optional[int] = None):
+        self.progress = progress if progress is not None else log_progress
+        self.interval = interval
+        self.total = 0
+        self.expected = total
+        self.completed = 0
+        self._pending = 0
+        self._completed: Deque[Tuple[int, bool, Any]] = deque()
+        self._condition = threading.Condition()
+        self._deadline = time.monotonic() + interval
+        self._stopped = False
+
+    @property
+    def pending(self) -> int:
+        """Number of registered tasks not yet completed."""
+        with self._condition:
+            return self._pending
+
+    def register(self, index: Optional[int] = None,
+                 size: int = 1) -> Tuple[Callable[[Any], None], Callable[[BaseException], None]]:
+        """
+        Register a task.
+
+        Parameters
+        ----------
+        index : int, optional
+            Task identifier. Outcomes of tasks registered with an index are queued for `as_completed()`.
+        size : int, optional
+            Number of tasks the registered task counts as in progress reports, e.g. the size of a chunk of tasks.
+
+        Returns
+        -------
+        tuple
+            Callbacks to be invoked when the task completes and fails respectively, use as `callback` and
+            `error_callback`.
+
+        """
+        with self._condition:
+            self.total += size
+            self._pending += 1
+
+        return partial(self._done, index, size, False), partial(self._done, index, size, True)
+
+    def stop(self) -> None:
+        """Stop waiting, e.g. when the batch is cancelled. `outcomes()` returns without waiting for pending tasks."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def wake(self, index: int) -> None:
+        """
+        Queue an outcome for `as_completed()` that does not belong to a registered task, waking up the waiting thread,
+        e.g. to dispatch more tasks. The tracker does not wait for wake-ups.
+
+        Parameters
+        ----------
+        index : int
+            Identifier yielded with the result None
+
+        """
+        with self._condition:
+            self._completed.append((index, False, None))
+            self._condition.notify_all()
+
+    def _done(self, index: Optional[int], size: int, failed: bool, result: Any) -> None:
+        with self._condition:
+            self._pending -= 1
+            self.completed += size
+            if index is not None:
+                self._completed.append((index, failed, result))
+            self._condition.notify_all()
+
+    def _wait_for(self, predicate: Callable[[], bool]) -> None:
+        # must be called with the condition lock held
+        while not predicate():
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0.:
+                total = max(self.total, self.expected) if self.expected is not None else self.total
+                self.progress(total - self.completed, total)
+                self._deadline = time.monotonic() + self.interval
+            else:
+                self._condition.wait(timeout=remaining)
+
+    def wait(self) -> None:
+        """Block until all registered tasks are completed, reporting progress at regular intervals."""
+        with self._condition:
+            self._wait_for(lambda: self._pending == 0)
+
+    def outcomes(self) -> Iterator[Tuple[int, bool, Any]]:
+        """
+        Yield task outcomes in order of completion.
+
+        Yields
+        ------
+        tuple
+            Task index, whether the task failed and the result, or the exception raised by the task if failed.
+
+        """
+        while True:
+            with self._condition:
+                self._wait_for(lambda: len(self._completed) > 0 or self._pending == 0 or self._stopped)
+                if self._stopped or not self._completed:
+                    return
+                outcome = self._completed.popleft()
+
+            yield outcome
+
+    def as_completed(self) -> Iterator[Tuple[int, Any]]:
+        """
+        Yield task outcomes in order of completion.
+
+        Yields
+        ------
+        tuple
+            Task index and result. Exceptions raised by the task are re-raised.
+
+        """
+        for index, failed, result in self.outcomes():
+            if failed:
+                raise result
+
+            yield index, result
@@ -34,6 +34,19 @@ def subproc_command():
         return subprocess_command(*args, **kwargs)
     return _method
 
+
+@pytest.fixture(scope='module')
+def alive():
+    def _method(pid: int) -> bool:
+        """Check if process is alive and not a zombie."""
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except OSError:
+            return False
+    return _method
+
+
 @pytest.fixture(scope='function')
 def ok_response() -> ResponseDict:
     return ResponseDict(returncode=0, ppid=123, pid=1, path="dummy/ok_path", output=None, status="completed", msg="example response")
@@ -0,0 +1,101 @@
+import os
+import time
+from platform import system
+
+import pytest
+
+import dtm.affinity
+from dtm.affinity import CoreAffinity, affinity_supported, pinned
+from dtm.main import Executor, subprocess_commands
+
+pytestmark = pytest.mark.skipif(not affinity_supported(), reason="CPU affinity is not supported on this platform")
+
+AFFINITY = 'python -c "import os; print(sorted(os.sched_getaffinity(0)))"'
+
+
+@pytest.fixture
+def dual_socket(monkeypatch):
+    # two sockets of four cores each
+    monkeypatch.setattr(dtm.affinity, "package", lambda cpu: cpu // 4)
+    return CoreAffinity(cores=range(8))
+
+
+def test_allocate(dual_socket):
+    a = dual_socket.allocate(dict(cores=2))
+    assert a == [0, 1]
+
+    # best fit, the socket with the fewest free cores fitting the task
+    assert dual_socket.allocate(dict(cores=2)) == [2, 3]
+    assert dual_socket.allocate(dict(cores=3)) == [4, 5, 6]
+    assert dual_socket.allocate() == [7]
+    assert dual_socket.allocate() is None
+    assert dual_socket.free == 0
+
+    dual_socket.release(a)
+    dual_socket.release(None)
+    assert dual_socket.free == 2
+    assert dual_socket.allocate(dict(cores=4)) is None
+
+
+def test_allocate_across_sockets(dual_socket):
+    dual_socket.allocate(dict(cores=3))
+    dual_socket.allocate(dict(cores=2))
+
+    # no socket has 3 free cores, the task spans both
+    assert sorted(dual_socket.allocate(dict(cores=3))) == [3, 6, 7]
+
+
+def test_size():
+    affinity = CoreAffinity(cores=[0, 1], threads=2)
+    assert affinity.size() == 2
+    assert affinity.size(dict(cores=0, memory=0)) == 2
+    assert affinity.size(dict(cores=1)) == 1
+    assert affinity.size(dict(cores=16)) == 2
+
+
+def test_pinned():
+    before = os.sched_getaffinity(0)
+    core = min(before)
+    with pinned([core]):
+        assert os.sched_getaffinity(0) == {core}
+    assert os.sched_getaffinity(0) == before
+
+    with pinned(None):
+        assert os.sched_getaffinity(0) == before
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_pinned_commands(tmpdir, mode):
+    core = min(os.sched_getaffinity(0))
+    affinity = CoreAffinity(cores=[core])
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    commands = [AFFINITY + '; python -c "import time; time.sleep(0.5)"']
+
+    t0 = time.monotonic()
+    responses = subprocess_commands(commands, paths, nprocesses=2, shell=True, pipe=True, mode=mode,
+                                    affinity=affinity)
+
+    # the tasks take turns on the single core
+    assert time.monotonic() - t0 >= 1.
+    for r in responses:
+        assert r.get("status") == "completed"
+        assert r.get("output").strip() == f"[{core}]"
+    assert affinity.free == 1
+
+
+@pytest.mark.skipif(system() != "Linux", reason="inspects /proc")
+def test_closed_early_stops_pinned_tasks(tmpdir, alive):
+    affinity = CoreAffinity(cores=sorted(os.sched_getaffinity(0))[:2])
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    commands = ["true", "sleep 30 & echo $! > pid.txt; wait"]
+
+    with Executor(nprocesses=2) as executor:
+        responses = executor.iter_commands(commands, paths, shell=True, pipe=True, affinity=affinity)
+        assert next(responses)[0] == 0
+        while not os.path.exists(os.path.join(paths[1], "pid.txt")):
+            time.sleep(0.05)
+        responses.close()
+
+        # the cores are free once the task pinned to them was stopped
+        assert affinity.free == len(affinity.cores)
+        assert not alive(int(open(os.path.join(paths[1], "pid.txt")).read()))
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from platform import system
+
+import pytest
+
+from dtm import aio
+from dtm.aio import run_command, run_commands
+
+
+def test_run_command():
+    r = asyncio.run(run_command("python --version", pipe=True))
+    assert r.get("returncode") == 0
+    assert r.get("status") == "completed"
+    assert "Python" in r.get("output")
+
+
+def test_run_command_error(tmpdir):
+    r = asyncio.run(run_command("non_existing_program_dtm", path=str(tmpdir), pipe=True))
+    assert r.get("status") == "error"
+    assert r.get("msg") == 'Command "non_existing_program_dtm" could not be found.'
+
+    r = asyncio.run(run_command("python -c exit(2)", path=str(tmpdir), pipe=True))
+    assert r.get("status") == "error"
+    assert r.get("returncode") == 2
+
+
+def test_run_command_timeout(tmpdir):
+    tmpdir.join("sleep.py").write("import time\ntime.sleep(10)\n")
+    t0 = time.monotonic()
+    r = asyncio.run(run_command("python sleep.py", path=str(tmpdir), pipe=True, timeout=1))
+    assert time.monotonic() - t0 < 5.
+    assert r.get("status") == "timeout"
+    assert r.get("msg").endswith("timed out after 1 seconds.")
+
+
+@pytest.mark.skipif(system() == "Windows", reason="process groups are POSIX only")
+def test_timeout_waits_off_event_loop(monkeypatch):
+    # the processes of a timed out group are looked up in a worker thread, not in the event loop
+    threads = set()
+    scan = aio.group_alive
+
+    def group_alive(pgid):
+        threads.add(threading.current_thread())
+        return scan(pgid)
+
+    monkeypatch.setattr(aio, "group_alive", group_alive)
+    r = asyncio.run(run_command("sleep 10", pipe=True, timeout=1))
+
+    assert r.get("status") == "timeout"
+    assert threads and threading.main_thread() not in threads
+
+
+def test_illegal_command_type():
+    with pytest.raises(TypeError):
+        asyncio.run(run_command(1))
+
+
+def test_run_commands(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+
+    async def main():
+        # the event loop keeps serving other coroutines while the commands run
+        ticks = list()
+
+        async def ticker():
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.1)
+
+        responses, _ = await asyncio.gather(
+            run_commands(['python -c "import time; time.sleep(0.5)"'], paths, nprocesses=2, shell=True, pipe=True),
+            ticker())
+        return responses, ticks
+
+    responses, ticks = asyncio.run(main())
+    assert [r.get("path") for r in responses] == paths
+    assert all(r.get("status") == "completed" for r in responses)
+    assert len(ticks) == 3
@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from dtm.cache import CommandCache
+from dtm.main import subprocess_commands
+
+
+@pytest.fixture
+def cases(tmpdir):
+    """Work directories with an input file, and a command writing an output file from it."""
+    script = tmpdir.join("solve.py")
+    script.write("import os\n"
+                 "open('result.out', 'w').write(open('model.inp').read().upper() + os.environ.get('LEVEL', ''))\n")
+    paths = list()
+    for i in range(3):
+        p = tmpdir.mkdir(f"case_{i}")
+        p.join("model.inp").write(f"model {i}")
+        paths.append(str(p))
+
+    return f"python {script}", paths
+
+
+def test_key_depends_on_inputs_and_env(tmpdir, cases):
+    command, paths = cases
+    cache = CommandCache(str(tmpdir.join("cache")), inputs=["*.inp"], env_keys=["LEVEL"])
+    key = cache.key(command, paths[0])
+    assert cache.key(command, paths[0]) == key
+    assert cache.key(command, paths[0], env=dict(LEVEL="2")) != key
+    assert cache.key("other", paths[0]) != key
+    assert cache.key(command, paths[1]) != key
+
+    open(os.path.join(paths[0], "notes.txt"), "w").write("not an input")
+    assert cache.key(command, paths[0]) == key
+
+    open(os.path.join(paths[0], "model.inp"), "a").write(" changed")
+    assert cache.key(command, paths[0]) != key
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_cache_hits_restore_outputs(tmpdir, cases, mode):
+    command, paths = cases
+    cache = CommandCache(str(tmpdir.join("cache")), inputs=["*.inp"], outputs=["*.out"])
+    first = subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, cache=cache)
+    assert [r.get("status") for r in first] == 3 * ["completed"]
+    assert not any(r.get("cached") for r in first)
+    assert len(cache) == 3
+
+    for p in paths:
+        os.remove(os.path.join(p, "result.out"))
+
+    open(os.path.join(paths[1], "model.inp"), "w").write("model changed")
+    second = subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, cache=cache)
+    assert [bool(r.get("cached")) for r in second] == [True, False, True]
+    assert [r.get("path") for r in second] == paths
+    assert [open(os.path.join(p, "result.out")).read() for p in paths] == ["MODEL 0", "MODEL CHANGED", "MODEL 2"]
+    assert len(cache) == 4
+
+
+def test_failed_commands_not_cached(tmpdir, cases):
+    _, paths = cases
+    cache = CommandCache(str(tmpdir.join("cache")), inputs=["*.inp"])
+    r = subprocess_commands(["python -c exit(3)"], paths, nprocesses=2, pipe=True, cache=cache)
+    assert all(_.get("status") == "error" for _ in r)
+    assert len(cache) == 0
+
+
+def test_no_inputs_not_cached(tmpdir):
+    # without input files, the keys of different cases would be the same
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    cache = CommandCache(str(tmpdir.join("cache")), inputs=["*.inp"], outputs=["*.out"])
+    command = "python -c open('result.out','w').write(__import__('os').path.basename(__import__('os').getcwd()))"
+    assert cache.key(command, paths[0]) is None
+
+    first = subprocess_commands([command], paths[:1], pipe=True, cache=cache)
+    second = subprocess_commands([command], paths[1:], pipe=True, cache=cache)
+
+    assert first[0].get("status") == second[0].get("status") == "completed"
+    assert not second[0].get("cached")
+    assert len(cache) == 0
+    assert open(os.path.join(paths[1], "result.out")).read() == "case_1"
+
+
+def test_lru_eviction(tmpdir, cases):
+    command, paths = cases
+    directory = str(tmpdir.join("cache"))
+    cache = CommandCache(directory, inputs=["*.inp"], outputs=["*.out"])
+    subprocess_commands([command], paths[:2], nprocesses=1, pipe=True, cache=cache)
+    assert len(cache) == 2
+
+    # use the first entry, then add a third entry with room for only two entries
+    cache.max_size = cache.size + 64     # entries differ slightly in size, e.g. by the runtime recorded
+    subprocess_commands([command], [paths[0], paths[2]], nprocesses=1, pipe=True, cache=cache)
+    assert len(cache) == 2
+    assert cache.get(cache.key(command, paths[1]), paths[1]) is None
+    assert cache.get(cache.key(command, paths[0]), paths[0]) is not None
+
+    # entries are found by a new cache on the same directory
+    assert len(CommandCache(directory, inputs=["*.inp"])) == 2
+
+
+def record_call(x, marker):
+    with open(marker, "a") as f:
+        f.write(f"{x}\n")
+    return x * x
+
+
+def test_function_cache_serves_hits_in_parent(tmpdir):
+    from dtm.cache import FunctionCache
+    from dtm.main import multiprocess_functions
+
+    marker = str(tmpdir.join("calls.txt"))
+    cache = FunctionCache(str(tmpdir.join("memo")))
+    r = multiprocess_functions(3 * [record_call], args=[[1, marker], [2, marker], [3, marker]], nprocesses=2,
+                               cache=cache)
+    assert r == [1, 4, 9]
+    assert len(cache) == 3
+
+    # a new session with the same cache directory only calls the new argument set
+    cache = FunctionCache(str(tmpdir.join("memo")))
+    r = multiprocess_functions(3 * [record_call], args=[[3, marker], [4, marker], [1, marker]], nprocesses=2,
+                               cache=cache)
+    assert r == [9, 16, 1]
+    assert sorted(open(marker).read().split()) == ["1", "2", "3", "4"]
+
+
+def test_function_cache_key_and_eviction(tmpdir):
+    from dtm.cache import FunctionCache
+
+    cache = FunctionCache(str(tmpdir.join("memo")), max_entries=2)
+    key = cache.key(record_call, [1, "m"])
+    assert cache.key(record_call, [1, "m"]) == key
+    assert cache.key(record_call, [2, "m"]) != key
+    assert cache.key(record_call, [1], dict(marker="m")) != key
+    assert cache.key(test_function_cache_key_and_eviction) != key
+
+    assert cache.get(key) == (False, None)
+    cache.put(key, None)
+    assert cache.get(key) == (True, None)
+
+    for i in range(2, 4):
+        cache.put(cache.key(record_call, [i, "m"]), i)
+    assert len(cache) == 2
+    assert cache.get(key) == (False, None)
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from platform import system
+
+import pytest
+
+from dtm.cancel import CANCELLED, CancelToken, FailFast
+from dtm.main import Executor, subprocess_commands, iter_subprocess_commands, multiprocess_functions
+from dtm.resources import Capacity, Requirement
+
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_fail_fast_policy():
+    with pytest.raises(ValueError):
+        FailFast()
+
+    policy = FailFast(failures=3)
+    assert policy.exceeded(2, 100) is None
+    assert policy.exceeded(3, 3) == "3 tasks failed."
+
+    policy = FailFast(ratio=0.5, min_tasks=4)
+    assert policy.exceeded(3, 3) is None
+    assert policy.exceeded(2, 4) is None
+    assert policy.exceeded(3, 4) == "3 of 4 tasks failed."
+
+
+def test_cancel_token():
+    token = CancelToken()
+    calls = list()
+    token.subscribe(lambda: calls.append(1))
+    assert not token.cancelled
+
+    token.cancel("Stop.")
+    token.cancel("Again.")
+    assert token.cancelled
+    assert token.reason == "Stop."
+    assert calls == [1]
+
+    # callbacks subscribing after cancellation are called right away
+    token.subscribe(lambda: calls.append(2))
+    assert calls == [1, 2]
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_fail_fast(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(12)]
+    responses = subprocess_commands(["python -c exit(1)"], paths, nprocesses=1, pipe=True, mode=mode, fail_fast=2)
+
+    assert [r.get("path") for r in responses] == paths
+    statuses = [r.get("status") for r in responses]
+    assert statuses[:2] == ["error", "error"]
+    assert statuses.count("cancelled") >= 8
+    assert set(statuses) == {"error", "cancelled"}
+    assert "Fail fast, 2 tasks failed." in responses[-1].get("msg")
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_fail_fast_spawn_error(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(8)]
+    responses = subprocess_commands(["no-such-binary"], paths, nprocesses=1, mode=mode, fail_fast=2)
+
+    assert [r.get("status") for r in responses] == 2 * ["error"] + 6 * ["cancelled"]
+
+
+@pytest.mark.skipif(system() != "Linux", reason="inspects /proc")
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_cancel_running(tmpdir, mode, alive):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+    command = 'python -c "import time; time.sleep(30)" & echo $! > pid.txt; wait'
+    token = CancelToken()
+    threading.Timer(1., token.cancel).start()
+
+    t0 = time.monotonic()
+    responses = subprocess_commands([command], paths, nprocesses=2, shell=True, pipe=True, mode=mode, cancel=token,
+                                    grace=1.)
+
+    assert time.monotonic() - t0 < 10.
+    assert [r.get("status") for r in responses] == 4 * ["cancelled"]
+    pids = [int(open(os.path.join(p, "pid.txt")).read()) for p in paths if os.path.exists(os.path.join(p, "pid.txt"))]
+    assert len(pids) == 2
+    assert not any(alive(pid) for pid in pids)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_cancel_releases_resources(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+    capacity = Capacity(cores=2)
+    token = CancelToken()
+    threading.Timer(0.5, token.cancel).start()
+
+    responses = subprocess_commands(["sleep 30"], paths, nprocesses=2, mode=mode, resources=Requirement(cores=1),
+                                    capacity=capacity, cancel=token, grace=1.)
+
+    assert [r.get("status") for r in responses] == 4 * ["cancelled"]
+    assert capacity.free_cores == 2
+
+
+def test_cancel_iterator(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(6)]
+    token = CancelToken()
+    results = list()
+    for i, r in iter_subprocess_commands(["python --version"], paths, nprocesses=1, pipe=True, mode="launcher",
+                                         cancel=token):
+        results.append(r.get("status"))
+        if len(results) == 2:
+            token.cancel()
+
+    assert results[:2] == ["completed", "completed"]
+    assert results[2:] == 4 * ["cancelled"]
+
+
+def test_cancel_functions():
+    token = CancelToken()
+    threading.Timer(1., token.cancel).start()
+
+    t0 = time.monotonic()
+    results = multiprocess_functions(20 * [nap], args=20 * [[0.25]], nprocesses=2, cancel=token)
+
+    assert time.monotonic() - t0 < 5.
+    assert len(results) == 20
+    assert 0.25 in results
+    assert CANCELLED in results
+
+
+def test_cancel_thread_backend_spares_other_executors(tmpdir):
+    # executors with the thread backend run their commands in the same process
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    token = CancelToken()
+    threading.Timer(1., token.cancel).start()
+
+    with Executor(nprocesses=1, backend="thread") as other, Executor(nprocesses=1, backend="thread") as executor:
+        independent = other.submit_command("sleep 2", path=paths[0], pipe=True)
+        responses = executor.map_commands(["sleep 30"], paths[1:], pipe=True, cancel=token, grace=1.)
+
+        assert [r.get("status") for r in responses] == ["cancelled"]
+        assert independent.get(timeout=10).get("returncode") == 0
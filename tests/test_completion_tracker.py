@@ -0,0 +1,35 @@
+import threading
+import time
+
+from dtm.main import CompletionTracker, multiprocess_functions
+
+
+def slow_func(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_wait_returns_when_tasks_complete():
+    tracker = CompletionTracker(interval=10.)
+    callbacks = [tracker.register()[0] for _ in range(3)]
+    assert tracker.pending == 3
+
+    timers = [threading.Timer(0.05 * (i + 1), cb, args=(None,)) for i, cb in enumerate(callbacks)]
+    for t in timers:
+        t.start()
+
+    t0 = time.monotonic()
+    tracker.wait()
+    assert tracker.pending == 0
+    assert tracker.total == 3
+    assert time.monotonic() - t0 < 5.
+
+
+def test_progress_hook_is_called():
+    reports = list()
+    r = multiprocess_functions(2 * [slow_func], args=[[0.5], [0.5]], nprocesses=2,
+                               progress=lambda pending, total: reports.append((pending, total)),
+                               progress_interval=0.1)
+    assert r == [0.5, 0.5]
+    assert len(reports) > 0
+    assert all(total == 2 for _, total in reports)
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from dtm.concurrency import AdaptiveConcurrency, memory_available, pressure
+from dtm.main import subprocess_commands
+
+IDLE = dict(load=0.1, memory=0.8, cpu_pressure=0., memory_pressure=0., io_pressure=0.)
+
+
+def test_memory_available(tmpdir):
+    meminfo = tmpdir.join("meminfo")
+    meminfo.write("MemTotal:       16000000 kB\nMemFree:         1000000 kB\nMemAvailable:    4000000 kB\n")
+    assert memory_available(str(meminfo)) == 0.25
+    assert memory_available(str(tmpdir.join("missing"))) is None
+
+
+def test_pressure(tmpdir):
+    tmpdir.join("memory").write("some avg10=12.50 avg60=3.00 avg300=1.00 total=1234\n"
+                                "full avg10=2.00 avg60=1.00 avg300=0.50 total=123\n")
+    assert pressure("memory", directory=str(tmpdir)) == 12.5
+    assert pressure("cpu", directory=str(tmpdir)) is None
+
+
+def test_adjust():
+    c = AdaptiveConcurrency(minimum=2, maximum=20)
+    assert c.limit == 2
+
+    # slow start while the limit is reached and the host has headroom
+    assert c.adjust(IDLE, running=2) == 4
+    assert c.adjust(IDLE, running=1) == 4
+    assert c.adjust(IDLE, running=4) == 8
+
+    # saturated CPUs lower the limit by one, which ends the slow start
+    assert c.adjust(dict(IDLE, cpu_pressure=50.), running=8) == 7
+    assert c.adjust(IDLE, running=7) == 8
+
+    # memory pressure halves the limit, down to the minimum
+    assert c.adjust(dict(IDLE, memory_pressure=30.), running=8) == 4
+    assert c.adjust(dict(IDLE, memory=0.05), running=4) == 2
+    assert c.adjust(dict(IDLE, memory=0.05), running=2) == 2
+
+    # load average is used without pressure information
+    assert c.adjust(dict(IDLE, cpu_pressure=None, load=2.), running=2) == 2
+    assert c.adjust(dict(IDLE, cpu_pressure=None), running=2) == 3
+
+
+def test_maximum():
+    c = AdaptiveConcurrency(minimum=1, maximum=3)
+    for _ in range(5):
+        c.adjust(IDLE, running=c.limit)
+    assert c.limit == 3
+
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(minimum=4, maximum=3)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_adaptive_commands(tmpdir, mode, monkeypatch):
+    monkeypatch.setattr(AdaptiveConcurrency, "sample", staticmethod(lambda: IDLE))
+    concurrency = AdaptiveConcurrency(minimum=1, maximum=4, interval=0.)
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(8)]
+
+    responses = subprocess_commands(["python --version"], paths, pipe=True, mode=mode, concurrency=concurrency)
+
+    assert all(r.get("status") == "completed" for r in responses)
+    assert concurrency.limit == 4
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_ramp_up(tmpdir, mode, monkeypatch):
+    # the limit is raised while tasks are running, not only as they complete
+    monkeypatch.setattr(AdaptiveConcurrency, "sample", staticmethod(lambda: IDLE))
+    concurrency = AdaptiveConcurrency(minimum=1, maximum=4, interval=0.1)
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+
+    t0 = time.monotonic()
+    responses = subprocess_commands(["sleep 1"], paths, pipe=True, mode=mode, concurrency=concurrency)
+
+    assert all(r.get("status") == "completed" for r in responses)
+    assert concurrency.limit == 4
+    assert time.monotonic() - t0 < 3.
@@ -0,0 +1,49 @@
+import os
+
+from dtm.context import worker_context
+from dtm.main import Executor, multiprocess_functions
+
+
+def setup(value):
+    worker_context()["value"] = value
+    worker_context()["loads"] = worker_context().get("loads", 0) + 1
+
+
+def read_value(key):
+    return worker_context()[key], worker_context()["loads"], os.getpid()
+
+
+def load_table():
+    worker_context()["n"] = worker_context().get("n", 0) + 1
+    return "table"
+
+
+def count_creations():
+    worker_context().cached("table", load_table)
+    return worker_context()["n"], os.getpid()
+
+
+def test_initializer_runs_once_per_worker():
+    r = multiprocess_functions(10 * [read_value], args=10 * [["value"]], nprocesses=2, initializer=setup,
+                               initargs=(42,))
+    assert {v for v, _, _ in r} == {42}
+    assert {n for _, n, _ in r} == {1}
+    assert len({pid for _, _, pid in r}) <= 2
+
+
+def test_cached_resource_created_once_per_worker():
+    with Executor(nprocesses=2) as executor:
+        r1 = executor.map(8 * [count_creations])
+        r2 = executor.map(8 * [count_creations])
+
+    assert {n for n, _ in r1 + r2} == {1}
+
+
+def test_context_is_per_process():
+    context = worker_context()
+    context["local"] = 1
+    assert worker_context() is context
+    assert "local" in context
+    assert context.cached("local", lambda: 2) == 1
+    del context["local"]
+    assert len(context) == 0
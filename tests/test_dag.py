@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+from dtm.dag import TaskGraph
+from dtm.main import Executor
+
+
+def read_file(filename):
+    with open(filename) as f:
+        return f.read().strip()
+
+
+def concatenate(*parts):
+    return "".join(parts)
+
+
+def nap(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def fail():
+    raise RuntimeError("Broken input.")
+
+
+def test_dependencies(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    graph = TaskGraph()
+    for p in paths:
+        graph.add_command(f"write {p}", 'python -c "open(\'out.txt\', \'w\').write(\'x\')"', path=p, shell=True,
+                          pipe=True)
+        graph.add_function(f"read {p}", read_file, args=(os.path.join(p, "out.txt"),), depends=[f"write {p}"])
+    graph.add_function("aggregate", concatenate, args=("a", "b"), depends=[f"read {p}" for p in paths])
+
+    results = graph.run(nprocesses=2)
+
+    assert len(results) == len(graph) == 7
+    assert all(status == "completed" for status in graph.status.values())
+    assert results[f"write {paths[0]}"].get("status") == "completed"
+    assert results[f"read {paths[0]}"] == "x"
+    assert results["aggregate"] == "ab"
+
+
+def test_failure_skips_dependents(tmpdir):
+    graph = TaskGraph()
+    graph.add_command("broken", "python -c exit(1)", path=str(tmpdir), pipe=True)
+    graph.add_command("solve", "python --version", path=str(tmpdir), pipe=True, depends=["broken"])
+    graph.add_function("post", concatenate, args=("a",), depends=["solve"])
+    graph.add_function("raises", fail)
+    graph.add_function("after raises", concatenate, depends=["raises"])
+    graph.add_function("independent", concatenate, args=("b",))
+
+    with Executor(nprocesses=2) as executor:
+        results = graph.run(executor=executor)
+
+    assert graph.status == {"broken": "error", "solve": "skipped", "post": "skipped", "raises": "error",
+                            "after raises": "skipped", "independent": "completed"}
+    assert results["solve"].get("status") == "skipped"
+    assert results["post"] is None
+    assert isinstance(results["raises"], RuntimeError)
+    assert results["independent"] == "b"
+
+
+def test_progress_counts_skipped_tasks():
+    graph = TaskGraph()
+    graph.add_function("prepare", fail)
+    graph.add_function("solve", concatenate, depends=["prepare"])
+    graph.add_function("report", concatenate, depends=["solve"])
+    graph.add_function("other", nap, args=(1.,))
+
+    reports = list()
+    with Executor(nprocesses=2) as executor:
+        graph.run(executor=executor, progress=lambda pending, total: reports.append((pending, total)),
+                  progress_interval=0.1)
+
+    # the skipped tasks are done once "prepare" failed, only "other" is pending
+    assert reports[-1] == (1, 4)
+
+
+def test_invalid_graphs():
+    graph = TaskGraph()
+    graph.add_function("a", concatenate)
+    with pytest.raises(ValueError):
+        graph.add_function("a", concatenate)
+
+    graph.add_function("b", concatenate, depends=["unknown"])
+    with pytest.raises(ValueError, match="unknown task"):
+        graph.run(nprocesses=1)
+
+    graph = TaskGraph()
+    graph.add_function("a", concatenate, depends=["b"])
+    graph.add_function("b", concatenate, depends=["a"])
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run(nprocesses=1)
@@ -0,0 +1,85 @@
+import multiprocessing as mp
+import threading
+import time
+
+import pytest
+
+from dtm.distributed import Broker, TaskBoard, run_worker
+
+AUTHKEY = b"test"
+
+
+@pytest.fixture
+def workers():
+    processes = list()
+
+    def start(address, n=2, thread=False):
+        for _ in range(n):
+            kind = threading.Thread if thread else mp.Process
+            p = kind(target=run_worker, args=(address, AUTHKEY), kwargs=dict(nprocesses=1))
+            p.start()
+            processes.append(p)
+
+    yield start
+
+    for p in processes:
+        p.join(timeout=10)
+        assert not p.is_alive()
+
+
+def test_broker_requires_authkey():
+    with pytest.raises(ValueError):
+        Broker(address=("127.0.0.1", 0))
+
+
+def test_broker_with_local_workers(tmpdir, workers):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(6)]
+    with Broker(address=("127.0.0.1", 0), authkey=AUTHKEY) as broker:
+        workers(broker.address, n=2)
+        workers(broker.address, n=1, thread=True)
+        responses = broker.map_commands(["python --version"], paths, pipe=True)
+        again = dict(broker.iter_commands(["python -c exit(3)"], paths[:2], max_queued=1))
+
+    assert [r.get("path") for r in responses] == paths
+    assert all(r.get("status") == "completed" for r in responses)
+    assert all("host" in r for r in responses)
+    assert sorted(again) == [0, 1]
+    assert all(r.get("returncode") == 3 for r in again.values())
+
+
+def test_expired_lease_handed_to_other_worker():
+    board = TaskBoard(lease=0.1)
+    board.add([(0, "run", "a")], dict())
+    first = board.take("a", timeout=0.)
+    assert board.take("b", timeout=0.) is None
+
+    time.sleep(0.2)
+    second = board.take("b", timeout=0.)
+    assert second == first
+
+    # the first report wins, later reports of the same task are ignored
+    board.complete(second[0], dict(status="completed"))
+    board.complete(first[0], dict(status="error"))
+    assert board.collect(timeout=0.) == [(0, dict(status="completed"))]
+
+
+def test_heartbeat_renews_lease():
+    board = TaskBoard(lease=0.2)
+    board.add([(0, "run", "a")], dict())
+    board.take("a", timeout=0.)
+    for _ in range(3):
+        time.sleep(0.1)
+        assert board.heartbeat("a") == 0.2
+
+    assert board.take("b", timeout=0.) is None
+
+
+def test_failing_task_reported(tmpdir, workers):
+    # the log file cannot be created in a missing work directory, the worker reports the error and carries on
+    paths = [str(tmpdir.join("missing")), str(tmpdir.mkdir("case"))]
+    with Broker(address=("127.0.0.1", 0), authkey=AUTHKEY) as broker:
+        workers(broker.address, n=1, thread=True)
+        responses = broker.map_commands(["python --version"], paths)
+
+    assert [r.get("status") for r in responses] == ["error", "completed"]
+    assert "FileNotFoundError" in responses[0].get("msg")
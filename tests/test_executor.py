@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from dtm.main import Executor
+
+
+def square(x):
+    return x * x
+
+
+def worker_pid():
+    return os.getpid()
+
+
+def test_executor_reuses_workers():
+    with Executor(nprocesses=2) as executor:
+        pids = set(executor.map(4 * [worker_pid]))
+        pids |= set(executor.map(4 * [worker_pid]))
+
+    assert 1 <= len(pids) <= 2
+
+
+def test_executor_submit_and_map():
+    with Executor(nprocesses=2) as executor:
+        assert executor.submit(square, 3).get() == 9
+        assert executor.map(3 * [square], args=[[1], [2], [3]]) == [1, 4, 9]
+
+
+def test_executor_commands(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    with Executor(nprocesses=2) as executor:
+        r = executor.submit_command("python --version", path=paths[0], pipe=True).get()
+        assert r.get("status") == "completed"
+
+        responses = executor.map_commands(["python --version"], paths, pipe=True)
+        assert [r.get("path") for r in responses] == paths
+        assert all(r.get("status") == "completed" for r in responses)
+
+
+def test_executor_shutdown():
+    executor = Executor(nprocesses=1)
+    executor.shutdown()
+    with pytest.raises(ValueError):
+        executor.submit(square, 2)
+
+
+def worker_thread():
+    import threading
+    return os.getpid(), threading.get_ident()
+
+
+def test_executor_thread_backend(tmpdir):
+    with Executor(nprocesses=2, backend="thread") as executor:
+        assert executor.map(3 * [square], args=[[1], [2], [3]]) == [1, 4, 9]
+        assert {pid for pid, _ in executor.map(4 * [worker_thread])} == {os.getpid()}
+        responses = executor.map_commands(["python --version"], 2 * [str(tmpdir)], pipe=True)
+        assert all(r.get("status") == "completed" for r in responses)
+
+
+def test_executor_hybrid_backend():
+    with Executor(nprocesses=2, backend="hybrid", threads=3) as executor:
+        r = executor.map(12 * [worker_thread])
+
+    assert os.getpid() not in {pid for pid, _ in r}
+    assert len({pid for pid, _ in r}) <= 2
+    assert len(set(r)) <= 6
+
+
+def test_executor_unknown_backend():
+    with pytest.raises(ValueError):
+        Executor(backend="gpu")
+
+
+def parent_pid():
+    return os.getppid()
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn", "forkserver"])
+def test_executor_start_method(start_method):
+    with Executor(nprocesses=2, start_method=start_method, preload=["json"]) as executor:
+        assert executor.map(3 * [square], args=[[1], [2], [3]]) == [1, 4, 9]
+        ppids = set(executor.map(2 * [parent_pid]))
+
+    if start_method == "forkserver":
+        assert os.getpid() not in ppids
+    else:
+        assert ppids == {os.getpid()}
+
+
+def test_executor_unknown_start_method():
+    with pytest.raises(ValueError):
+        Executor(start_method="clone")
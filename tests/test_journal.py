@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from dtm.journal import Journal
+from dtm.main import subprocess_commands
+
+
+def test_journal_record_and_read(tmpdir):
+    filename = str(tmpdir.join("journal.jsonl"))
+    with Journal(filename) as journal:
+        journal.record("run", dict(path="a", status="error"))
+        journal.record("run", dict(path="a", status="completed"))
+        journal.record("run", dict(path="b", status="timeout"))
+
+    journal = Journal(filename)
+    assert len(journal) == 2
+    assert journal.succeeded("run", "a")
+    assert not journal.succeeded("run", "b")
+    assert not journal.succeeded("other", "a")
+
+
+def test_journal_ignores_incomplete_line(tmpdir):
+    filename = str(tmpdir.join("journal.jsonl"))
+    with open(filename, "w") as f:
+        f.write(json.dumps(dict(command="run", response=dict(path="a", status="completed"))) + "\n")
+        f.write('{"command": "run", "response": {"pa')      # crash while writing
+
+    with Journal(filename) as journal:
+        assert journal.succeeded("run", "a")
+        journal.record("run", dict(path="b", status="completed"))
+
+    journal = Journal(filename)
+    assert journal.succeeded("run", "a") and journal.succeeded("run", "b")
+
+
+def test_resume_requires_journal(tmpdir):
+    with pytest.raises(ValueError):
+        subprocess_commands(["python --version"], [str(tmpdir)], resume=True)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_resume_skips_succeeded_tasks(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    script = tmpdir.join("check.py")
+    script.write("import os, sys\nsys.exit(3 if os.path.exists('fail') else 0)\n")
+    command = f"python {script}"
+    filename = str(tmpdir.join("journal.jsonl"))
+
+    open(os.path.join(paths[1], "fail"), "w").close()
+    first = subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, journal=filename)
+    assert [r.get("status") for r in first] == ["completed", "error", "completed"]
+
+    os.remove(os.path.join(paths[1], "fail"))
+    second = subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, journal=filename,
+                                 resume=True)
+    assert [r.get("status") for r in second] == 3 * ["completed"]
+    assert second[0] == first[0] and second[2] == first[2]
+    assert second[1].get("pid") != first[1].get("pid")
+    assert len(open(filename).read().splitlines()) == 4
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_resume_progress_counts_skipped_tasks(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(6)]
+    script = tmpdir.join("check.py")
+    script.write("import os, sys, time\n"
+                 "if os.path.exists('slow'):\n"
+                 "    time.sleep(1)\n"
+                 "sys.exit(3 if os.path.exists('fail') else 0)\n")
+    command = f"python {script}"
+    filename = str(tmpdir.join("journal.jsonl"))
+
+    open(os.path.join(paths[0], "fail"), "w").close()
+    subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, journal=filename)
+
+    os.remove(os.path.join(paths[0], "fail"))
+    open(os.path.join(paths[0], "slow"), "w").close()
+    reports = list()
+    subprocess_commands([command], paths, nprocesses=2, pipe=True, mode=mode, journal=filename, resume=True,
+                        progress=lambda pending, total: reports.append((pending, total)), progress_interval=0.1)
+
+    assert reports
+    assert reports[-1] == (1, 6)
@@ -0,0 +1,106 @@
+import os
+import time
+
+import pytest
+
+from dtm.launcher import Launcher, pidfd_supported
+from dtm.main import subprocess_commands, iter_subprocess_commands
+from dtm.process import group_alive
+
+
+def test_launcher_commands(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(5)]
+    responses = subprocess_commands(["python --version"], paths, nprocesses=2, pipe=True, mode="launcher")
+
+    assert [r.get("path") for r in responses] == paths
+    for r in responses:
+        assert r.get("status") == "completed"
+        assert r.get("ppid") == os.getpid()
+        assert "Python" in r.get("output")
+
+
+def test_launcher_log_file(tmpdir):
+    path = str(tmpdir)
+    responses = subprocess_commands(["python --version"], [path], mode="launcher")
+
+    assert responses[0].get("status") == "completed"
+    assert responses[0].get("output") is None
+    assert "Python" in tmpdir.join("log.txt").read()
+
+
+def test_launcher_errors(tmpdir):
+    path = str(tmpdir)
+    commands = ["non_existing_program_dtm", "python -c exit(3)"]
+    responses = subprocess_commands(commands, [path, path], pipe=True, shell=False, mode="launcher")
+
+    assert responses[0].get("status") == "error"
+    assert responses[0].get("msg") == 'Command "non_existing_program_dtm" could not be found.'
+    assert responses[1].get("status") == "error"
+    assert responses[1].get("returncode") == 3
+
+
+def test_launcher_timeout(tmpdir):
+    t0 = time.monotonic()
+    responses = subprocess_commands(['python -c "import time; time.sleep(10)"'], [str(tmpdir)], pipe=True, shell=True,
+                                    timeout=1, mode="launcher")
+
+    assert time.monotonic() - t0 < 5.
+    assert responses[0].get("status") == "timeout"
+    assert responses[0].get("msg").endswith("timed out after 1 seconds.")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX only")
+def test_launcher_timeout_kills_descendants(tmpdir):
+    # the shell starts a grandchild, ignoring SIGTERM, that outlives the shell unless its process group is killed
+    command = 'python -c "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)" & wait'
+    t0 = time.monotonic()
+    responses = subprocess_commands([command], [str(tmpdir)], pipe=True, shell=True, timeout=1, grace=0.5,
+                                    mode="launcher")
+
+    assert time.monotonic() - t0 < 5.
+    assert responses[0].get("status") == "timeout"
+    # the process id of the command is the id of its process group
+    assert not group_alive(responses[0].get("pid"))
+
+
+def test_launcher_concurrency(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+    t0 = time.monotonic()
+    indices = [i for i, _ in iter_subprocess_commands(['python -c "import time; time.sleep(0.5)"'], paths,
+                                                      nprocesses=4, shell=True, pipe=True, mode="launcher")]
+    assert sorted(indices) == [0, 1, 2, 3]
+    assert time.monotonic() - t0 < 2.
+
+
+def test_launcher_polling_fallback(tmpdir):
+    launcher = Launcher(nprocesses=2)
+    launcher._pidfd = False
+    responses = launcher.map_commands(["python --version"], 3 * [str(tmpdir)], pipe=True)
+    assert all(r.get("status") == "completed" for r in responses)
+
+
+def test_pidfd_supported():
+    assert isinstance(pidfd_supported(), bool)
+
+
+@pytest.mark.parametrize("hang", [True, False])
+def test_speculative_execution_of_stragglers(tmpdir, hang):
+    """The task in case_0 hangs on first execution, the duplicate started in a copy of its work directory wins."""
+    script = tmpdir.join("task.py")
+    script.write("import os, time\n"
+                 "hang = os.path.exists('hang') and not os.path.exists('started')\n"
+                 "open('started', 'w').close()\n"
+                 "time.sleep(30 if hang else 0.05)\n"
+                 "open('result.out', 'w').write(os.path.basename(os.getcwd()))\n")
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(5)]
+    if hang:
+        open(os.path.join(paths[0], "hang"), "w").close()
+
+    t0 = time.monotonic()
+    r = Launcher(nprocesses=2).map_commands([f"python {script}"], paths, pipe=True, speculate=3.)
+    assert time.monotonic() - t0 < 20
+    assert all(_.get("status") == "completed" for _ in r)
+    assert [_.get("path") for _ in r] == paths
+    assert bool(r[0].get("speculative")) is hang
+    assert sorted(os.listdir(str(tmpdir))) == sorted(["task.py"] + [os.path.basename(p) for p in paths])
+    assert open(os.path.join(paths[0], "result.out")).read().startswith(".case_0" if hang else "case_0")
@@ -1,3 +1,8 @@
+import pytest
+
+from dtm.main import multiprocess_functions, auto_chunksize
+
+
 def test_func_without_arguments_1(test_func_without_arguments):
     print(type(test_func_without_arguments))
     r = test_func_without_arguments(1)
@@ -50,3 +55,29 @@ def test_func_with_arguments_10(test_func_with_arguments):
     # sets does not have duplicates so if all items in r are equal the set will have only 1 value
     # here all items should be different
     assert len(set(r)) == 3
+
+
+def identity(x):
+    return x
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 1000, "auto"])
+def test_chunked_dispatch_preserves_order(chunksize):
+    n = 200
+    r = multiprocess_functions(n * [identity], args=[[i] for i in range(n)], nprocesses=3, chunksize=chunksize)
+    assert r == list(range(n))
+
+
+@pytest.mark.parametrize("chunksize", [0, -2, "large"])
+def test_invalid_chunksize(chunksize):
+    with pytest.raises(ValueError):
+        multiprocess_functions(3 * [identity], args=[[i] for i in range(3)], nprocesses=2, chunksize=chunksize)
+
+
+def test_auto_chunksize():
+    # short tasks are grouped, but every worker gets at least 4 chunks
+    assert auto_chunksize(1e-5, 100000, 4) == 5000
+    assert auto_chunksize(1e-6, 1000, 4) == 63
+    # long tasks are dispatched one at a time
+    assert auto_chunksize(1., 1000, 4) == 1
+    assert auto_chunksize(0., 10, 4) == 1
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from platform import system
+
+import pytest
+
+from dtm import process
+from dtm.process import session_options, group_alive, terminate_group, kill_group, tracked, terminate_running, \
+    terminate_on_signal
+
+pytestmark = pytest.mark.skipif(system() == "Windows", reason="process groups are POSIX only")
+
+# grandchild ignoring SIGTERM, started in the background by the shell
+STUBBORN = 'python -c "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)" & wait'
+
+
+def test_session_options():
+    p = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"], **session_options())
+    assert os.getpgid(p.pid) == p.pid
+    assert os.getpgid(p.pid) != os.getpgid(0)
+    kill_group(p)
+    p.wait()
+    assert not group_alive(p.pid)
+
+
+def test_terminate_group():
+    p = subprocess.Popen("sleep 30 & sleep 30", shell=True, **session_options())
+    time.sleep(0.2)
+    assert group_alive(p.pid)
+
+    t0 = time.monotonic()
+    assert terminate_group(p, grace=5.)
+    assert time.monotonic() - t0 < 2.
+    assert p.returncode is not None
+    assert not group_alive(p.pid)
+
+
+def test_terminate_group_escalates():
+    p = subprocess.Popen(STUBBORN, shell=True, **session_options())
+    time.sleep(0.5)
+
+    t0 = time.monotonic()
+    assert terminate_group(p, grace=0.5)
+    assert time.monotonic() - t0 >= 0.5
+    assert not group_alive(p.pid)
+
+
+def test_terminate_running():
+    processes = [subprocess.Popen(STUBBORN, shell=True, **session_options()) for _ in range(2)]
+    with tracked(processes[0], grace=0.5), tracked(processes[1], grace=0.5):
+        time.sleep(0.5)
+        terminate_running()
+        assert not any(group_alive(p.pid) for p in processes)
+
+    for p in processes:
+        p.wait()
+
+    # untracked on exit
+    terminate_running()
+
+
+def _run_tracked(queue):
+    terminate_on_signal()
+    p = subprocess.Popen(STUBBORN, shell=True, **session_options())
+    queue.put(p.pid)
+    with tracked(p, grace=0.5):
+        p.wait()
+
+
+def test_terminate_on_signal():
+    queue = multiprocessing.Queue()
+    worker = multiprocessing.Process(target=_run_tracked, args=(queue,))
+    worker.start()
+    pgid = queue.get(timeout=10)
+    time.sleep(0.5)
+
+    os.kill(worker.pid, signal.SIGTERM)
+    worker.join(10)
+    assert worker.exitcode == -signal.SIGTERM
+    assert not group_alive(pgid)
+
+
+def _signal_while_tracking():
+    terminate_on_signal()
+    with process._lock:
+        # SIGTERM arriving while the main thread registers a command
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(10)
+
+
+def test_terminate_on_signal_holding_lock():
+    worker = multiprocessing.Process(target=_signal_while_tracking)
+    worker.start()
+    worker.join(5)
+    if worker.is_alive():
+        worker.kill()
+        worker.join()
+
+    assert worker.exitcode == -signal.SIGTERM
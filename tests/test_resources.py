@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from dtm.main import iter_subprocess_commands, subprocess_commands
+from dtm.resources import Capacity, PackingQueue, Requirement
+
+
+def test_capacity():
+    capacity = Capacity(cores=4, memory=100)
+    assert capacity.fits(Requirement(cores=4, memory=100))
+    assert not capacity.fits(Requirement(cores=8))
+
+    capacity.acquire(Requirement(cores=3, memory=60))
+    assert capacity.available(Requirement(cores=1, memory=40))
+    assert not capacity.available(Requirement(cores=1, memory=50))
+
+    capacity.release(Requirement(cores=3, memory=60))
+    assert capacity.free_cores == 4
+    assert capacity.free_memory == 100
+
+
+def test_default_capacity():
+    capacity = Capacity()
+    assert capacity.cores > 0
+    assert capacity.memory is None or capacity.memory > 0
+
+
+def test_packing_queue_first_fit():
+    requirements = [Requirement(cores=8, memory=40), Requirement(cores=1, memory=2), Requirement(cores=4),
+                    Requirement(cores=1, memory=2)]
+    queue = PackingQueue(zip(requirements, "abcd"), capacity=Capacity(cores=10, memory=64))
+
+    assert queue.pop() == (requirements[0], "a")
+    # the 4 core task does not fit, smaller tasks are started ahead of it
+    assert queue.pop()[1] == "b"
+    assert queue.pop()[1] == "d"
+    assert queue.pop() is None
+    assert len(queue) == 1
+
+    queue.release(requirements[0])
+    assert queue.pop()[1] == "c"
+    assert len(queue) == 0
+
+
+def test_packing_queue_is_lazy():
+    consumed = list()
+
+    def tasks():
+        for i in range(100):
+            consumed.append(i)
+            yield Requirement(cores=0), i
+
+    queue = PackingQueue(tasks(), capacity=Capacity(cores=1, memory=1), window=3)
+    assert queue.pop()[1] == 0
+    assert len(consumed) == 3
+    assert [queue.pop()[1] for _ in range(99)] == list(range(1, 100))
+    assert not queue
+
+
+def test_requirement_exceeds_capacity():
+    queue = PackingQueue([(Requirement(cores=16), 0)], capacity=Capacity(cores=8))
+    with pytest.raises(ValueError):
+        queue.pop()
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_tasks_wait_for_resources(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    t0 = time.monotonic()
+    responses = subprocess_commands(['python -c "import time; time.sleep(0.5)"'], paths, nprocesses=2, shell=True,
+                                    pipe=True, mode=mode, resources=Requirement(cores=2),
+                                    capacity=Capacity(cores=2))
+
+    # the tasks require all cores and cannot run concurrently
+    assert time.monotonic() - t0 >= 1.
+    assert all(r.get("status") == "completed" for r in responses)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_resources_held_outside_batch(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    capacity = Capacity(cores=2)
+    capacity.acquire(Requirement(cores=2))
+
+    # the queued tasks can never be dispatched, instead of returning short or waiting forever
+    with pytest.raises(RuntimeError):
+        subprocess_commands(["true"], paths, mode=mode, resources=Requirement(cores=2), capacity=capacity)
+
+
+def test_launcher_closed_early_releases_resources(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    capacity = Capacity(cores=2)
+    responses = iter_subprocess_commands(["true", "sleep 10", "sleep 10"], paths, nprocesses=3, mode="launcher",
+                                         resources=Requirement(cores=1), capacity=capacity)
+    next(responses)
+    responses.close()
+
+    assert capacity.free_cores == 2
@@ -0,0 +1,63 @@
+import pytest
+
+from dtm.main import subprocess_commands
+from dtm.retry import RetryPolicy
+
+
+@pytest.fixture
+def flaky(tmpdir):
+    """Command failing with return code 75 until it has been attempted twice in the work directory."""
+    script = tmpdir.join("flaky.py")
+    script.write("import os, sys\n"
+                 "n = len(open('count').read()) if os.path.exists('count') else 0\n"
+                 "open('count', 'a').write('x')\n"
+                 "print('license checkout failed' if n < 2 else 'ok')\n"
+                 "sys.exit(75 if n < 2 else 0)\n")
+    return f"python {script}"
+
+
+def test_policy_classification():
+    policy = RetryPolicy(attempts=3, statuses=["timeout"], returncodes=[75], patterns=[r"license"])
+    assert policy.transient(dict(status="timeout", returncode=1, output=None, path="."))
+    assert policy.transient(dict(status="error", returncode=75, output=None, path="."))
+    assert policy.transient(dict(status="error", returncode=1, output="license checkout failed", path="."))
+    assert not policy.transient(dict(status="error", returncode=1, output="segmentation fault", path="."))
+    assert not policy.retry(dict(status="completed", returncode=0), 1)
+    assert not policy.retry(dict(status="timeout", returncode=1), 3)
+
+
+def test_policy_backoff():
+    policy = RetryPolicy(backoff=1., factor=2., max_backoff=5.)
+    assert [policy.delay(n) for n in range(1, 5)] == [1., 2., 4., 5.]
+    assert 0.5 <= RetryPolicy(backoff=1., jitter=0.5).delay(1) <= 1.5
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_retry_transient_failures(tmpdir, flaky, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    policy = RetryPolicy(attempts=3, statuses=[], returncodes=[75], backoff=0.05)
+    r = subprocess_commands([flaky], paths, nprocesses=2, mode=mode, retry=policy)
+    assert all(_.get("status") == "completed" for _ in r)
+    assert all([a.get("returncode") for a in _.get("attempts")] == [75, 75] for _ in r)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_retry_gives_up(tmpdir, flaky, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    r = subprocess_commands([flaky], paths, nprocesses=2, mode=mode,
+                            retry=RetryPolicy(attempts=2, patterns=[r"license"], backoff=0.))
+    assert all(_.get("status") == "error" for _ in r)
+    assert all(len(_.get("attempts")) == 1 for _ in r)
+
+    r = subprocess_commands(["python -c exit(3)"], paths, nprocesses=2, mode=mode,
+                            retry=RetryPolicy(statuses=[], returncodes=[75], backoff=0.))
+    assert all(_.get("returncode") == 3 and "attempts" not in _ for _ in r)
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_retry_spawn_failures(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    r = subprocess_commands(["no-such-binary"], paths, nprocesses=2, mode=mode,
+                            retry=RetryPolicy(attempts=3, statuses=[], returncodes=[1], backoff=0.05))
+    assert all(_.get("status") == "error" for _ in r)
+    assert all(len(_.get("attempts")) == 2 for _ in r)
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from dtm.main import subprocess_commands, iter_subprocess_commands
+from dtm.scheduling import LongestFirst, RuntimeHistory
+
+
+def test_longest_first_cost():
+    sizes = dict(a=1., b=10., c=5.)
+    schedule = LongestFirst(cost=lambda p: sizes[p])
+    assert schedule.order(3 * ["run"], ["a", "b", "c"]) == [1, 2, 0]
+
+
+def test_longest_first_requires_estimate():
+    with pytest.raises(ValueError):
+        LongestFirst()
+
+
+def test_runtime_history(tmpdir):
+    filename = str(tmpdir.join("runtimes.json"))
+    history = RuntimeHistory(filename)
+    history.record("run", "a", 2.)
+    history.record("run", "b", 8.)
+    history.save()
+
+    schedule = LongestFirst(history=filename)
+    assert schedule.history.get("run", "b") == 8.
+
+    # unknown tasks are dispatched first, then the longest recorded
+    assert schedule.order(3 * ["run"], ["a", "b", "c"]) == [2, 1, 0]
+
+
+def test_corrupt_runtime_history(tmpdir):
+    filename = tmpdir.join("runtimes.json")
+    filename.write("{not json")
+    assert RuntimeHistory(str(filename)).get("run", "a") is None
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_dispatch_longest_first(tmpdir, mode):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    filename = str(tmpdir.join("runtimes.json"))
+    schedule = LongestFirst(cost=lambda p: paths.index(p), history=filename)
+
+    # with one process the tasks complete in dispatch order
+    indices = [i for i, _ in iter_subprocess_commands(["python --version"], paths, nprocesses=1, pipe=True,
+                                                      mode=mode, schedule=schedule)]
+    assert indices == [2, 1, 0]
+
+    # runtimes of completed tasks are recorded
+    with open(filename) as f:
+        runtimes = json.load(f)
+    assert len(runtimes["python --version"]) == 3
+
+    responses = subprocess_commands(["python --version"], paths, nprocesses=1, pipe=True, mode=mode,
+                                    schedule=LongestFirst(history=filename))
+    assert [r.get("path") for r in responses] == paths
+    assert all(r.get("runtime") > 0. for r in responses)
@@ -0,0 +1,122 @@
+import glob
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from dtm.main import multiprocess_functions
+from dtm.shm import SharedArguments, SharedBuffer, resolve, detach
+
+
+def checksum(data, offset=0):
+    return sum(bytes(data)) + offset
+
+
+def describe(data):
+    return type(data).__name__, len(data)
+
+
+def test_share_large_argument_once():
+    data = bytearray(range(256)) * 8
+    with SharedArguments(threshold=1024) as shared:
+        args, kwargs = shared.transform([data, 1], dict(data=data))
+        assert isinstance(args[0], SharedBuffer)
+        assert args[1] == 1
+        assert kwargs["data"] is args[0]
+        assert len(shared._segments) == 1
+
+        args, kwargs = resolve(args, kwargs)
+        assert bytes(args[0]) == bytes(data)
+        del args, kwargs
+        detach()
+
+
+def test_small_argument_not_shared():
+    with SharedArguments(threshold=1024) as shared:
+        args, _ = shared.transform([b"small", "a" * 2048], dict())
+        assert args == [b"small", "a" * 2048]
+        assert len(shared._segments) == 0
+
+
+def test_segments_released_after_batch():
+    data = bytes(4096)
+    before = set(glob.glob("/dev/shm/psm_*"))
+    r = multiprocess_functions(3 * [describe], args=3 * [[data]], nprocesses=2, shared_memory=1024)
+    assert r == 3 * [("memoryview", 4096)]
+    assert set(glob.glob("/dev/shm/psm_*")) == before
+
+
+def test_shared_memory_results_equal_pickled():
+    data = bytearray(range(256)) * 16
+    r1 = multiprocess_functions(4 * [checksum], args=[[data, i] for i in range(4)], nprocesses=2)
+    r2 = multiprocess_functions(4 * [checksum], args=[[data, i] for i in range(4)], nprocesses=2, chunksize=2,
+                                shared_memory=1024)
+    assert r1 == r2
+
+
+def test_numpy_array_shared_as_array():
+    np = pytest.importorskip("numpy")
+    a = np.arange(2 ** 18, dtype=float).reshape(512, 512)
+    r = multiprocess_functions(2 * [np.sum], args=2 * [[a]], kwargs=[dict(), dict(axis=0)], nprocesses=2,
+                               shared_memory=True)
+    assert r[0] == a.sum()
+    assert np.array_equal(r[1], a.sum(axis=0))
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_no_resource_tracker_warnings(start_method):
+    # a fresh interpreter, workers forked before the resource tracker of the parent starts run trackers of their own
+    script = ("from dtm.main import multiprocess_functions\n"
+              "from tests.test_shm import describe\n"
+              "if __name__ == '__main__':\n"
+              "    for _ in range(2):\n"
+              f"        multiprocess_functions(4 * [describe], args=4 * [[bytes(4096)]], nprocesses=2, "
+              f"shared_memory=1024, start_method='{start_method}')\n")
+    p = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.dirname(__file__)),
+                       capture_output=True, text=True, timeout=60)
+    assert p.returncode == 0, p.stderr
+    assert "resource_tracker" not in p.stderr
+    assert "Traceback" not in p.stderr
+
+
+def make_bytes(n):
+    # a bytearray is always pickled in-band, a pickle buffer out-of-band if large enough
+    return pickle.PickleBuffer(bytearray(n)), n
+
+
+def test_out_of_band_result_roundtrip(tmpdir):
+    from dtm.shm import dump_result, load_result
+    value = [pickle.PickleBuffer(bytearray(range(256)) * 16), b"small"]
+    result = dump_result(value, threshold=1024)
+    assert len(result.files) == 1
+    loaded = load_result(result)
+    assert bytes(loaded[0]) == bytes(value[0])
+    assert loaded[1] == b"small"
+    assert not any(os.path.exists(f) for f in result.files)
+
+
+def test_shared_results(monkeypatch):
+    from dtm import shm
+    files = list()
+    load = shm.load_result
+
+    def load_result(result):
+        files.extend(result.files)
+        return load(result)
+
+    monkeypatch.setattr(shm, "load_result", load_result)
+    r = multiprocess_functions(3 * [make_bytes], args=[[4096], [10], [8192]], nprocesses=2, shared_results=1024)
+
+    assert [n for _, n in r] == [4096, 10, 8192]
+    assert [len(memoryview(b)) for b, _ in r] == [4096, 10, 8192]
+    assert len(files) == 2
+    assert not any(os.path.exists(f) for f in files)
+
+
+def test_numpy_result_shared_as_array():
+    np = pytest.importorskip("numpy")
+    r = multiprocess_functions(2 * [np.ones], args=[[(512, 512)], [3]], nprocesses=2, shared_results=True)
+    assert r[0].shape == (512, 512) and r[0].sum() == 512 * 512
+    assert list(r[1]) == [1., 1., 1.]
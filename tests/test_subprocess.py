@@ -5,11 +5,12 @@ import subprocess
 from platform import system
 from subprocess import TimeoutExpired
 import re
+import time
 from tempfile import tempdir
 
 import pytest
 
-from dtm.main import subprocess_commands
+from dtm.main import subprocess_commands, iter_subprocess_commands
 
 
 # TODO: Test running a script (does not require shell). Unfortunately we have to create a temp. file on the worker.
@@ -67,23 +68,35 @@ def test_illegal_command_type(subproc_command):
     assert exc.match("The command must be a string not a <class 'int'>.")
 
 
-def test_command_timeout(subproc_command, mocker):
-    command = "dummy"
+def test_command_timeout(subproc_command):
+    command = 'python -c "import time; time.sleep(10)"'
     timeout = 1
 
-    mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired(cmd=command, timeout=timeout))
-
-    response = subproc_command(command=command, pipe=True, timeout=timeout)
+    response = subproc_command(command=command, pipe=True, shell=True, timeout=timeout)
 
     assert response.get("status") == "timeout"
     assert response.get("msg") == f'Command "{command}" timed out after {timeout} seconds.'
 
 
+@pytest.mark.skipif(system() == "Windows", reason="process groups are POSIX only")
+def test_command_timeout_kills_descendants(subproc_command, tmpdir, alive):
+    # the shell starts a grandchild, ignoring SIGTERM, that outlives the shell unless its process group is killed
+    command = ('python -c "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)" & '
+               'echo $! > pid.txt; wait')
+
+    t0 = time.monotonic()
+    response = subproc_command(command=command, path=str(tmpdir), pipe=True, shell=True, timeout=1, grace=0.5)
+
+    assert time.monotonic() - t0 < 5.
+    assert response.get("status") == "timeout"
+    assert not alive(int(tmpdir.join("pid.txt").read()))
+
+
 def test_command_failed(subproc_command, mocker):
     command = "dummy"
     expected_returncode = 1
 
-    mocker.patch("subprocess.run", side_effect=subprocess.CalledProcessError(cmd=command, returncode=expected_returncode))
+    mocker.patch("subprocess.Popen", side_effect=subprocess.CalledProcessError(cmd=command, returncode=expected_returncode))
 
     response = subproc_command(command=command, pipe=True)
 
@@ -96,10 +109,76 @@ def test_directory_not_found(subproc_command, mocker):
     command = "dummy"
     expected_returncode = 1
 
-    mocker.patch("subprocess.run", side_effect=NotADirectoryError)
+    mocker.patch("subprocess.Popen", side_effect=NotADirectoryError)
 
     response = subproc_command(command=command, pipe=True)
 
     assert response.get("status") == "error"
     assert response.get("returncode") == expected_returncode
-    assert re.match(r"The path .* is invalid\. The directory does not exist\.", response.get("msg"))
\ No newline at end of file
+    assert re.match(r"The path .* is invalid\. The directory does not exist\.", response.get("msg"))
+
+
+def test_iter_subprocess_commands(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(4)]
+    results = list(iter_subprocess_commands(commands=["python --version"], paths=paths, nprocesses=2, pipe=True))
+
+    assert sorted(i for i, _ in results) == [0, 1, 2, 3]
+    for i, r in results:
+        assert r.get("path") == paths[i]
+        assert r.get("status") == "completed"
+
+
+def test_iter_subprocess_commands_yields_as_completed(tmpdir):
+    paths = [str(tmpdir.mkdir("slow")), str(tmpdir.mkdir("fast"))]
+    commands = ['python -c "import time; time.sleep(1)"', "python --version"]
+    indices = [i for i, _ in iter_subprocess_commands(commands=commands, paths=paths, nprocesses=2, shell=True,
+                                                      pipe=True)]
+    assert indices == [1, 0]
+
+
+def test_iter_subprocess_commands_closed_early(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(3)]
+    iterator = iter_subprocess_commands(commands=["python --version"], paths=paths, nprocesses=1, pipe=True)
+    i, r = next(iterator)
+    assert r.get("status") == "completed"
+    iterator.close()
+
+
+@pytest.mark.parametrize("mode", ["pool", "launcher"])
+def test_lazy_inputs(tmpdir, mode):
+    consumed = list()
+
+    def paths():
+        for i in range(6):
+            consumed.append(i)
+            yield str(tmpdir.mkdir(f"case_{i}"))
+
+    iterator = iter_subprocess_commands(["python --version"], paths(), nprocesses=2, pipe=True, mode=mode,
+                                        max_queued=1)
+    next(iterator)
+    # at most the running tasks and the queued ones are taken from the input
+    assert len(consumed) <= 4
+
+    indices = [i for i, _ in iterator]
+    assert len(indices) == 5
+
+    responses = subprocess_commands((c for c in 3 * ["python --version"]), [str(tmpdir)] * 3, nprocesses=2,
+                                    pipe=True, mode=mode)
+    assert len(responses) == 3
+    assert all(r.get("status") == "completed" for r in responses)
+
+
+def test_subprocess_commands_spawn(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    r = subprocess_commands(["python --version"], paths, nprocesses=2, pipe=True, start_method="spawn")
+    assert all(_.get("status") == "completed" for _ in r)
+
+
+def test_subprocess_commands_positional_options(tmpdir):
+    paths = [str(tmpdir.mkdir(f"case_{i}")) for i in range(2)]
+    # nprocesses, shell, env, pipe and timeout, in the order of the original signature
+    responses = subprocess_commands(["python --version"], paths, 2, False, None, True, 10)
+    assert all(r.get("status") == "completed" for r in responses)
+
+    with pytest.raises(TypeError):
+        subprocess_commands(["python --version"], paths, 2, False, None, True, 10, None)